@@ -1,16 +1,17 @@
 from ukf import UnscentedKalmanFilter
 
-# Example usage
-ukf = UnscentedKalmanFilter()
+# Example usage: accel here is in m/s^2, so tell the filter what 1 g reads
+ukf = UnscentedKalmanFilter(gravity=9.81)
 
 # Simulated data
 dt = 0.01
-gyro = [0.01, -0.02, 10]  # Example gyro readings
+gyro = [0.01, -0.02, 0.0]  # Example gyro readings, rad/s (bias only, board at rest)
 accel = [0.0, 0.0, 9.81]  # Example accel readings (gravity aligned)
-mag = [0.3, 0.4, 0.5]  # Example magnetometer readings
+mag = [0.3, 0.0, -0.5]  # Example magnetometer readings
 
-ukf.predict(dt, gyro)
-ukf.update(accel, mag)
+for _ in range(500):
+    ukf.predict(dt, gyro)
+    ukf.update(accel, mag)
 
-print("Quaternion:", ukf.q)
-print("Gyroscope Bias:", ukf.bias)
+print("Quaternion:", list(ukf.q))
+print("Gyroscope Bias:", list(ukf.bias))
@@ -1,150 +1,408 @@
+# ukf.py
+#
+# Attitude and gyro bias estimation with an error-state unscented Kalman
+# filter (USQUE style). The state is seven numbers, the body-to-world
+# quaternion q and the gyro bias b (rad/s), but the filter's uncertainty is
+# kept over the six-dimensional error state
+#
+#   dx = (rotation vector of the attitude error, bias error)
+#
+# so the covariance P is 6x6 and each step spreads 2 * 6 + 1 = 13 sigma
+# points: sigma i is the nominal state with dx_i applied, q_i = q * exp(dx_i),
+# b_i = b + dx_i. predict() pushes every sigma point through the gyro
+# kinematics and folds them back into a mean and P; update() compares each
+# sigma point's predicted gravity and magnetic field directions with the
+# measured ones. The world frame is x = magnetic north (horizontal), z = up.
+# The first update() initialises the attitude directly from accel + mag.
+# The attitude is kept in a flat array for the kernels and copied into q, a
+# fusion.Quaternion, whenever it changes, so the filter can stand in for the
+# fusion package's filters.
+#
+# Every matrix and sigma point lives in flat, row-major array('f') buffers
+# allocated once in the constructor and the matrix work goes through the
+# in-place kernels of lib/linalg.py, so a step allocates no lists, tuples or
+# arrays (only boxed float temporaries on ports without immediate floats).
+# Sigma points and their predicted measurements are stored one row per
+# dimension (N x 13, M x 13) so both covariances are a single syrk.
+
 import math
+from array import array
+
+from fusion.quaternion import Quaternion
+from linalg import cho_solve_rows, cholesky, gemm, quat_mul, syrk
+
+N = 6               # error state: attitude rotation vector, gyro bias
+SIGMAS = 2 * N + 1
+M = 6               # measurement: gravity direction, magnetic field direction
+
+def _exp_into(vx, vy, vz, out, o):
+    # Unit quaternion of the rotation vector (vx, vy, vz) into out[o:o + 4]
+    angle = math.sqrt(vx * vx + vy * vy + vz * vz)
+    if angle < 1e-6:
+        out[o] = 1.0
+        out[o + 1] = 0.5 * vx
+        out[o + 2] = 0.5 * vy
+        out[o + 3] = 0.5 * vz
+        return
+    s = math.sin(0.5 * angle) / angle
+    out[o] = math.cos(0.5 * angle)
+    out[o + 1] = s * vx
+    out[o + 2] = s * vy
+    out[o + 3] = s * vz
+
+def _normalize(q, o):
+    n = math.sqrt(q[o] * q[o] + q[o + 1] * q[o + 1] + q[o + 2] * q[o + 2] + q[o + 3] * q[o + 3])
+    q[o] /= n
+    q[o + 1] /= n
+    q[o + 2] /= n
+    q[o + 3] /= n
 
-# quaternion math helpers
-def quaternion_multiply(q1, q2):
-    """multiply two quaternions."""
-    w1, x1, y1, z1 = q1
-    w2, x2, y2, z2 = q2
-    return [
-        w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
-        w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
-        w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
-        w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2,
-    ]
-
-def normalize_quaternion(q):
-    """normalize a quaternion."""
-    norm = math.sqrt(sum([i * i for i in q]))
-    return [i / norm for i in q]
-
-def quaternion_to_rotation_matrix(q):
-    """convert a quaternion to a 3x3 rotation matrix."""
-    w, x, y, z = q
-    return [
-        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
-        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
-        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
-    ]
-
-def matrix_vector_multiply(matrix, vector):
-    """multiply a 3x3 matrix by a 3x1 vector."""
-    return [
-        sum(matrix[i][j] * vector[j] for j in range(3))
-        for i in range(3)
-    ]
-
-def matrix_add(A, B):
-    """add two matrices."""
-    return [
-        [A[i][j] + B[i][j] for j in range(len(A[0]))]
-        for i in range(len(A))
-    ]
-
-def matrix_scalar_multiply(matrix, scalar):
-    """multiply a matrix by a scalar."""
-    return [
-        [element * scalar for element in row]
-        for row in matrix
-    ]
-
-def matrix_transpose(matrix):
-    """transpose a matrix."""
-    return [
-        [matrix[j][i] for j in range(len(matrix))]
-        for i in range(len(matrix[0]))
-    ]
-
-# ukf implementation
 class UnscentedKalmanFilter:
-    def __init__(self):
-        self.q = [1.0, 0.0, 0.0, 0.0]  # initial quaternion
-        self.bias = [0.0, 0.0, 0.0]  # gyroscope biases
-        self.P = [
-            [0.1 if i == j else 0.0 for j in range(6)]
-            for i in range(6)
-        ]  # initial state covariance matrix (6x6 for [q + bias])
+    def __init__(self, gyro_noise=0.005, bias_noise=5e-5, accel_noise=0.05, mag_noise=0.1,
+                 accel_gate=0.15, gravity=1.0, attitude_sigma=0.2, bias_sigma=0.02, kappa=1.0):
+        # gyro_noise rad/s/sqrt(Hz) and bias_noise rad/s^2/sqrt(Hz) are the
+        # process noise densities; accel_noise and mag_noise the standard
+        # deviation of the measured unit vectors. While |accel| is further
+        # than accel_gate (fraction of gravity, in the accel's own units)
+        # from 1 g it is not treated as gravity.
+        self._qv = array('f', [1.0, 0.0, 0.0, 0.0])
+        self.q = Quaternion()
+        self.bias = array('f', [0.0, 0.0, 0.0])
+        self.P = array('f', [0.0] * (N * N))
+        self.initialized = False
+
+        self._gyro_var = gyro_noise * gyro_noise
+        self._bias_var = bias_noise * bias_noise
+        self._accel_var = accel_noise * accel_noise
+        self._mag_var = mag_noise * mag_noise
+        self._accel_gate = accel_gate
+        self._gravity = gravity
+        self._p0 = (attitude_sigma * attitude_sigma, bias_sigma * bias_sigma)
+        self.reset_covariance()
+
+        # Unscented transform weights for sigma 0 and the rest
+        self._w0 = kappa / (N + kappa)
+        self._wi = 0.5 / (N + kappa)
+        self._sqrt_w0 = math.sqrt(self._w0)
+        self._sqrt_wi = math.sqrt(self._wi)
+        self._spread = math.sqrt(N + kappa)
+
+        # Magnetic reference (horizontal, 0, vertical), from the first update
+        self._mag_ref = array('f', [1.0, 0.0, 0.0])
+
+        # Scratch, reused by every step
+        self._L = array('f', [0.0] * (N * N))
+        self._sig = array('f', [0.0] * (N * SIGMAS))       # error sigma points, by dimension
+        self._qs = array('f', [0.0] * (SIGMAS * 4))        # their quaternions
+        self._zs = array('f', [0.0] * (M * SIGMAS))        # predicted measurements, by dimension
+        self._mean = array('f', [0.0] * N)
+        self._z = array('f', [0.0] * M)
+        self._zbar = array('f', [0.0] * M)
+        self._pzz = array('f', [0.0] * (M * M))
+        self._pxz = array('f', [0.0] * (N * M))
+        self._k = array('f', [0.0] * (N * M))
+        self._dq = array('f', [0.0] * 4)
+        self._rate = array('f', [0.0] * 3)
+
+    def reset_covariance(self):
+        P = self.P
+        for k in range(N * N):
+            P[k] = 0.0
+        for k in range(3):
+            P[k * N + k] = self._p0[0]
+            P[(k + 3) * N + k + 3] = self._p0[1]
+
+    def _sigma_points(self):
+        # Column i of sig is sigma point i: 0, then +/- spread * column j of
+        # chol(P); qs = q * exp(attitude part) for each
+        L = self._L
+        P = self.P
+        for k in range(N * N):
+            L[k] = P[k]
+        if not cholesky(L, N):
+            # Lost positive definiteness to rounding; start the uncertainty over
+            self.reset_covariance()
+            for k in range(N * N):
+                L[k] = P[k]
+            cholesky(L, N)
+        sig = self._sig
+        spread = self._spread
+        for r in range(N):
+            o = r * SIGMAS
+            sig[o] = 0.0
+            for j in range(N):
+                v = spread * L[r * N + j]
+                sig[o + 1 + j] = v
+                sig[o + 1 + N + j] = -v
+        qs = self._qs
+        dq = self._dq
+        q = self._qv
+        for i in range(SIGMAS):
+            _exp_into(sig[i], sig[SIGMAS + i], sig[2 * SIGMAS + i], dq, 0)
+            quat_mul(q, 0, dq, 0, qs, 4 * i)
 
     def predict(self, dt, gyro):
-        """prediction step using gyroscope readings."""
-        omega = [gyro[i] - self.bias[i] for i in range(3)]
-        omega_norm = math.sqrt(sum([w * w for w in omega]))
-
-        if omega_norm > 1e-6:  # avoid division by zero
-            sin_term = math.sin(omega_norm * dt / 2) / omega_norm
-            delta_q = [
-                math.cos(omega_norm * dt / 2),
-                sin_term * omega[0],
-                sin_term * omega[1],
-                sin_term * omega[2]
-            ]
+        # Propagate with body rates gyro (rad/s) over dt seconds
+        self._sigma_points()
+        sig = self._sig
+        qs = self._qs
+        dq = self._dq
+        bias = self.bias
+        gx = gyro[0] - bias[0]
+        gy = gyro[1] - bias[1]
+        gz = gyro[2] - bias[2]
+        for i in range(SIGMAS):
+            _exp_into((gx - sig[3 * SIGMAS + i]) * dt, (gy - sig[4 * SIGMAS + i]) * dt,
+                      (gz - sig[5 * SIGMAS + i]) * dt, dq, 0)
+            quat_mul(qs, 4 * i, dq, 0, qs, 4 * i)
+
+        # Attitude errors relative to the propagated sigma 0; bias errors are
+        # unchanged by the kinematics
+        w0 = qs[0]
+        x0 = -qs[1]
+        y0 = -qs[2]
+        z0 = -qs[3]
+        for i in range(SIGMAS):
+            o = 4 * i
+            w1 = qs[o]
+            x1 = qs[o + 1]
+            y1 = qs[o + 2]
+            z1 = qs[o + 3]
+            w = w0 * w1 - x0 * x1 - y0 * y1 - z0 * z1
+            x = w0 * x1 + x0 * w1 + y0 * z1 - z0 * y1
+            y = w0 * y1 - x0 * z1 + y0 * w1 + z0 * x1
+            z = w0 * z1 + x0 * y1 - y0 * x1 + z0 * w1
+            if w < 0:
+                w = -w
+                x = -x
+                y = -y
+                z = -z
+            s = math.sqrt(x * x + y * y + z * z)
+            f = 2.0 * math.atan2(s, w) / s if s > 1e-7 else 2.0
+            sig[i] = f * x
+            sig[SIGMAS + i] = f * y
+            sig[2 * SIGMAS + i] = f * z
+
+        # P = sum w_i d_i d_i^T with d_i = sig_i - mean: with the deviations
+        # scaled by sqrt(w_i) in place that is sig sig^T
+        mean = self._mean
+        self._center(sig, N, mean)
+        P = syrk(sig, self.P, N, SIGMAS)
+        for k in range(3):
+            P[k * N + k] += self._gyro_var * dt
+            P[(k + 3) * N + k + 3] += self._bias_var * dt
+
+        # New nominal state: sigma 0 moved by the mean error
+        q = self._qv
+        for k in range(4):
+            q[k] = qs[k]
+        _exp_into(mean[0], mean[1], mean[2], dq, 0)
+        quat_mul(q, 0, dq, 0, q, 0)
+        _normalize(q, 0)
+        self.q.set(q[0], q[1], q[2], q[3])
+        bias[0] += mean[3]
+        bias[1] += mean[4]
+        bias[2] += mean[5]
+
+    def step(self, accel, gyro, mag=None, dt=0.01):
+        # predict() + update() with the fusion package's step() units: gyro
+        # in deg/s
+        rate = self._rate
+        rate[0] = math.radians(gyro[0])
+        rate[1] = math.radians(gyro[1])
+        rate[2] = math.radians(gyro[2])
+        self.predict(dt, rate)
+        self.update(accel, mag)
+
+    def _center(self, rows, n, mean):
+        # Weighted mean of each of the n rows (one per dimension, one column
+        # per sigma point) into mean, then rows = (rows - mean) * sqrt(w_i)
+        w0 = self._w0
+        wi = self._wi
+        sw0 = self._sqrt_w0
+        swi = self._sqrt_wi
+        for r in range(n):
+            o = r * SIGMAS
+            s = 0.0
+            for i in range(1, SIGMAS):
+                s += rows[o + i]
+            mu = w0 * rows[o] + wi * s
+            mean[r] = mu
+            rows[o] = (rows[o] - mu) * sw0
+            for i in range(1, SIGMAS):
+                rows[o + i] = (rows[o + i] - mu) * swi
+
+    def update(self, accel, mag=None):
+        # Correct with an accelerometer reading (any units, gravity in the
+        # constructor's) and optionally a calibrated magnetometer reading
+        ax = accel[0]
+        ay = accel[1]
+        az = accel[2]
+        norm = math.sqrt(ax * ax + ay * ay + az * az)
+        if norm == 0:
+            return
+        z = self._z
+        z[0] = ax / norm
+        z[1] = ay / norm
+        z[2] = az / norm
+        accel_var = self._accel_var
+        if abs(norm / self._gravity - 1.0) > self._accel_gate:
+            if mag is None:
+                return
+            accel_var = 1e4       # thrust or shock, not gravity: ignore it
+        m = 3
+        if mag is not None:
+            mx = mag[0]
+            my = mag[1]
+            mz = mag[2]
+            norm = math.sqrt(mx * mx + my * my + mz * mz)
+            if norm == 0:
+                mag = None
+            else:
+                z[3] = mx / norm
+                z[4] = my / norm
+                z[5] = mz / norm
+                m = 6
+
+        if not self.initialized:
+            self._initialize(z, m == 6)
+            return
+
+        self._sigma_points()
+        qs = self._qs
+        zs = self._zs
+        h = self._mag_ref[0]
+        v = self._mag_ref[2]
+        for i in range(SIGMAS):
+            o = 4 * i
+            w = qs[o]
+            x = qs[o + 1]
+            y = qs[o + 2]
+            zq = qs[o + 3]
+            # Rows 0 and 2 of R(q) (body to world): world x and z in body axes
+            r20 = 2 * (x * zq - w * y)
+            r21 = 2 * (y * zq + w * x)
+            r22 = 1 - 2 * (x * x + y * y)
+            zs[i] = r20
+            zs[SIGMAS + i] = r21
+            zs[2 * SIGMAS + i] = r22
+            if m == 6:
+                zs[3 * SIGMAS + i] = h * (1 - 2 * (y * y + zq * zq)) + v * r20
+                zs[4 * SIGMAS + i] = h * 2 * (x * y - w * zq) + v * r21
+                zs[5 * SIGMAS + i] = h * 2 * (x * zq + w * y) + v * r22
+
+        # Innovation covariance from the sqrt(w_i)-scaled deviations, plus
+        # the measurement noise
+        zbar = self._zbar
+        self._center(zs, m, zbar)
+        pzz = syrk(zs, self._pzz, m, SIGMAS)
+        for r in range(m):
+            pzz[r * m + r] += accel_var if r < 3 else self._mag_var
+
+        # Cross covariance. Sigma 1 + j and 1 + N + j are +/- spread times
+        # column j of the lower triangular L (and the error sigma points have
+        # zero mean), so Pxz needs only the paired differences. K starts as
+        # a copy of it.
+        L = self._L
+        pxz = self._pxz
+        K = self._k
+        sw = self._sqrt_wi * self._spread
+        for r in range(N):
+            for c in range(m):
+                o = c * SIGMAS
+                s = 0.0
+                for j in range(r + 1):
+                    s += L[r * N + j] * (zs[o + 1 + j] - zs[o + 1 + N + j])
+                pxz[r * m + c] = sw * s
+                K[r * m + c] = sw * s
+
+        # K = Pxz Pzz^-1 through the Cholesky factor of Pzz
+        if not cholesky(pzz, m):
+            return
+        cho_solve_rows(pzz, K, N, m)
+
+        # dx = K (z - zbar), P -= K Pxz^T
+        mean = self._mean
+        for r in range(N):
+            s = 0.0
+            for c in range(m):
+                s += K[r * m + c] * (z[c] - zbar[c])
+            mean[r] = s
+        gemm(K, pxz, self.P, N, m, N, -1.0, 1.0, True)
+
+        q = self._qv
+        dq = self._dq
+        _exp_into(mean[0], mean[1], mean[2], dq, 0)
+        quat_mul(q, 0, dq, 0, q, 0)
+        _normalize(q, 0)
+        self.q.set(q[0], q[1], q[2], q[3])
+        bias = self.bias
+        bias[0] += mean[3]
+        bias[1] += mean[4]
+        bias[2] += mean[5]
+
+    def _initialize(self, z, with_mag):
+        # TRIAD: up is the measured gravity direction, north the horizontal
+        # part of the field (or of body x without a magnetometer)
+        ux = z[0]
+        uy = z[1]
+        uz = z[2]
+        if with_mag:
+            mx = z[3]
+            my = z[4]
+            mz = z[5]
+        else:
+            mx, my, mz = (1.0, 0.0, 0.0) if abs(ux) < 0.9 else (0.0, 1.0, 0.0)
+        # west = up x field, north = west x up
+        wx = uy * mz - uz * my
+        wy = uz * mx - ux * mz
+        wz = ux * my - uy * mx
+        n = math.sqrt(wx * wx + wy * wy + wz * wz)
+        if n < 1e-6:
+            return
+        wx /= n
+        wy /= n
+        wz /= n
+        nx = wy * uz - wz * uy
+        ny = wz * ux - wx * uz
+        nz = wx * uy - wy * ux
+        if with_mag:
+            v = mx * ux + my * uy + mz * uz
+            self._mag_ref[0] = math.sqrt(max(1.0 - v * v, 0.0))
+            self._mag_ref[2] = v
+        # Rows of R(q) are north, west, up in body axes
+        self._set_from_matrix(nx, ny, nz, wx, wy, wz, ux, uy, uz)
+        for k in range(3):
+            self.bias[k] = 0.0
+        self.reset_covariance()
+        self.initialized = True
+
+    def _set_from_matrix(self, r00, r01, r02, r10, r11, r12, r20, r21, r22):
+        q = self._qv
+        trace = r00 + r11 + r22
+        if trace > 0:
+            s = 2.0 * math.sqrt(trace + 1.0)
+            q[0] = 0.25 * s
+            q[1] = (r21 - r12) / s
+            q[2] = (r02 - r20) / s
+            q[3] = (r10 - r01) / s
+        elif r00 > r11 and r00 > r22:
+            s = 2.0 * math.sqrt(1.0 + r00 - r11 - r22)
+            q[0] = (r21 - r12) / s
+            q[1] = 0.25 * s
+            q[2] = (r01 + r10) / s
+            q[3] = (r02 + r20) / s
+        elif r11 > r22:
+            s = 2.0 * math.sqrt(1.0 + r11 - r00 - r22)
+            q[0] = (r02 - r20) / s
+            q[1] = (r01 + r10) / s
+            q[2] = 0.25 * s
+            q[3] = (r12 + r21) / s
         else:
-            delta_q = [1.0, 0.0, 0.0, 0.0]  # no rotation
-
-        self.q = quaternion_multiply(self.q, delta_q)
-        self.q = normalize_quaternion(self.q)
-
-        # prediction update for covariance (simplified)
-        # expand with noise modeling if needed.
-        self.P = matrix_add(
-            self.P,
-            matrix_scalar_multiply(self.P, 0.001)  # simplified process noise
-        )
-
-    def update(self, accel, mag):
-        """update step using accelerometer and magnetometer readings."""
-        # ensure inputs have exactly 3 elements
-        if len(accel) != 3 or len(mag) != 3:
-            raise ValueError("accelerometer and magnetometer inputs must have 3 elements.")
-
-        # normalize accelerometer and magnetometer vectors
-        accel_norm = math.sqrt(sum([a * a for a in accel]))
-        mag_norm = math.sqrt(sum([m * m for m in mag]))
-        accel = [a / accel_norm for a in accel]
-        mag = [m / mag_norm for m in mag]
-
-        # reference vectors in world coordinates
-        gravity = [0.0, 0.0, 1.0]
-        magnetic_north = [1.0, 0.0, 0.0]
-
-        # compute the rotation matrix from the quaternion
-        R = quaternion_to_rotation_matrix(self.q)
-
-        # ensure the rotation matrix is valid
-        if len(R) != 3 or any(len(row) != 3 for row in R):
-            raise ValueError("rotation matrix must be 3x3.")
-
-        # expected accelerometer and magnetometer readings
-        accel_expected = matrix_vector_multiply(R, gravity)
-        mag_expected = matrix_vector_multiply(R, magnetic_north)
-
-        # ensure expected vectors have 3 elements
-        if len(accel_expected) != 3 or len(mag_expected) != 3:
-            raise ValueError("expected vectors must have 3 elements.")
-
-        # compute residuals
-        residual_accel = [accel[i] - accel_expected[i] for i in range(3)]
-        residual_mag = [mag[i] - mag_expected[i] for i in range(3)]
-        residual = residual_accel + residual_mag  # combined residual
-
-        # debugging: print residuals
-        print("Residuals:", residual)
-
-        # simplified kalman gain (placeholder)
-        K = 0.1  # gain factor for simplicity
-        update = [K * r for r in residual]
-
-        # ensure update vector has sufficient length
-        if len(update) != 6:
-            raise ValueError("update vector must have 6 elements.")
-
-        # update quaternion and bias
-        dq = update[:3] + [0.0]  # quaternion update (assuming small-angle approx.)
-        self.q = normalize_quaternion([
-            self.q[i] + dq[i] for i in range(4)
-        ])
-
-        # update bias
-        self.bias = [self.bias[i] + update[3 + i] for i in range(3)]
-
-print("Quaternion:", ukf.q)
-print("Gyroscope Bias:", ukf.bias)
+            s = 2.0 * math.sqrt(1.0 + r22 - r00 - r11)
+            q[0] = (r10 - r01) / s
+            q[1] = (r02 + r20) / s
+            q[2] = (r12 + r21) / s
+            q[3] = 0.25 * s
+        _normalize(q, 0)
+        self.q.set(q[0], q[1], q[2], q[3])
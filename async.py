@@ -1,31 +1,47 @@
 from lib.micropython_rfm9x import *
 from machine import SPI, Pin, I2C
-import struct
-from lib.icm42670 import read_who_am_i, configure_sensor, read_accel_data, read_gyro_data, set_accel_scale, set_gyro_scale
-from gyrolib import MadgwickFilter, MovingAverageFilter
-from lib.l86gps import L86GPS
-from lib.lps22 import LPS22
+from lib.icm42670 import imu, read_who_am_i, configure_sensor, read_motion_into, set_accel_scale, set_gyro_scale
+from lib.imucal import ImuCalibration, calibrate as calibrate_imu
+from fusion import Madgwick, MovingAverageFilter
+from lib.l86gps import L86GPS, UPDATED_GGA
+from lib.lps22 import LPS22, LPS22_FIFO_STREAM, LPS22_FIFO_DEPTH
+from lib.flightlogger import ThreadedFlightLogger
+from lib.telemetry import TelemetryEncoder
+from lib.magcal import MagCalibration
 from micropython_mmc5603 import mmc5603
 import time
 import os
 import asyncio
+from array import array
 
 # Initialize sensors
-madgwick = MadgwickFilter(beta=0.03)
+madgwick = Madgwick(beta=0.03)
 maf = MovingAverageFilter(window_size=12)
 gps = L86GPS()
+gps.configure()  # 10 Hz, GGA + RMC only, 115200 baud
+telemetry = TelemetryEncoder()
 
 # Initialize I2C buses
 i2c_barometer = I2C(0, scl=Pin(9), sda=Pin(8))
 i2c_magnetometer = I2C(0, sda=Pin(8), scl=Pin(9))
-lps = LPS22(i2c_barometer)
+lps = LPS22(i2c_barometer, odr=75)
+lps.fifo_mode(LPS22_FIFO_STREAM)
 mmc = mmc5603.MMC5603(i2c_magnetometer)
 
-# Initial magnetometer readings
-mag_x, mag_y, mag_z = mmc.magnetic
-mx = mag_y
-my = mag_z
-mz = -1 * mag_x
+# Hard/soft-iron correction and the sensor-to-board axis remap in one;
+# without a saved calibration (run lib/magcal.calibrate(mmc)) only the remap
+magcal = MagCalibration.load()
+if magcal is None:
+    print("No magnetometer calibration, using raw field")
+    magcal = MagCalibration()
+
+# Initial magnetometer reading, in board axes
+mag_raw = array('f', mmc.magnetic)
+mag = magcal.correct_into(mag_raw, array('f', [0.0] * 3))
+
+# Then stream at 50 Hz so the sensor loop never waits on a measurement
+mmc.data_rate = 50
+mmc.continuous_mode = True
 
 # Global variables
 current_gps_values = {
@@ -36,7 +52,20 @@ current_gps_values = {
     'status': 'invalid'
 }
 start_time = 0
-log_file = None
+logger = None
+
+# Preallocated IMU sample: accel xyz (g), gyro xyz (dps), die temperature
+# (C) so the gyro bias tracks it
+motion = array('f', [0.0] * 7)
+accel = memoryview(motion)[0:3]
+gyro = memoryview(motion)[3:6]
+
+# Preallocated barometer batch: (pressure hPa, temperature C) pairs drained
+# from the LPS22 FIFO each loop, with their ticks_us
+baro = array('f', [0.0] * (2 * LPS22_FIFO_DEPTH))
+baro_times = array('i', [0] * LPS22_FIFO_DEPTH)
+baro_altitude = array('f', [0.0] * LPS22_FIFO_DEPTH)  # m above the pad
+max_altitude = 0.0
 
 def create_directory_if_needed(directory):
     try:
@@ -46,84 +75,63 @@ def create_directory_if_needed(directory):
     except Exception as e:
         print(f"Error creating directory: {e}")
 
-def initialize_log_file(data_dir):
-    log_file = f"{data_dir}/sensor_log.csv"
-    with open(log_file, "w") as f:
-        f.write("elapsed_time,temperature,pressure,accel_x,accel_y,accel_z,"
-                "gyro_x,gyro_y,gyro_z,mx,my,mz,gps_latitude,gps_longitude,"
-                "gps_altitude,gps_satellites,gps_status\n")
-    return log_file
-
-def log_sensor_data(log_file, elapsed_time, temperature, pressure, accel, gyro, mag, gps_values):
-    with open(log_file, "a") as f:
-        f.write(f"{elapsed_time:.3f},{temperature},{pressure},"
-                f"{accel[0]},{accel[1]},{accel[2]},"
-                f"{gyro[0]},{gyro[1]},{gyro[2]},"
-                f"{mag[0]},{mag[1]},{mag[2]},"
-                f"{gps_values['latitude']},{gps_values['longitude']},"
-                f"{gps_values['altitude']},{gps_values['satellites']},"
-                f"{gps_values['status']}\n")
-
-def encode_data(quaternion, gps_data, pressure):
-    try:
-        format_string = '<4f3fif'  # 4 quaternions, lat, lon, alt, satellites (int), pressure
-        return struct.pack(format_string,
-            quaternion.w, quaternion.x, quaternion.y, quaternion.z,
-            gps_data['latitude'], gps_data['longitude'], gps_data['altitude'],
-            gps_data['satellites'],
-            pressure)
-    except Exception as e:
-        print(f"Encoding error: {e}")
-        return None
-
 async def read_gps_task():
-    global current_gps_values
+    fix = gps.fix
     while True:
         try:
-            gps_data = gps.read_gps()
-            if gps_data and gps_data['type'] == 'GPGGA' and gps_data['status'] == 'valid':
-                current_gps_values = {
-                    'latitude': gps_data['latitude'],
-                    'longitude': gps_data['longitude'],
-                    'altitude': gps_data['altitude'],
-                    'satellites': gps_data.get('satellites', 0),
-                    'status': gps_data['status']
-                }
+            # Parse everything received since the last poll. Position is
+            # filled in per IMU sample by sensor_task from the timed fixes.
+            if gps.update() & UPDATED_GGA and fix.status == 'valid':
+                current_gps_values['satellites'] = fix.satellites
+                current_gps_values['status'] = fix.status
         except Exception as e:
             print(f"GPS task error: {e}")
         await asyncio.sleep_ms(100)  # Check GPS every 100ms
 
 async def sensor_task(rfm9x):
-    global current_gps_values, start_time, log_file
+    global current_gps_values, start_time, logger, max_altitude
     last_time = time.ticks_ms()
+    pressure = 0.0
+    temperature = 0.0
     
     while True:
         try:
             current_time = time.ticks_ms()
             dt = (current_time - last_time) / 1000.0
             last_time = current_time
-            elapsed_time = time.ticks_diff(current_time, start_time) / 1000
+            elapsed_ms = time.ticks_diff(current_time, start_time)
 
             # Read sensors
-            accel = read_accel_data()
-            gyro = read_gyro_data()
-            mag = mmc.magnetic
-            temperature = mmc.temperature
-            _, pressure = lps.get()
+            read_motion_into(motion, True)
+            gps.position_at(time.ticks_us(), current_gps_values)
+            if mmc.read_if_ready(mag_raw) is not None:  # else keep the last
+                magcal.correct_into(mag_raw, mag)
+            count = lps.drain_into(baro, baro_times)
+            if count:
+                pressure = baro[2 * count - 2]
+                temperature = baro[2 * count - 1]
+                lps.altimeter.altitude_into(baro, baro_altitude, count, 2)
+                for k in range(count):
+                    if baro_altitude[k] > max_altitude:
+                        max_altitude = baro_altitude[k]
 
             # Update orientation
-            madgwick.update(gyro, accel, dt)
+            madgwick.step(accel, gyro, mag, dt)
             smoothed_quaternion = maf.apply(madgwick.q)
 
             # Log data
-            log_sensor_data(log_file, elapsed_time, temperature, pressure,
-                          accel, gyro, mag, current_gps_values)
+            logger.log(elapsed_ms, temperature, pressure,
+                       accel, gyro, mag, current_gps_values)
 
             # Transmit data
-            data = encode_data(smoothed_quaternion, current_gps_values, pressure)
-            if data is not None:
-                rfm9x.send(data)
-                print("Data packet sent")
+            # Skip this packet if the previous one is still on air rather than
+            # waiting for the radio
+            if not rfm9x.tx_busy():
+                q = smoothed_quaternion
+                length = telemetry.encode_into(rfm9x.tx_buffer, elapsed_ms,
+                                               (q.w, q.x, q.y, q.z),
+                                               current_gps_values, pressure)
+                rfm9x.start_send_view(length)
 
             await asyncio.sleep_ms(50)  # 50ms delay between sensor readings
 
@@ -132,7 +140,7 @@ async def sensor_task(rfm9x):
             await asyncio.sleep_ms(1000)
 
 async def main():
-    global start_time, log_file
+    global start_time, logger
     
     if read_who_am_i() != 0x67:
         print("ICM-42670-P not found.")
@@ -142,9 +150,17 @@ async def main():
     set_accel_scale(3)  # ±16g
     set_gyro_scale(1)   # ±500 dps
 
+    # Gyro bias / accel offset while sitting on the pad; if the board is moved
+    # throughout, fall back to the last saved calibration
+    saved = ImuCalibration.load()
+    if calibrate_imu(imu, previous=saved) is None and saved is not None:
+        imu.set_calibration(saved)
+    # Barometric ground reference, also on the pad
+    lps.arm()
+
     data_dir = "logs"
     create_directory_if_needed(data_dir)
-    log_file = initialize_log_file(data_dir)
+    logger = ThreadedFlightLogger(f"{data_dir}/sensor_log.bin")
     start_time = time.ticks_ms()
 
     try:
@@ -176,6 +192,10 @@ async def main():
 
     except Exception as e:
         print(f"Main task error: {e}")
+    finally:
+        # Writes the records still in RAM and closes the file
+        logger.close()
+        print(f"Max altitude above the pad: {max_altitude:.1f} m")
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,70 @@
+# Host benchmark: BaroAltimeter table lookup (what LPS22.altitude() and
+# async.py use) vs the exact float pow formula, over the flight pressure range.
+#
+#   python bench/altitude.py [--ground 1009.6] [--samples 100000]
+#
+# Reports the worst-case difference from the exact formula by altitude band,
+# and time per sample for single calls and for a batch (altitude_into on
+# drain_into-style pressure/temperature pairs). The timings are only a sanity
+# check: on the host pow is one hardware-backed C call and beats the
+# interpreted lookup, while on the RP2040 it is a software routine costing far
+# more than the lookup's few float multiplies.
+
+import argparse
+import os
+import sys
+import time
+from array import array
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[0:0] = [os.path.join(ROOT, 'lib')]
+
+from altitude import BaroAltimeter, EXPONENT, LAPSE_RATE
+
+def exact(pressure, ground_pressure, ground_temperature):
+    return (ground_temperature + 273.15) / LAPSE_RATE * (1 - (pressure / ground_pressure) ** EXPONENT)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ground', type=float, default=1009.6, help="ground pressure, hPa")
+    parser.add_argument('--temperature', type=float, default=22.5, help="ground temperature, C")
+    parser.add_argument('--samples', type=int, default=100000)
+    options = parser.parse_args()
+
+    altimeter = BaroAltimeter()
+    altimeter.arm(options.ground, options.temperature)
+    low = options.ground * altimeter._r0
+    high = options.ground * 1.05
+    n = options.samples
+    pressures = [low + (high - low) * k / (n - 1) for k in range(n)]
+
+    start = time.perf_counter()
+    reference = [exact(p, options.ground, options.temperature) for p in pressures]
+    pow_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    table = [altimeter.altitude(p) for p in pressures]
+    table_s = time.perf_counter() - start
+
+    pairs = array('f', [0.0] * (2 * n))
+    pairs[0::2] = array('f', pressures)
+    out = array('f', [0.0] * n)
+    start = time.perf_counter()
+    altimeter.altitude_into(pairs, out, n, 2)
+    batch_s = time.perf_counter() - start
+
+    print(f"{n} samples, {low:.1f}-{high:.1f} hPa, table {len(altimeter.table) * 4} bytes")
+    print(f"  pow formula:    {pow_s * 1e9 / n:7.0f} ns/sample")
+    print(f"  table:          {table_s * 1e9 / n:7.0f} ns/sample")
+    print(f"  table, batch:   {batch_s * 1e9 / n:7.0f} ns/sample (float32 in/out)")
+
+    bands = ((-500, 0), (0, 1000), (1000, 3000), (3000, 6000), (6000, 12000))
+    for lo, hi in bands:
+        errors = [abs(t - r) for t, r in zip(table, reference) if lo <= r < hi]
+        if errors:
+            print(f"  {lo:6d} to {hi:6d} m: max error {max(errors) * 100:6.2f} cm")
+    errors = [abs(b - r) for b, r in zip(out, reference) if 0 <= r < 3000]
+    print(f"  batch (float32 pressure) 0 to 3000 m: max error {max(errors) * 100:6.2f} cm")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# Shared input data for the host benchmarks: a synthetic tumbling-board run
+# with known attitude, or recorded FlightLogger logs (e.g. logs/sensor_log.bin).
+# Each step is (dt s, gyro rad/s, accel g, mag uT, true q or None), q as
+# [w, x, y, z] body to world, world x north / z up.
+
+import math
+import os
+import random
+import struct
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+
+from flightlogger import read_header
+
+def qmul(a, b):
+    w1, x1, y1, z1 = a
+    w2, x2, y2, z2 = b
+    return [w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+            w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+            w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+            w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2]
+
+def rotate_to_body(q, v):
+    # R(q)^T v for the body-to-world q
+    w, x, y, z = q
+    return (
+        (1 - 2 * (y * y + z * z)) * v[0] + 2 * (x * y + w * z) * v[1] + 2 * (x * z - w * y) * v[2],
+        2 * (x * y - w * z) * v[0] + (1 - 2 * (x * x + z * z)) * v[1] + 2 * (y * z + w * x) * v[2],
+        2 * (x * z + w * y) * v[0] + 2 * (y * z - w * x) * v[1] + (1 - 2 * (x * x + y * y)) * v[2],
+    )
+
+def synthetic(seconds, rate, seed=1):
+    # A board turning slowly about changing axes, with gyro bias and sensor
+    # noise
+    rng = random.Random(seed)
+    dt = 1.0 / rate
+    bias = (0.01, -0.006, 0.004)
+    field = (20.0, 0.0, -45.0)        # north and down, world x north / z up
+    q = [1.0, 0.0, 0.0, 0.0]
+    samples = []
+    for k in range(int(seconds * rate)):
+        t = k * dt
+        rate_true = (0.6 * math.sin(0.7 * t), 0.5 * math.sin(0.31 * t + 1), 0.8 * math.cos(0.23 * t))
+        angle = math.sqrt(sum(r * r for r in rate_true)) * dt
+        if angle > 0:
+            s = math.sin(angle / 2) / (angle / dt)
+            q = qmul(q, [math.cos(angle / 2)] + [s * r for r in rate_true])
+        gyro = [rate_true[i] + bias[i] + rng.gauss(0, 0.005) for i in range(3)]
+        accel = [a + rng.gauss(0, 0.01) for a in rotate_to_body(q, (0.0, 0.0, 1.0))]
+        mag = [m + rng.gauss(0, 0.3) for m in rotate_to_body(q, field)]
+        samples.append((dt, gyro, accel, mag, tuple(q)))
+    return samples
+
+def recorded(path):
+    # Steps from a FlightLogger log (gyro in dps, accel in g, mag in uT)
+    samples = []
+    with open(path, 'rb') as f:
+        version, fmt, columns = read_header(f)
+        index = {name: i for i, name in enumerate(columns)}
+        size = struct.calcsize(fmt)
+        last = None
+        while True:
+            record = f.read(size)
+            if len(record) < size:
+                break
+            r = struct.unpack(fmt, record)
+            elapsed = r[index['elapsed_ms']]
+            dt = 0.05 if last is None else max((elapsed - last) / 1000.0, 1e-3)
+            last = elapsed
+            gyro = [math.radians(r[index['gyro_' + a]]) for a in 'xyz']
+            accel = [r[index['accel_' + a]] for a in 'xyz']
+            mag = [r[index['m' + a]] for a in 'xyz']
+            samples.append((dt, gyro, accel, mag, None))
+    return samples
+
+def angle_error(q, truth):
+    # Rotation angle (deg) between two attitudes
+    dot = abs(sum(a * b for a, b in zip(q, truth)))
+    return math.degrees(2 * math.acos(min(dot, 1.0)))
+
+def tilt_error(q, accel):
+    # Angle (deg) between the estimated gravity direction in the body frame
+    # and the measured accel; needs no truth, valid while not accelerating
+    w, x, y, z = q
+    gx = 2 * (x * z - w * y)
+    gy = 2 * (y * z + w * x)
+    gz = 1 - 2 * (x * x + y * y)
+    norm = math.sqrt(accel[0] * accel[0] + accel[1] * accel[1] + accel[2] * accel[2])
+    if norm == 0:
+        return 0.0
+    cos = (gx * accel[0] + gy * accel[1] + gz * accel[2]) / norm
+    return math.degrees(math.acos(max(-1.0, min(1.0, cos))))
+
+def load(logs, seconds, rate):
+    # [(name, samples)] for the given logs, or the synthetic run
+    if logs:
+        return [(path, recorded(path)) for path in logs]
+    return [(f"synthetic {seconds:g} s at {rate:g} Hz", synthetic(seconds, rate))]
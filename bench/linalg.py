@@ -0,0 +1,133 @@
+# Host benchmark: lib/linalg.py flat-array kernels vs the list-of-lists
+# helpers the filters used to carry (the matrix_* functions of the old
+# UKF/ukf.py and KalmanFilter), on the sizes the filters use. The Kalman
+# filter itself is benchmarked in bench/kalman.py.
+#
+#   python bench/linalg.py [--repeat 20000]
+#
+# Each case computes the same result both ways (checked) and reports time
+# per call. Host timings only compare the two; the native emitter the
+# kernels get on the board does not apply here.
+
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[0:0] = [os.path.join(ROOT, 'lib')]
+
+import linalg
+
+# The old helpers, as they were
+def matrix_mult(A, B):
+    return [[sum(A[i][k] * B[k][j] for k in range(len(B))) for j in range(len(B[0]))] for i in range(len(A))]
+
+def matrix_add(A, B):
+    return [[A[i][j] + B[i][j] for j in range(len(A[0]))] for i in range(len(A))]
+
+def matrix_sub(A, B):
+    return [[A[i][j] - B[i][j] for j in range(len(A[0]))] for i in range(len(A))]
+
+def matrix_transpose(A):
+    return [[A[j][i] for j in range(len(A))] for i in range(len(A[0]))]
+
+def matrix_vector_multiply(matrix, vector):
+    return [sum(matrix[i][j] * vector[j] for j in range(3)) for i in range(3)]
+
+def nested(flat, n, m):
+    return [[flat[i * m + j] for j in range(m)] for i in range(n)]
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / repeat
+
+def close(a, b, tol=1e-4):
+    return all(abs(x - y) <= tol * (1 + abs(y)) for x, y in zip(a, b))
+
+def flatten(rows):
+    return [v for row in rows for v in row]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20000)
+    options = parser.parse_args()
+    rng = random.Random(1)
+    repeat = options.repeat
+
+    cases = []
+
+    # 6x6 covariance propagation F P F^T + Q, the shape of the UKF's P
+    n = 6
+    F = array('f', [rng.uniform(-1, 1) for _ in range(n * n)])
+    P = array('f', [0.0] * (n * n))
+    linalg.syrk(array('f', [rng.uniform(-1, 1) for _ in range(n * n)]), P, n, n)
+    Q = array('f', [0.01 if i % (n + 1) == 0 else 0.0 for i in range(n * n)])
+    FP = array('f', [0.0] * (n * n))
+    out = array('f', [0.0] * (n * n))
+    Fn, Pn, Qn = nested(F, n, n), nested(P, n, n), nested(Q, n, n)
+
+    def legacy_fpft():
+        return matrix_add(matrix_mult(Fn, matrix_mult(Pn, matrix_transpose(Fn))), Qn)
+
+    def flat_fpft():
+        linalg.gemm(F, P, FP, n, n, n)
+        for k in range(n * n):
+            out[k] = Q[k]
+        return linalg.gemm(FP, F, out, n, n, n, 1.0, 1.0, True)
+
+    cases.append(("6x6 F P F^T + Q", legacy_fpft, flat_fpft, lambda: flatten(legacy_fpft())))
+
+    # 6x13 sigma-point covariance A A^T
+    A = array('f', [rng.uniform(-1, 1) for _ in range(6 * 13)])
+    An = nested(A, 6, 13)
+    S = array('f', [0.0] * 36)
+    cases.append(("6x13 A A^T", lambda: matrix_mult(An, matrix_transpose(An)),
+                  lambda: linalg.syrk(A, S, 6, 13),
+                  lambda: flatten(matrix_mult(An, matrix_transpose(An)))))
+
+    # 6x6 Cholesky + solve of 6 right-hand sides (the UKF gain); no legacy
+    # counterpart, timed for scale
+    L = array('f', P)
+    B = array('f', [rng.uniform(-1, 1) for _ in range(36)])
+    Bw = array('f', B)
+
+    def flat_gain():
+        for k in range(36):
+            L[k] = P[k]
+            Bw[k] = B[k]
+        linalg.cholesky(L, 6)
+        return linalg.cho_solve_rows(L, Bw, 6, 6)
+
+    cases.append(("6x6 cholesky + 6 solves", None, flat_gain, None))
+
+    # 3x3 matrix times vector
+    R = array('f', [rng.uniform(-1, 1) for _ in range(9)])
+    v = array('f', [0.3, -0.2, 0.9])
+    w = array('f', [0.0] * 3)
+    Rn = nested(R, 3, 3)
+    cases.append(("3x3 matrix-vector", lambda: matrix_vector_multiply(Rn, v),
+                  lambda: linalg.mat3_vec(R, v, w), lambda: matrix_vector_multiply(Rn, v)))
+
+    # 3x3 product
+    R2 = array('f', [rng.uniform(-1, 1) for _ in range(9)])
+    R2n = nested(R2, 3, 3)
+    RR = array('f', [0.0] * 9)
+    cases.append(("3x3 matrix-matrix", lambda: matrix_mult(Rn, R2n),
+                  lambda: linalg.mat3_mul(R, R2, RR), lambda: flatten(matrix_mult(Rn, R2n))))
+
+    print(f"{'case':30s} {'lists':>10s} {'linalg':>10s}")
+    for name, legacy, flat, reference in cases:
+        if reference is not None and not close(flat(), reference()):
+            raise SystemExit(f"{name}: results differ")
+        legacy_us = timed(legacy, repeat) if legacy else None
+        flat_us = timed(flat, repeat)
+        legacy_text = f"{legacy_us:7.2f} us" if legacy_us is not None else "         -"
+        print(f"{name:30s} {legacy_text:>10s} {flat_us:7.2f} us")
+
+if __name__ == '__main__':
+    main()
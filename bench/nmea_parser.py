@@ -0,0 +1,266 @@
+# Host benchmark: L86GPS byte-level parser vs the old readline()/split()
+# parser, on recorded NMEA (raw UART captures, e.g. `cat /dev/ttyUSB0 > run.nmea`)
+# or on a synthetic 1 Hz stream from the sim GPS model.
+#
+#   python bench/nmea_parser.py [capture.nmea ...] [--seconds 600] [--corrupt 0.01]
+#
+# Two measurements per parser:
+#   throughput  every byte already buffered, parse until drained (us/sentence)
+#   polling     bytes arrive at 9600 baud, one call every 100 ms as in
+#               async.py read_gps_task; reports how late each GGA is applied
+#               after its last byte arrived, and the backlog left behind
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[0:0] = [ROOT, os.path.join(ROOT, 'lib')]
+
+import sim
+sim.install()
+
+from sim.board import Board
+from sim.l86gps import L86Model
+from l86gps import L86GPS
+
+class ReplayUART:
+    # The subset of machine.UART the parsers use, over a fixed byte stream.
+    # `limit` is how many bytes have "arrived" so far.
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+        self.limit = len(data)
+
+    def any(self):
+        return self.limit - self.pos
+
+    def readline(self):
+        if self.pos >= self.limit:
+            return None
+        end = self.data.find(b'\n', self.pos, self.limit)
+        end = self.limit if end < 0 else end + 1
+        line = self.data[self.pos:end]
+        self.pos = end
+        return line
+
+    def readinto(self, buf):
+        count = min(len(buf), self.limit - self.pos)
+        if count <= 0:
+            return None
+        buf[:count] = self.data[self.pos:self.pos + count]
+        self.pos += count
+        return count
+
+    def write(self, buf):
+        return len(buf)
+
+class LegacyL86GPS:
+    # The parser L86GPS used before the byte-level state machine
+    def __init__(self, uart):
+        self.uart = uart
+
+    def read_gps(self):
+        if self.uart.any():
+            try:
+                sentence = self.uart.readline().decode('utf-8').strip()
+                if sentence.startswith('$GPGGA'):
+                    return self.parse_gpgga(sentence)
+                elif sentence.startswith('$GPRMC'):
+                    return self.parse_gprmc(sentence)
+            except Exception:
+                return None
+        return None
+
+    def parse_gpgga(self, sentence):
+        try:
+            parts = sentence.split(',')
+            if parts[6] == '0':
+                return {'type': 'GPGGA', 'status': 'no_fix'}
+            return {
+                'type': 'GPGGA',
+                'status': 'valid',
+                'time': parts[1],
+                'latitude': self._convert_to_degrees(parts[2], parts[3]),
+                'longitude': self._convert_to_degrees(parts[4], parts[5]),
+                'quality': int(parts[6]),
+                'satellites': int(parts[7]),
+                'altitude': float(parts[9]),
+                'altitude_unit': parts[10]
+            }
+        except Exception as e:
+            return {'type': 'GPGGA', 'status': 'error', 'error': str(e)}
+
+    def parse_gprmc(self, sentence):
+        try:
+            parts = sentence.split(',')
+            if parts[2] != 'A':
+                return {'type': 'GPRMC', 'status': 'invalid'}
+            return {
+                'type': 'GPRMC',
+                'status': 'valid',
+                'time': parts[1],
+                'latitude': self._convert_to_degrees(parts[3], parts[4]),
+                'longitude': self._convert_to_degrees(parts[5], parts[6]),
+                'speed': float(parts[7]),
+                'date': parts[9]
+            }
+        except Exception as e:
+            return {'type': 'GPRMC', 'status': 'error', 'error': str(e)}
+
+    def _convert_to_degrees(self, value, direction):
+        if not value:
+            return None
+        try:
+            decimal_degrees = float(value[:2]) + float(value[2:]) / 60.0
+            if direction in ['S', 'W']:
+                decimal_degrees = -decimal_degrees
+            return round(decimal_degrees, 6)
+        except Exception:
+            return None
+
+def synthetic_stream(seconds, seed=1):
+    # 1 Hz default sentence set from the sim model, climbing at 50 m/s after 60 s
+    model = L86Model(Board(seed=seed, devices=False))
+    model.position = lambda t: (43.657699 + t * 1e-6, -79.378803 - t * 1e-6,
+                                76.2 + max(t - 60, 0) * 50.0, 9)
+    out = bytearray()
+    for second in range(seconds):
+        out += model._fix_sentences(second * 1000000)
+    return bytes(out)
+
+def corrupt(data, rate, seed=1):
+    import random
+    rng = random.Random(seed)
+    data = bytearray(data)
+    for _ in range(int(len(data) * rate / 80)):
+        data[rng.randrange(len(data))] ^= 1 << rng.randrange(7)
+    return bytes(data)
+
+class RecordingL86GPS(L86GPS):
+    # Records the UTC time of every valid GGA applied
+    def __init__(self):
+        self.applied = []
+        super().__init__()
+
+    def _apply_gga(self, line, c):
+        result = super()._apply_gga(line, c)
+        if self.fix.status == 'valid':
+            self.applied.append(self.fix.utc_ms)
+        return result
+
+def make_parser(uart):
+    gps = RecordingL86GPS()
+    gps.uart = uart
+    del gps.applied[:]
+    return gps
+
+def throughput(data):
+    sentences = data.count(b'$')
+
+    uart = ReplayUART(data)
+    legacy = LegacyL86GPS(uart)
+    ggas = 0
+    start = time.perf_counter()
+    while uart.any():
+        result = legacy.read_gps()
+        if result and result['type'] == 'GPGGA' and result['status'] == 'valid':
+            ggas += 1
+    legacy_s = time.perf_counter() - start
+
+    uart = ReplayUART(data)
+    gps = make_parser(uart)
+    start = time.perf_counter()
+    gps.update()
+    new_s = time.perf_counter() - start
+
+    print(f"throughput ({sentences} sentences, {len(data)} bytes)")
+    print(f"  readline/split: {legacy_s * 1e6 / sentences:8.1f} us/sentence, {ggas} valid GGA")
+    print(f"  byte parser:    {new_s * 1e6 / sentences:8.1f} us/sentence, {gps.fix.updates} GGA/RMC applied, "
+          f"{gps.checksum_errors} checksum errors rejected")
+
+def _utc_ms(text):
+    # hhmmss.sss -> ms since midnight, to match parsed GGAs with the stream
+    return round((int(text[0:2]) * 3600 + int(text[2:4]) * 60 + float(text[4:])) * 1000)
+
+def polling(data, baudrate=9600, interval=0.1):
+    # Virtual time: bytes arrive at the line rate, parser runs every interval.
+    # A GGA is available once its last byte has arrived; latency is measured
+    # from then to the poll that applies it.
+    byte_s = 10.0 / baudrate
+    available = {}
+    pos = data.find(b'$GPGGA,')
+    while pos >= 0:
+        end = data.find(b'\n', pos)
+        if end < 0:
+            break
+        try:
+            available.setdefault(_utc_ms(data[pos + 7:data.index(b',', pos + 7)].decode()),
+                                 (end + 1) * byte_s)
+        except ValueError:
+            pass
+        pos = data.find(b'$GPGGA,', end)
+
+    def run(poll):
+        uart = ReplayUART(data)
+        uart.limit = 0
+        latencies = []
+        t = 0.0
+        total = len(data) * byte_s
+        while t < total + interval:
+            uart.limit = min(len(data), int(t / byte_s))
+            for key in poll(uart):
+                if key in available:
+                    latencies.append(t - available[key])
+            t += interval
+        return latencies, uart.limit - uart.pos
+
+    legacy = LegacyL86GPS(None)
+    def poll_legacy(uart):
+        legacy.uart = uart
+        result = legacy.read_gps()
+        if result and result['type'] == 'GPGGA' and result['status'] == 'valid':
+            try:
+                return (_utc_ms(result['time']),)
+            except ValueError:
+                pass    # corrupted sentence accepted: no checksum check
+        return ()
+
+    gps = make_parser(None)
+    def poll_new(uart):
+        gps.uart = uart
+        del gps.applied[:]
+        gps.update()
+        return gps.applied
+
+    print(f"polling every {interval * 1000:.0f} ms at {baudrate} baud ({len(available)} GGA sentences)")
+    for name, poll in (("readline/split", poll_legacy), ("byte parser", poll_new)):
+        latencies, backlog = run(poll)
+        if latencies:
+            mean = sum(latencies) / len(latencies)
+            print(f"  {name + ':':16s}{len(latencies):6d} fixes, latency mean {mean * 1000:8.1f} ms, "
+                  f"max {max(latencies) * 1000:8.1f} ms, {backlog} bytes still queued")
+        else:
+            print(f"  {name + ':':16s}     0 fixes")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('captures', nargs='*', help="raw NMEA captures")
+    parser.add_argument('--seconds', type=int, default=600, help="synthetic stream length")
+    parser.add_argument('--corrupt', type=float, default=0.0,
+                        help="bit flips per 80 bytes, to exercise checksum rejection")
+    options = parser.parse_args()
+
+    if options.captures:
+        data = b''.join(open(path, 'rb').read() for path in options.captures)
+    else:
+        data = synthetic_stream(options.seconds)
+    if options.corrupt:
+        data = corrupt(data, options.corrupt)
+
+    throughput(data)
+    polling(data)
+
+if __name__ == '__main__':
+    main()
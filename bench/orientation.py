@@ -0,0 +1,129 @@
+# Host benchmark: every orientation filter over the same data, through the
+# fusion package's step(accel, gyro, mag, dt) interface. Data is a
+# synthetic tumbling-board run with known attitude or recorded FlightLogger
+# logs (bench/datasets.py).
+#
+#   python bench/orientation.py [sensor_log.bin ...] [--seconds 60] [--rate 100]
+#
+# Reports time per step and, after the first 10% of the run, the mean tilt
+# error (estimated gravity vs measured accel, needs no truth) and, on
+# synthetic data, the full attitude error against the truth. Filters without
+# a magnetometer cannot observe yaw, so only their tilt error is comparable.
+# 'legacy' is the MadgwickFilter async.py used to import from gyrolib, kept
+# here as it was. Host timings only compare the filters: on the RP2040 all
+# are interpreted and about two orders of magnitude slower.
+
+import argparse
+import math
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[0:0] = [os.path.join(ROOT, 'lib'), os.path.join(ROOT, 'UKF')]
+
+from fusion import GyroIntegrator, Madgwick, Quaternion
+from ukf import UnscentedKalmanFilter
+from datasets import angle_error, load, tilt_error
+
+class LegacyMadgwickFilter:
+    # gyrotoquat/betterfilterlib.py's MadgwickFilter, condensed
+    def __init__(self, beta=0.03):
+        self.beta = beta
+        self.q = Quaternion()
+        self.deadband = 0.015
+
+    def update(self, gyro, accel, dt):
+        gyro = [0.0 if abs(x) < self.deadband else x for x in gyro]
+        gx = gyro[0] * math.pi / 45.0
+        gy = gyro[1] * math.pi / 45.0
+        gz = gyro[2] * math.pi / 45.0
+        norm = math.sqrt(accel[0]**2 + accel[1]**2 + accel[2]**2)
+        if norm < 1e-5:
+            return
+        ax = accel[0] / norm
+        ay = accel[1] / norm
+        az = accel[2] / norm
+        qw, qx, qy, qz = self.q.w, self.q.x, self.q.y, self.q.z
+        _2qw = 2.0 * qw
+        _2qx = 2.0 * qx
+        _2qy = 2.0 * qy
+        _2qz = 2.0 * qz
+        f = [2.0*(qx*qz - qw*qy) - ax, 2.0*(qw*qx + qy*qz) - ay, 2.0*(0.5 - qx*qx - qy*qy) - az]
+        J = [[-_2qy, _2qz, -_2qw, _2qx], [_2qx, _2qw, _2qz, _2qy], [0.0, -4.0*qx, -4.0*qy, 0.0]]
+        gradient = [0.0, 0.0, 0.0, 0.0]
+        for i in range(3):
+            for j in range(4):
+                gradient[j] += J[i][j] * f[i]
+        norm = math.sqrt(sum(x*x for x in gradient))
+        if norm > 0:
+            gradient = [x/norm for x in gradient]
+        rate = dt * (1.0 - self.beta)
+        self.q.w += rate * (-qx*gx - qy*gy - qz*gz) - self.beta * gradient[0]
+        self.q.x += rate * (qw*gx + qy*gz - qz*gy) - self.beta * gradient[1]
+        self.q.y += rate * (qw*gy - qx*gz + qz*gx) - self.beta * gradient[2]
+        self.q.z += rate * (qw*gz + qx*gy - qy*gx) - self.beta * gradient[3]
+        self.q.normalize()
+
+    def step(self, accel, gyro, mag=None, dt=0.01):
+        self.update(gyro, accel, dt)
+
+class Without:
+    # A filter with the magnetometer withheld
+    def __init__(self, f):
+        self.f = f
+
+    @property
+    def q(self):
+        return self.f.q
+
+    def step(self, accel, gyro, mag=None, dt=0.01):
+        self.f.step(accel, gyro, None, dt)
+
+FILTERS = [
+    ('legacy', lambda: LegacyMadgwickFilter(beta=0.03), False),
+    ('gyro', GyroIntegrator, False),
+    ('madgwick', lambda: Madgwick(beta=0.05), False),
+    ('madgwick+mag', lambda: Madgwick(beta=0.05), True),
+    ('ukf', UnscentedKalmanFilter, False),
+    ('ukf+mag', UnscentedKalmanFilter, True),
+]
+
+def run(name, make, with_mag, samples):
+    f = make()
+    if not with_mag:
+        f = Without(f)
+    tilt = []
+    attitude = []
+    elapsed = 0.0
+    for dt, gyro, accel, mag, truth in samples:
+        start = time.perf_counter()
+        f.step(accel, gyro, mag, dt)
+        elapsed += time.perf_counter() - start
+        tilt.append(tilt_error(f.q, accel))
+        if truth is not None:
+            attitude.append(angle_error(f.q, truth))
+    settled = len(samples) // 10
+    line = f"  {name:14s} {elapsed * 1e6 / len(samples):7.1f} us/step"
+    line += f"  tilt {sum(tilt[settled:]) / len(tilt[settled:]):7.2f} deg"
+    if attitude:
+        line += f"  attitude {sum(attitude[settled:]) / len(attitude[settled:]):7.2f} deg"
+    print(line)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('logs', nargs='*', help="FlightLogger logs; synthetic data if none")
+    parser.add_argument('--seconds', type=float, default=60)
+    parser.add_argument('--rate', type=float, default=100, help="synthetic step rate, Hz")
+    options = parser.parse_args()
+
+    for name, samples in load(options.logs, options.seconds, options.rate):
+        # step() takes gyro in deg/s
+        samples = [(dt, [math.degrees(g) for g in gyro], accel, mag, truth)
+                   for dt, gyro, accel, mag, truth in samples]
+        print(f"{name}: {len(samples)} steps")
+        for filter_name, make, with_mag in FILTERS:
+            run(filter_name, make, with_mag, samples)
+
+if __name__ == '__main__':
+    main()
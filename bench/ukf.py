@@ -0,0 +1,117 @@
+# Host benchmark: UKF/ukf.py error-state UKF vs the placeholder filter it
+# replaced, on recorded IMU data (FlightLogger logs, e.g. logs/sensor_log.bin)
+# or on a synthetic tumbling-board run with known attitude (bench/datasets.py).
+#
+#   python bench/ukf.py [sensor_log.bin ...] [--seconds 60] [--rate 100]
+#
+# Reports time per predict + update step for each filter and, on synthetic
+# data, the attitude error against the truth. The legacy filter prints its
+# residuals on every update; that output is discarded but its cost counted,
+# as it was on the board. Host timings only compare the two: on the RP2040
+# both are interpreted and about two orders of magnitude slower.
+
+import argparse
+import contextlib
+import io
+import math
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[0:0] = [os.path.join(ROOT, 'UKF'), os.path.join(ROOT, 'lib')]
+
+from ukf import UnscentedKalmanFilter
+from datasets import angle_error, load
+
+class LegacyUKF:
+    # The UnscentedKalmanFilter that UKF/ukf.py used to contain, condensed:
+    # same list-building helpers, fixed gain and residual print
+    def __init__(self):
+        self.q = [1.0, 0.0, 0.0, 0.0]
+        self.bias = [0.0, 0.0, 0.0]
+        self.P = [[0.1 if i == j else 0.0 for j in range(6)] for i in range(6)]
+
+    @staticmethod
+    def _qmul(q1, q2):
+        w1, x1, y1, z1 = q1
+        w2, x2, y2, z2 = q2
+        return [w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+                w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+                w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+                w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2]
+
+    @staticmethod
+    def _normalize(q):
+        norm = math.sqrt(sum([i * i for i in q]))
+        return [i / norm for i in q]
+
+    def predict(self, dt, gyro):
+        omega = [gyro[i] - self.bias[i] for i in range(3)]
+        omega_norm = math.sqrt(sum([w * w for w in omega]))
+        if omega_norm > 1e-6:
+            sin_term = math.sin(omega_norm * dt / 2) / omega_norm
+            delta_q = [math.cos(omega_norm * dt / 2), sin_term * omega[0],
+                       sin_term * omega[1], sin_term * omega[2]]
+        else:
+            delta_q = [1.0, 0.0, 0.0, 0.0]
+        self.q = self._normalize(self._qmul(self.q, delta_q))
+        scaled = [[element * 0.001 for element in row] for row in self.P]
+        self.P = [[self.P[i][j] + scaled[i][j] for j in range(6)] for i in range(6)]
+
+    def update(self, accel, mag):
+        accel_norm = math.sqrt(sum([a * a for a in accel]))
+        mag_norm = math.sqrt(sum([m * m for m in mag]))
+        accel = [a / accel_norm for a in accel]
+        mag = [m / mag_norm for m in mag]
+        w, x, y, z = self.q
+        R = [[1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+             [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+             [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)]]
+        accel_expected = [sum(R[i][j] * [0.0, 0.0, 1.0][j] for j in range(3)) for i in range(3)]
+        mag_expected = [sum(R[i][j] * [1.0, 0.0, 0.0][j] for j in range(3)) for i in range(3)]
+        residual = ([accel[i] - accel_expected[i] for i in range(3)]
+                    + [mag[i] - mag_expected[i] for i in range(3)])
+        print("Residuals:", residual)
+        update = [0.1 * r for r in residual]
+        dq = update[:3] + [0.0]
+        self.q = self._normalize([self.q[i] + dq[i] for i in range(4)])
+        self.bias = [self.bias[i] + update[3 + i] for i in range(3)]
+
+def run(name, make, samples):
+    ukf = make()
+    errors = []
+    sink = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        for dt, gyro, accel, mag, truth in samples:
+            ukf.predict(dt, gyro)
+            ukf.update(accel, mag)
+            if truth is not None:
+                errors.append(angle_error(ukf.q, truth))
+            sink.seek(0)
+            sink.truncate()
+    elapsed = time.perf_counter() - start
+    line = f"  {name:8s} {elapsed * 1e6 / len(samples):7.1f} us/step"
+    if errors:
+        settled = errors[len(errors) // 10:]
+        line += (f", attitude error mean {sum(settled) / len(settled):6.2f} deg, "
+                 f"max {max(settled):6.2f} deg (after the first 10%)")
+    print(line)
+    return ukf
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('logs', nargs='*', help="FlightLogger logs; synthetic data if none")
+    parser.add_argument('--seconds', type=float, default=60)
+    parser.add_argument('--rate', type=float, default=100, help="synthetic step rate, Hz")
+    options = parser.parse_args()
+
+    for name, samples in load(options.logs, options.seconds, options.rate):
+        print(f"{name}: {len(samples)} steps")
+        run('legacy', LegacyUKF, samples)
+        ukf = run('ukf', UnscentedKalmanFilter, samples)
+        print(f"  ukf gyro bias estimate {[round(b, 4) for b in ukf.bias]} rad/s")
+
+if __name__ == '__main__':
+    main()
@@ -1,106 +1,6 @@
 import time, sys
 from lib.icm42670 import read_who_am_i, configure_sensor, read_accel_data, read_gyro_data, set_accel_scale, set_gyro_scale
-from math import sqrt, pi, atan2
-
-class Quaternion:
-    def __init__(self, w=1.0, x=0.0, y=0.0, z=0.0):
-        self.w = w
-        self.x = x
-        self.y = y
-        self.z = z
-    
-    def __mul__(self, other):
-        if isinstance(other, Quaternion):
-            w = self.w*other.w - self.x*other.x - self.y*other.y - self.z*other.z
-            x = self.w*other.x + self.x*other.w + self.y*other.z - self.z*other.y
-            y = self.w*other.y - self.x*other.z + self.y*other.w + self.z*other.x
-            z = self.w*other.z + self.x*other.y - self.y*other.x + self.z*other.w
-            return Quaternion(w, x, y, z)
-        return Quaternion(self.w * other, self.x * other, self.y * other, self.z * other)
-    
-    def normalize(self):
-        norm = sqrt(self.w*self.w + self.x*self.x + self.y*self.y + self.z*self.z)
-        if norm > 0:
-            self.w /= norm
-            self.x /= norm
-            self.y /= norm
-            self.z /= norm
-
-class MovingAverageFilter:
-    def __init__(self, window_size=12):  # Increased window size for better stability
-        self.window_size = window_size
-        self.values = []
-
-    def apply(self, quaternion):
-        self.values.append([quaternion.w, quaternion.x, quaternion.y, quaternion.z])
-        if len(self.values) > self.window_size:
-            self.values.pop(0)
-        avg = [sum(x)/len(self.values) for x in zip(*self.values)]
-        return Quaternion(avg[0], avg[1], avg[2], avg[3])
-
-class MadgwickFilter:
-    def __init__(self, beta=0.03):  # Further reduced beta for more stability
-        self.beta = beta
-        self.q = Quaternion()
-        self.deadband = 0.015  # Increased deadband threshold
-    
-    def update(self, gyro, accel, dt):
-        # Apply deadband to gyroscope data
-        gyro = [0.0 if abs(x) < self.deadband else x for x in gyro]
-        
-        # Scale gyroscope data
-        gx = gyro[0] * pi / 45.0
-        gy = gyro[1] * pi / 45.0
-        gz = gyro[2] * pi / 45.0
-        
-        # Normalize accelerometer data with improved threshold
-        norm = sqrt(accel[0]**2 + accel[1]**2 + accel[2]**2)
-        if norm < 1e-5:  # Increased minimum threshold
-            return
-        ax = accel[0] / norm
-        ay = accel[1] / norm
-        az = accel[2] / norm
-        
-        # Gradient descent algorithm
-        qw, qx, qy, qz = self.q.w, self.q.x, self.q.y, self.q.z
-        
-        # Auxiliary variables
-        _2qw = 2.0 * qw
-        _2qx = 2.0 * qx
-        _2qy = 2.0 * qy
-        _2qz = 2.0 * qz
-        
-        # Gradient descent step
-        f = [
-            2.0*(qx*qz - qw*qy) - ax,
-            2.0*(qw*qx + qy*qz) - ay,
-            2.0*(0.5 - qx*qx - qy*qy) - az
-        ]
-        
-        J = [
-            [-_2qy, _2qz, -_2qw, _2qx],
-            [_2qx, _2qw, _2qz, _2qy],
-            [0.0, -4.0*qx, -4.0*qy, 0.0]
-        ]
-        
-        gradient = [0.0, 0.0, 0.0, 0.0]
-        for i in range(3):
-            for j in range(4):
-                gradient[j] += J[i][j] * f[i]
-        
-        # Normalize gradient
-        norm = sqrt(sum(x*x for x in gradient))
-        if norm > 0:
-            gradient = [x/norm for x in gradient]
-        
-        # Apply feedback step with improved rate calculation
-        rate = dt * (1.0 - self.beta)
-        self.q.w += rate * (-qx*gx - qy*gy - qz*gz) - self.beta * gradient[0]
-        self.q.x += rate * (qw*gx + qy*gz - qz*gy) - self.beta * gradient[1]
-        self.q.y += rate * (qw*gy - qx*gz + qz*gx) - self.beta * gradient[2]
-        self.q.z += rate * (qw*gz + qx*gy - qy*gx) - self.beta * gradient[3]
-        
-        self.q.normalize()
+from fusion import Madgwick, MovingAverageFilter
 
 def main():
     if read_who_am_i() == 0x67:
@@ -108,7 +8,7 @@ def main():
         set_accel_scale(3)
         set_gyro_scale(1)
         
-        madgwick = MadgwickFilter(beta=0.03)  # Using reduced beta
+        madgwick = Madgwick(beta=0.03)
         maf = MovingAverageFilter(window_size=12)  # Using increased window size
         last_time = time.ticks_ms()
         
@@ -120,7 +20,7 @@ def main():
             gyro = read_gyro_data()
             accel = read_accel_data()
             
-            madgwick.update(gyro, accel, dt)
+            madgwick.step(accel, gyro, None, dt)
             smoothed_quaternion = maf.apply(madgwick.q)
             
             sys.stdout.write("{:.3f},{:.3f},{:.3f},{:.3f}\n".format(
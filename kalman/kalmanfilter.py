@@ -1,57 +1,102 @@
+# kalmanfilter.py
+#
+# Per-axis angle / angular velocity Kalman filter with F = [[1, dt], [0, 1]]
+# and H = [1, 0]. With those fixed the matrix products collapse to a handful
+# of scalar formulas; they are written in the same operation order as
+# x = F x, P = F P F^T + Q, K = P H^T (1 / S), P = (I - K H) P, so the
+# results match the generic matrix form bit for bit. State and covariance
+# are plain float attributes: no lists or arrays are built per step.
+#
+# KalmanBank3 runs three such filters (x, y, z) in one call.
+
 class KalmanFilter:
     def __init__(self, dt, process_noise, measurement_noise):
         # Time step
         self.dt = dt
-        
-        # State vector [angle, angular velocity]
-        self.x = [[0.0], [0.0]]
-        
-        # State transition matrix
-        self.F = [[1, dt], [0, 1]]
-        
-        # Measurement matrix
-        self.H = [[1, 0]]
-        
-        # Process noise covariance
-        self.Q = [[process_noise, 0], [0, process_noise]]
-        
-        # Measurement noise covariance
-        self.R = [[measurement_noise]]
-        
-        # Covariance matrix
-        self.P = [[1, 0], [0, 1]]
-        
-    def predict(self):
-        # Prediction step
-        self.x = self._matrix_mult(self.F, self.x)
-        Ft = self._matrix_transpose(self.F)
-        self.P = self._matrix_add(
-            self._matrix_mult(self.F, self._matrix_mult(self.P, Ft)),
-            self.Q
-        )
+        self.q = process_noise
+        self.r = measurement_noise
 
-    def update(self, z):
-        # Measurement update step
-        y = self._matrix_sub(z, self._matrix_mult(self.H, self.x))
-        S = self._matrix_add(self._matrix_mult(self.H, self._matrix_mult(self.P, self._matrix_transpose(self.H))), self.R)
-        K = self._matrix_mult(self.P, self._matrix_mult(self._matrix_transpose(self.H), [[1 / S[0][0]]]))  # Kalman gain
-        self.x = self._matrix_add(self.x, self._matrix_mult(K, y))
-        I = [[1, 0], [0, 1]]  # Identity matrix
-        self.P = self._matrix_mult(self._matrix_sub(I, self._matrix_mult(K, self.H)), self.P)
+        # State [angle, angular velocity]
+        self.angle = 0.0
+        self.rate = 0.0
 
-    def get_state(self):
-        return self.x
+        # Covariance [[p00, p01], [p10, p11]]
+        self.p00 = 1.0
+        self.p01 = 0.0
+        self.p10 = 0.0
+        self.p11 = 1.0
 
-    # Helper matrix functions
-    def _matrix_add(self, A, B):
-        return [[A[i][j] + B[i][j] for j in range(len(A[0]))] for i in range(len(A))]
+    def predict(self):
+        dt = self.dt
+        self.angle = self.angle + dt * self.rate
+        a = self.p00 + self.p01 * dt
+        b = self.p10 + self.p11 * dt
+        self.p00 = a + dt * b + self.q
+        self.p01 = self.p01 + dt * self.p11
+        self.p10 = b
+        self.p11 = self.p11 + self.q
 
-    def _matrix_sub(self, A, B):
-        return [[A[i][j] - B[i][j] for j in range(len(A[0]))] for i in range(len(A))]
+    def update(self, z):
+        # Measurement update with the measured angle z
+        y = z - self.angle
+        inv = 1 / (self.p00 + self.r)
+        k0 = self.p00 * inv
+        k1 = self.p10 * inv
+        self.angle = self.angle + k0 * y
+        self.rate = self.rate + k1 * y
+        p00 = self.p00
+        p01 = self.p01
+        self.p00 = (1 - k0) * p00
+        self.p01 = (1 - k0) * p01
+        self.p10 = self.p10 - k1 * p00
+        self.p11 = self.p11 - k1 * p01
 
-    def _matrix_mult(self, A, B):
-        return [[sum(A[i][k] * B[k][j] for k in range(len(B))) for j in range(len(B[0]))] for i in range(len(A))]
+    def get_state(self):
+        return self.angle, self.rate
 
-    def _matrix_transpose(self, A):
-        return [[A[j][i] for j in range(len(A))] for i in range(len(A[0]))]
+class KalmanBank3:
+    # Three independent KalmanFilters with the same dt and noise, stepped
+    # together. State and covariance are per-axis lists allocated once.
+    def __init__(self, dt, process_noise, measurement_noise):
+        self.dt = dt
+        self.q = process_noise
+        self.r = measurement_noise
+        self.angle = [0.0, 0.0, 0.0]
+        self.rate = [0.0, 0.0, 0.0]
+        self.p00 = [1.0, 1.0, 1.0]
+        self.p01 = [0.0, 0.0, 0.0]
+        self.p10 = [0.0, 0.0, 0.0]
+        self.p11 = [1.0, 1.0, 1.0]
 
+    def step(self, z):
+        # predict() then update() on each axis, z[i] the measured angle of
+        # axis i. Returns the angle list (updated in place).
+        dt = self.dt
+        q = self.q
+        r = self.r
+        angle = self.angle
+        rate = self.rate
+        p00 = self.p00
+        p01 = self.p01
+        p10 = self.p10
+        p11 = self.p11
+        for i in range(3):
+            # Predict
+            x0 = angle[i] + dt * rate[i]
+            a = p00[i] + p01[i] * dt
+            b = p10[i] + p11[i] * dt
+            c00 = a + dt * b + q
+            c01 = p01[i] + dt * p11[i]
+            c11 = p11[i] + q
+            # Update
+            y = z[i] - x0
+            inv = 1 / (c00 + r)
+            k0 = c00 * inv
+            k1 = b * inv
+            angle[i] = x0 + k0 * y
+            rate[i] = rate[i] + k1 * y
+            p00[i] = (1 - k0) * c00
+            p01[i] = (1 - k0) * c01
+            p10[i] = b - k1 * c00
+            p11[i] = c11 - k1 * c01
+        return angle
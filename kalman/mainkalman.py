@@ -1,6 +1,6 @@
 from machine import I2C, Pin
 import time
-from kalmanfilter import KalmanFilter
+from kalmanfilter import KalmanBank3
 import sys
 
 # ICM-42670-P I2C address and registers
@@ -39,13 +39,12 @@ def read_gyro_data():
     raw_gyro_z = raw_gyro_z - 65536 if raw_gyro_z > 32767 else raw_gyro_z
     return (raw_gyro_x / 131, raw_gyro_y / 131, raw_gyro_z / 131)
 
-# Initialize Kalman filters for each axis
+# Initialize one Kalman filter per axis: pitch (X), roll (Y), yaw (Z)
 dt = 0.01  # Time step in seconds
 process_noise = 0.01
 measurement_noise = 1.0
-kf_x = KalmanFilter(dt, process_noise, measurement_noise)  # Pitch (X)
-kf_y = KalmanFilter(dt, process_noise, measurement_noise)  # Roll (Y)
-kf_z = KalmanFilter(dt, process_noise, measurement_noise)  # Yaw (Z)
+kf = KalmanBank3(dt, process_noise, measurement_noise)
+z = [0.0, 0.0, 0.0]
 
 def main():
     if read_register_int(ICM42670_WHO_AM_I) == 0x67:
@@ -56,20 +55,13 @@ def main():
             accel = read_accel_data()
             gyro = read_gyro_data()
             
-            # Predict step for each axis
-            kf_x.predict()
-            kf_y.predict()
-            kf_z.predict()
+            # Measurements for each axis
+            z[0] = accel[0]  # X-axis (pitch)
+            z[1] = accel[1]  # Y-axis (roll)
+            z[2] = gyro[2]   # Z-axis (yaw) uses gyro only since accel doesn't capture rotation around z-axis
 
-            # Update step for each axis using respective accelerometer data
-            kf_x.update([[accel[0]]])  # X-axis (pitch)
-            kf_y.update([[accel[1]]])  # Y-axis (roll)
-            kf_z.update([[gyro[2]]])   # Z-axis (yaw) uses gyro only since accel doesn't capture rotation around z-axis
-            
-            # Get estimated angles from each Kalman filter
-            estimated_pitch = kf_x.get_state()[0][0]
-            estimated_roll = kf_y.get_state()[0][0]
-            estimated_yaw = kf_z.get_state()[0][0]
+            # Predict and update all three axes, get the estimated angles
+            estimated_pitch, estimated_roll, estimated_yaw = kf.step(z)
 
             # Print the estimated angles
             print(f"Pitch: {estimated_pitch:.6f}, Roll: {estimated_roll:.6f}, Yaw: {estimated_yaw:.6f}")
@@ -0,0 +1,90 @@
+# altitude.py
+#
+# Barometric altitude above a ground reference without a float pow per
+# sample. With the standard atmosphere lapse rate
+#
+#   h = (T0 / L) * (1 - (p / p0) ** (1 / 5.257))
+#
+# where p0, T0 are the pressure and temperature at the reference (captured
+# with arm() on the pad). The bracket depends only on p / p0, so it is
+# tabulated once over the ratios a flight can see and linearly interpolated:
+# a couple of table loads and float multiplies per sample instead of a
+# software pow on the FPU-less RP2040. With the default 0.002 step the table
+# is 1.7 kB and the error stays under 5 cm up to 12 km (under 1 cm below
+# 3 km), well below the LPS22's own noise.
+
+from array import array
+
+LAPSE_RATE = 0.0065      # K/m
+EXPONENT = 1 / 5.257
+
+class BaroAltimeter:
+    def __init__(self, ratio_min=0.25, ratio_max=1.1, step=0.002):
+        # p / p0 from ratio_min (~11 km above a sea-level pad) to ratio_max
+        # (below the pad); outside it the end segments are extrapolated
+        if not 0 < ratio_min < 1 < ratio_max or step <= 0:
+            raise ValueError("Invalid altitude table range")
+        n = int((ratio_max - ratio_min) / step + 1.5)
+        self.table = array('f', [1.0 - (ratio_min + i * step) ** EXPONENT for i in range(n)])
+        self._r0 = ratio_min
+        self._inv_step = 1.0 / step
+        self._last = n - 2
+        self.arm(1013.25, 15.0)
+
+    def arm(self, pressure, temperature=15.0):
+        # Ground reference: pressure (hPa) and temperature (C) on the pad.
+        # Altitudes are relative to it from now on.
+        if pressure <= 0:
+            raise ValueError("Invalid ground pressure")
+        self.ground_pressure = pressure
+        self.ground_temperature = temperature
+        self._inv_p0 = 1.0 / pressure
+        self._scale = (temperature + 273.15) / LAPSE_RATE
+
+    def arm_from(self, samples, count, stride=2):
+        # Average count samples as the ground reference. With stride=2 these
+        # are the (pressure, temperature) pairs from LPS22.drain_into().
+        if count <= 0:
+            raise ValueError("No samples to arm from")
+        pressure = 0.0
+        temperature = 0.0
+        for k in range(count):
+            pressure += samples[k * stride]
+            if stride > 1:
+                temperature += samples[k * stride + 1]
+        self.arm(pressure / count, temperature / count if stride > 1 else self.ground_temperature)
+
+    def altitude(self, pressure):
+        # Metres above the ground reference
+        x = (pressure * self._inv_p0 - self._r0) * self._inv_step
+        i = int(x)
+        if i < 0:
+            i = 0
+        elif i > self._last:
+            i = self._last
+        table = self.table
+        y = table[i]
+        return self._scale * (y + (table[i + 1] - y) * (x - i))
+
+    def altitude_into(self, pressures, out, count=None, stride=1):
+        # out[k] = altitude(pressures[k * stride]) for k < count (default: as
+        # many as fit in out). stride=2 takes the pressure/temperature pairs
+        # from LPS22.drain_into() as they are. Returns count.
+        if count is None:
+            count = len(out)
+        table = self.table
+        inv_p0 = self._inv_p0
+        r0 = self._r0
+        inv_step = self._inv_step
+        last = self._last
+        scale = self._scale
+        for k in range(count):
+            x = (pressures[k * stride] * inv_p0 - r0) * inv_step
+            i = int(x)
+            if i < 0:
+                i = 0
+            elif i > last:
+                i = last
+            y = table[i]
+            out[k] = scale * (y + (table[i + 1] - y) * (x - i))
+        return count
@@ -0,0 +1,120 @@
+# asyncrfm9x.py
+#
+# asyncio receive loop for the RFM9x driver, for ground stations:
+#
+#   radio = AsyncRFM9x(rfm9x, irq=Pin(21, Pin.IN))
+#   radio.start()
+#   async for packet in radio.packets():
+#       ...
+#
+# The radio is kept in RX continuous mode the whole time. A background task
+# copies each packet out of the FIFO as soon as DIO0 (or a short poll) reports
+# rx done, so the chip is listening again immediately, and queues it in a
+# fixed ring of preallocated slots. If the consumer falls behind, the oldest
+# queued packet is discarded and counted in `dropped`. The ring has one slot
+# more than queue_size, so the packet last handed out is never the next one
+# written.
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+class AsyncRFM9x:
+    def __init__(self, rfm9x, irq=None, queue_size=8, poll_ms=2, with_header=False):
+        # irq: Pin wired to DIO0. Do not also pass it to RFM9x(irq=...), the
+        # receive loop owns the pin interrupt.
+        self.radio = rfm9x
+        self.poll_ms = poll_ms
+        self.with_header = with_header
+
+        self.queue_size = queue_size
+        self._slots = [bytearray(256) for _ in range(queue_size + 1)]
+        self._views = [memoryview(slot) for slot in self._slots]
+        self._lengths = [0] * (queue_size + 1)
+        self._rssi = [0] * (queue_size + 1)
+        self._head = 0   # next slot to fill
+        self._tail = 0   # next slot to hand out
+        self._count = 0
+
+        self.received = 0
+        self.dropped = 0
+        self.last_rssi = 0
+
+        self._ready = asyncio.Event()
+        self._irq = irq
+        self._irq_flag = None
+        self._task = None
+        if irq is not None:
+            self._irq_flag = asyncio.ThreadSafeFlag()
+            irq.irq(trigger=irq.IRQ_RISING, handler=self._handle_interrupt)
+
+    def _handle_interrupt(self, pin):
+        self._irq_flag.set()
+
+    def start(self):
+        # Put the radio in RX continuous mode and start the receive task
+        self.radio.listen()
+        if self._task is None:
+            self._task = asyncio.create_task(self._receiver())
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.radio.idle()
+
+    async def _receiver(self):
+        radio = self.radio
+        while True:
+            if self._irq_flag is not None:
+                await self._irq_flag.wait()
+            else:
+                await asyncio.sleep_ms(self.poll_ms)
+            while radio.rx_done():
+                self._service()
+
+    def _service(self):
+        # Copy the packet in the FIFO into the next slot. read_fifo_into also
+        # clears the IRQ flags (even for a CRC error or rejected packet) and
+        # records the packet's RSSI; the radio stays in RX continuous mode.
+        slot = self._head
+        length = self.radio.read_fifo_into(self._slots[slot], with_header=self.with_header)
+        if length == 0:
+            return
+        self._lengths[slot] = length
+        self._rssi[slot] = self.radio.last_rssi
+        self._head = (slot + 1) % len(self._slots)
+        self.received += 1
+        if self._count == self.queue_size:
+            # queue full: the new packet went into the spare slot, drop the
+            # oldest so its slot becomes the spare
+            self._tail = (self._tail + 1) % len(self._slots)
+            self.dropped += 1
+        else:
+            self._count += 1
+        self._ready.set()
+
+    def pending(self):
+        return self._count
+
+    def packets(self):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        # Returns a memoryview of the next packet. Its slot is written again
+        # only after queue_size - pending() more packets have arrived (at
+        # least one, even when the queue was full), so use or copy it before
+        # awaiting again.
+        while self._count == 0:
+            self._ready.clear()
+            await self._ready.wait()
+        slot = self._tail
+        self._tail = (slot + 1) % len(self._slots)
+        self._count -= 1
+        self.last_rssi = self._rssi[slot]
+        return self._views[slot][:self._lengths[slot]]
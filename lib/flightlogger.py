@@ -0,0 +1,238 @@
+# flightlogger.py
+#
+# Binary flight log writer. Records are fixed-size structs packed into a
+# preallocated RAM ring and written to flash one whole block at a time, with
+# the file kept open between writes. The file starts with a self-describing
+# header (record struct format + column names) so logs can be decoded on the
+# host without knowing which firmware wrote them:
+#
+#   python lib/flightlogger.py logs/sensor_log.bin sensor_log.csv
+#
+# ThreadedFlightLogger moves the flash writes onto the second RP2040 core so
+# erase/program latency never stalls the sampling loop. flush() writes the
+# records of the block still being filled, so a power cut loses at most the
+# records since the last flush; the threaded logger does this on its own
+# every flush_ms.
+
+import struct
+import time
+import _thread
+
+MAGIC = b'FLOG'
+HEADER_FORMAT = '<4sHHHHH'  # magic, header size, layout version, record size, format len, columns len
+HEADER_SIZE = 256           # one flash page, so records start page aligned
+BLOCK_SIZE = 4096           # one flash erase sector
+
+# Layout version 1: one record per IMU sample (64 bytes)
+LAYOUT_VERSION = 1
+RECORD_FORMAT = '<I14fBB2x'
+RECORD_COLUMNS = (
+    'elapsed_ms', 'temperature', 'pressure',
+    'accel_x', 'accel_y', 'accel_z',
+    'gyro_x', 'gyro_y', 'gyro_z',
+    'mx', 'my', 'mz',
+    'gps_latitude', 'gps_longitude', 'gps_altitude',
+    'gps_satellites', 'gps_status',
+)
+
+GPS_STATUS_CODES = {'invalid': 0, 'valid': 1, 'no_fix': 2, 'error': 3}
+
+def _header(version, fmt, columns):
+    fmt = fmt.encode()
+    columns = ','.join(columns).encode()
+    header = bytearray(HEADER_SIZE)
+    struct.pack_into(HEADER_FORMAT, header, 0, MAGIC, HEADER_SIZE, version,
+                     struct.calcsize(fmt), len(fmt), len(columns))
+    offset = struct.calcsize(HEADER_FORMAT)
+    if offset + len(fmt) + len(columns) > HEADER_SIZE:
+        raise ValueError("Record layout does not fit in the log header")
+    header[offset:offset + len(fmt)] = fmt
+    offset += len(fmt)
+    header[offset:offset + len(columns)] = columns
+    return header
+
+class FlightLogger:
+    def __init__(self, path, block_size=BLOCK_SIZE, blocks=2,
+                 fmt=RECORD_FORMAT, columns=RECORD_COLUMNS, version=LAYOUT_VERSION):
+        self.fmt = fmt
+        self.record_size = struct.calcsize(fmt)
+        if block_size % self.record_size:
+            raise ValueError("Block size must be a multiple of the record size")
+        self.block_size = block_size
+        self.blocks = blocks
+        self.records = 0
+
+        self._ring = bytearray(block_size * blocks)
+        self._view = memoryview(self._ring)
+        self._pos = 0
+        self._flushed = 0  # ring offset up to which records are in the file
+
+        self._file = open(path, 'wb')
+        self._file.write(_header(version, fmt, columns))
+        self._file.flush()
+
+    def write(self, *values):
+        # Append one record in the logger's layout
+        struct.pack_into(self.fmt, self._ring, self._pos, *values)
+        self._advance()
+
+    def log(self, elapsed_ms, temperature, pressure, accel, gyro, mag, gps_values):
+        # Append one record in the default (layout version 1) format
+        struct.pack_into(self.fmt, self._ring, self._pos,
+                         elapsed_ms, temperature, pressure,
+                         accel[0], accel[1], accel[2],
+                         gyro[0], gyro[1], gyro[2],
+                         mag[0], mag[1], mag[2],
+                         gps_values['latitude'] or 0.0,
+                         gps_values['longitude'] or 0.0,
+                         gps_values['altitude'] or 0.0,
+                         gps_values['satellites'] or 0,
+                         GPS_STATUS_CODES.get(gps_values['status'], 0))
+        self._advance()
+
+    def _advance(self):
+        self._pos += self.record_size
+        self.records += 1
+        if self._pos % self.block_size == 0:
+            start = self._pos - self.block_size
+            if self._pos == len(self._ring):
+                self._pos = 0
+            self._block_full(start)
+
+    def _block_full(self, start):
+        # Only the part of the block not already written by flush()
+        self._write_block(self._view[self._flushed:start + self.block_size])
+        self._flushed = self._pos
+
+    def _write_block(self, data):
+        self._file.write(data)
+        self._file.flush()
+
+    def flush(self):
+        # Write the records of the current, partially filled block
+        if self._pos > self._flushed:
+            self._write_block(self._view[self._flushed:self._pos])
+            self._flushed = self._pos
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+class ThreadedFlightLogger(FlightLogger):
+    # The sampling core fills one block of the ring while a worker on core 1
+    # writes the previously filled one. Blocks are handed over under a lock;
+    # if the sampling core wraps around onto a block that is still being
+    # written, records are dropped (and counted) instead of blocking. When no
+    # block is pending the worker writes the records of the block being
+    # filled every flush_ms, or as soon as flush() asks for it.
+    def __init__(self, path, block_size=BLOCK_SIZE, blocks=2, flush_ms=1000, **kwargs):
+        super().__init__(path, block_size, blocks, **kwargs)
+        self._lock = _thread.allocate_lock()
+        self._pending = 0    # full blocks waiting for the flush worker
+        self.flush_ms = flush_ms
+        self._flush_now = False
+        self._running = True
+        self._stopped = False
+        self.overruns = 0    # times every buffer was full when one was needed
+        self.dropped = 0     # records discarded while no buffer was free
+        self.flush_max_ms = 0
+        _thread.start_new_thread(self._flush_worker, ())
+
+    def write(self, *values):
+        if self._pending == self.blocks:
+            self.dropped += 1
+            return
+        super().write(*values)
+
+    def log(self, *args):
+        if self._pending == self.blocks:
+            self.dropped += 1
+            return
+        super().log(*args)
+
+    def _block_full(self, start):
+        with self._lock:
+            self._pending += 1
+            if self._pending == self.blocks:
+                self.overruns += 1
+
+    def flush(self):
+        # Ask the worker to write the partial block on its next pass
+        self._flush_now = True
+
+    def _flush_worker(self):
+        # Only this thread writes the file (and moves _flushed) until close()
+        ring_size = len(self._ring)
+        last_flush = time.ticks_ms()
+        while self._running or self._pending:
+            start = self._flushed
+            end = start - start % self.block_size + self.block_size
+            if not self._pending:
+                if not self._flush_now and time.ticks_diff(time.ticks_ms(), last_flush) < self.flush_ms:
+                    time.sleep_ms(1)
+                    continue
+                self._flush_now = False
+                last_flush = time.ticks_ms()
+                # Records up to _pos are complete; if _pos has just left this
+                # block, it is full and will be written as a pending block
+                pos = self._pos
+                if start < pos < end:
+                    self._write_block(self._view[start:pos])
+                    self._flushed = pos
+                continue
+            begin = time.ticks_ms()
+            self._write_block(self._view[start:end])
+            elapsed = time.ticks_diff(time.ticks_ms(), begin)
+            if elapsed > self.flush_max_ms:
+                self.flush_max_ms = elapsed
+            last_flush = time.ticks_ms()
+            with self._lock:
+                self._pending -= 1
+                self._flushed = end % ring_size
+        self._stopped = True
+
+    def close(self):
+        # Let the worker drain every pending block, then write the tail here
+        self._running = False
+        while not self._stopped:
+            time.sleep_ms(1)
+        FlightLogger.flush(self)
+        self._file.close()
+
+def read_header(f):
+    fixed = f.read(struct.calcsize(HEADER_FORMAT))
+    magic, header_size, version, record_size, fmt_len, columns_len = struct.unpack(HEADER_FORMAT, fixed)
+    if magic != MAGIC:
+        raise ValueError("Not a flight log")
+    rest = f.read(header_size - len(fixed))
+    fmt = rest[:fmt_len].decode()
+    columns = rest[fmt_len:fmt_len + columns_len].decode().split(',')
+    if struct.calcsize(fmt) != record_size:
+        raise ValueError("Corrupt flight log header")
+    return version, fmt, columns
+
+def _csv_value(value):
+    # float32 fields carry ~7 significant digits
+    return '{:.7g}'.format(value) if isinstance(value, float) else str(value)
+
+def decode(log_path, csv_path):
+    # Host side: convert a binary flight log to CSV. Returns the record count.
+    count = 0
+    with open(log_path, 'rb') as f, open(csv_path, 'w') as out:
+        version, fmt, columns = read_header(f)
+        record_size = struct.calcsize(fmt)
+        out.write(','.join(columns) + '\n')
+        while True:
+            record = f.read(record_size)
+            if len(record) < record_size:
+                break  # end of file or a record cut short by power loss
+            out.write(','.join(_csv_value(v) for v in struct.unpack(fmt, record)) + '\n')
+            count += 1
+    return count
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) != 3:
+        print("usage: flightlogger.py <log.bin> <out.csv>")
+        sys.exit(1)
+    print(f"Decoded {decode(sys.argv[1], sys.argv[2])} records")
@@ -0,0 +1,19 @@
+# fusion
+#
+# Orientation filters for the flight scripts, all behind one interface:
+#
+#   f.step(accel, gyro, mag, dt)   accel (g), gyro (deg/s) and mag (or None)
+#                                  in board axes, dt in s
+#   f.q                            Quaternion (w, x, y, z), board to earth
+#
+#   Madgwick            gradient-descent filter, 6-DOF or with magnetometer
+#   GyroIntegrator      gyro-only reference
+#
+# plus MovingAverageFilter to smooth the output for display. UKF/ukf.py's
+# UnscentedKalmanFilter has the same step() and q and can be swapped in where
+# the CPU budget allows.
+
+from fusion.quaternion import Quaternion
+from fusion.madgwick import Madgwick
+from fusion.gyro import GyroIntegrator
+from fusion.smoothing import MovingAverageFilter
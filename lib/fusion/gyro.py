@@ -0,0 +1,25 @@
+# gyro.py
+#
+# Gyro-only attitude: q = q * dq each step, dq = (1, w dt / 2) renormalized,
+# with w the body rate in rad/s. No accelerometer or magnetometer
+# correction, so it drifts with any residual gyro bias; it is the reference
+# the corrected filters are compared against and is enough for short runs
+# with a calibrated gyro (ICM42670.set_calibration). Same step() interface
+# as the other filters; accel and mag are ignored.
+
+import math
+
+from fusion.quaternion import Quaternion
+
+HALF_DEG_TO_RAD = math.pi / 360
+
+class GyroIntegrator:
+    def __init__(self):
+        self.q = Quaternion()
+        self._dq = Quaternion()
+
+    def step(self, accel, gyro, mag=None, dt=0.01):
+        # gyro in deg/s, dt in s
+        h = HALF_DEG_TO_RAD * dt
+        self._dq.set(1.0, gyro[0] * h, gyro[1] * h, gyro[2] * h)
+        self.q.imul(self._dq).normalize()
@@ -0,0 +1,179 @@
+# madgwick.py
+#
+# Madgwick orientation filter. q (a Quaternion) rotates board axes into the
+# earth frame (z up; with a magnetometer, x toward magnetic north). Accel in
+# any unit (it is normalized), gyro in deg/s, mag in any unit but in the same
+# axes as accel and gyro (MagCalibration.correct_into() output).
+#
+#   step(accel, gyro, mag, dt)        the fusion filter interface; mag may
+#                                     be None
+#   update(accel, gyro, mag, dt)      9-DOF (MARG) step
+#   update_nomag(accel, gyro, dt)     6-DOF step, yaw is gyro-only
+#   update_batch(samples, dts, mag)   one step per sample of a FIFO block
+#
+# All of them run the same loop, which keeps the quaternion in locals and
+# writes self.q (updated in place) once per call.
+
+import math
+
+from fusion.quaternion import Quaternion
+
+DEG_TO_RAD = math.pi / 180
+
+class Madgwick:
+    def __init__(self, beta=0.01):
+        # Quaternion elements representing the estimated orientation
+        self.q = Quaternion()
+        self.beta = beta  # Algorithm gain
+
+    def step(self, accel, gyro, mag=None, dt=0.01):
+        self._run(accel, 0, gyro, 0, mag, 1, 0, None, dt)
+
+    def update(self, accel, gyro, mag, dt=0.01):
+        self._run(accel, 0, gyro, 0, mag, 1, 0, None, dt)
+
+    def update_nomag(self, accel, gyro, dt=0.01):
+        self._run(accel, 0, gyro, 0, None, 1, 0, None, dt)
+
+    def update_batch(self, samples, dts, mag=None, stride=6):
+        # samples is a flat sequence of len(dts) frames of stride values,
+        # accel at [0:3] and gyro at [3:6] of each frame, e.g. a block of
+        # decode_fifo_frame() outputs. dts[i] is the time step (s) ending at
+        # sample i. mag, if given, is one reading used for the whole block:
+        # the magnetometer runs far slower than the IMU FIFO.
+        self._run(samples, 0, samples, 3, mag, len(dts), stride, dts, 0.0)
+
+    def _run(self, accel, a, gyro, g, mag, count, stride, dts, dt):
+        q = self.q
+        q1 = q.w
+        q2 = q.x
+        q3 = q.y
+        q4 = q.z
+        beta = self.beta
+
+        # Normalize the magnetometer measurement once for the whole call
+        use_mag = False
+        if mag is not None:
+            mx = mag[0]
+            my = mag[1]
+            mz = mag[2]
+            norm = math.sqrt(mx * mx + my * my + mz * mz)
+            if norm > 0:
+                mx /= norm
+                my /= norm
+                mz /= norm
+                use_mag = True
+
+        for i in range(count):
+            if dts is not None:
+                dt = dts[i]
+            ax = accel[a]
+            ay = accel[a + 1]
+            az = accel[a + 2]
+            gx = gyro[g] * DEG_TO_RAD
+            gy = gyro[g + 1] * DEG_TO_RAD
+            gz = gyro[g + 2] * DEG_TO_RAD
+            a += stride
+            g += stride
+
+            # Rate of change of quaternion from gyroscope
+            qDot1 = 0.5 * (-q2 * gx - q3 * gy - q4 * gz)
+            qDot2 = 0.5 * (q1 * gx + q3 * gz - q4 * gy)
+            qDot3 = 0.5 * (q1 * gy - q2 * gz + q4 * gx)
+            qDot4 = 0.5 * (q1 * gz + q2 * gy - q3 * gx)
+
+            # Corrective step only with a valid accelerometer measurement
+            norm = math.sqrt(ax * ax + ay * ay + az * az)
+            if norm > 0:
+                ax /= norm
+                ay /= norm
+                az /= norm
+
+                # Auxiliary variables to avoid repeated calculations
+                _2q1 = 2.0 * q1
+                _2q2 = 2.0 * q2
+                _2q3 = 2.0 * q3
+                _2q4 = 2.0 * q4
+                q1q1 = q1 * q1
+                q2q2 = q2 * q2
+                q3q3 = q3 * q3
+                q4q4 = q4 * q4
+
+                if use_mag:
+                    # Earth field direction b = [bx, 0, bz] from the
+                    # measurement rotated into the earth frame
+                    _2q1mx = _2q1 * mx
+                    _2q1my = _2q1 * my
+                    _2q1mz = _2q1 * mz
+                    _2q2mx = _2q2 * mx
+                    q1q2 = q1 * q2
+                    q1q3 = q1 * q3
+                    q1q4 = q1 * q4
+                    q2q3 = q2 * q3
+                    q2q4 = q2 * q4
+                    q3q4 = q3 * q4
+                    hx = (mx * q1q1 - _2q1my * q4 + _2q1mz * q3 + mx * q2q2 + _2q2 * my * q3
+                          + _2q2 * mz * q4 - mx * q3q3 - mx * q4q4)
+                    hy = (_2q1mx * q4 + my * q1q1 - _2q1mz * q2 + _2q2mx * q3 - my * q2q2
+                          + my * q3q3 + _2q3 * mz * q4 - my * q4q4)
+                    _2bx = math.sqrt(hx * hx + hy * hy)
+                    _2bz = (-_2q1mx * q3 + _2q1my * q2 + mz * q1q1 + _2q2mx * q4 - mz * q2q2
+                            + _2q3 * my * q4 - mz * q3q3 + mz * q4q4)
+                    _4bx = 2.0 * _2bx
+                    _4bz = 2.0 * _2bz
+
+                    # Objective function residuals: gravity, then field
+                    fa1 = 2.0 * q2q4 - 2.0 * q1q3 - ax
+                    fa2 = 2.0 * q1q2 + 2.0 * q3q4 - ay
+                    fa3 = 1.0 - 2.0 * q2q2 - 2.0 * q3q3 - az
+                    fm1 = _2bx * (0.5 - q3q3 - q4q4) + _2bz * (q2q4 - q1q3) - mx
+                    fm2 = _2bx * (q2q3 - q1q4) + _2bz * (q1q2 + q3q4) - my
+                    fm3 = _2bx * (q1q3 + q2q4) + _2bz * (0.5 - q2q2 - q3q3) - mz
+
+                    # Gradient descent algorithm corrective step (J^T f)
+                    s1 = (-_2q3 * fa1 + _2q2 * fa2 - _2bz * q3 * fm1
+                          + (-_2bx * q4 + _2bz * q2) * fm2 + _2bx * q3 * fm3)
+                    s2 = (_2q4 * fa1 + _2q1 * fa2 - 4.0 * q2 * fa3 + _2bz * q4 * fm1
+                          + (_2bx * q3 + _2bz * q1) * fm2 + (_2bx * q4 - _4bz * q2) * fm3)
+                    s3 = (-_2q1 * fa1 + _2q4 * fa2 - 4.0 * q3 * fa3 + (-_4bx * q3 - _2bz * q1) * fm1
+                          + (_2bx * q2 + _2bz * q4) * fm2 + (_2bx * q1 - _4bz * q3) * fm3)
+                    s4 = (_2q2 * fa1 + _2q3 * fa2 + (-_4bx * q4 + _2bz * q2) * fm1
+                          + (-_2bx * q1 + _2bz * q3) * fm2 + _2bx * q2 * fm3)
+                else:
+                    _4q1 = 4.0 * q1
+                    _4q2 = 4.0 * q2
+                    _4q3 = 4.0 * q3
+                    _8q2 = 8.0 * q2
+                    _8q3 = 8.0 * q3
+
+                    # Gradient descent algorithm corrective step
+                    s1 = _4q1 * q3q3 + _2q3 * ax + _4q1 * q2q2 - _2q2 * ay
+                    s2 = (_4q2 * q4q4 - _2q4 * ax + 4.0 * q1q1 * q2 - _2q1 * ay - _4q2
+                          + _8q2 * q2q2 + _8q2 * q3q3 + _4q2 * az)
+                    s3 = (4.0 * q1q1 * q3 + _2q1 * ax + _4q3 * q4q4 - _2q4 * ay - _4q3
+                          + _8q3 * q2q2 + _8q3 * q3q3 + _4q3 * az)
+                    s4 = 4.0 * q2q2 * q4 - _2q2 * ax + 4.0 * q3q3 * q4 - _2q3 * ay
+
+                # Normalize the step magnitude and apply feedback step
+                norm = math.sqrt(s1 * s1 + s2 * s2 + s3 * s3 + s4 * s4)
+                if norm > 0:
+                    norm = beta / norm
+                    qDot1 -= norm * s1
+                    qDot2 -= norm * s2
+                    qDot3 -= norm * s3
+                    qDot4 -= norm * s4
+
+            # Integrate to yield quaternion
+            q1 += qDot1 * dt
+            q2 += qDot2 * dt
+            q3 += qDot3 * dt
+            q4 += qDot4 * dt
+
+            # Normalize quaternion
+            norm = math.sqrt(q1 * q1 + q2 * q2 + q3 * q3 + q4 * q4)
+            q1 /= norm
+            q2 /= norm
+            q3 /= norm
+            q4 /= norm
+
+        q.set(q1, q2, q3, q4)
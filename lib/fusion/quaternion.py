@@ -0,0 +1,88 @@
+# quaternion.py
+#
+# Quaternion (w, x, y, z) for the orientation filters. set(), imul(),
+# mul_into() and normalize() work on existing objects, so a filter step
+# builds no new ones; __mul__ is kept for one-off use. Indexing and
+# iteration give w, x, y, z, so a Quaternion can stand in for the
+# [w, x, y, z] lists the scripts print, pack and transmit.
+#
+# __slots__ drops the per-instance dict on CPython (the host tools);
+# MicroPython accepts and ignores it.
+
+from math import sqrt
+
+class Quaternion:
+    __slots__ = ('w', 'x', 'y', 'z')
+
+    def __init__(self, w=1.0, x=0.0, y=0.0, z=0.0):
+        self.w = w
+        self.x = x
+        self.y = y
+        self.z = z
+
+    def set(self, w, x, y, z):
+        self.w = w
+        self.x = x
+        self.y = y
+        self.z = z
+        return self
+
+    def copy_from(self, other):
+        return self.set(other.w, other.x, other.y, other.z)
+
+    def mul_into(self, other, out):
+        # out = self * other (Hamilton product); out may be self or other
+        w1 = self.w
+        x1 = self.x
+        y1 = self.y
+        z1 = self.z
+        w2 = other.w
+        x2 = other.x
+        y2 = other.y
+        z2 = other.z
+        out.w = w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2
+        out.x = w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2
+        out.y = w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2
+        out.z = w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2
+        return out
+
+    def imul(self, other):
+        # self = self * other, in place
+        return self.mul_into(other, self)
+
+    def __mul__(self, other):
+        if isinstance(other, Quaternion):
+            return self.mul_into(other, Quaternion())
+        return Quaternion(self.w * other, self.x * other, self.y * other, self.z * other)
+
+    def normalize(self):
+        norm = sqrt(self.w * self.w + self.x * self.x + self.y * self.y + self.z * self.z)
+        if norm > 0:
+            self.w /= norm
+            self.x /= norm
+            self.y /= norm
+            self.z /= norm
+        return self
+
+    def __len__(self):
+        return 4
+
+    def __getitem__(self, i):
+        if i == 0 or i == -4:
+            return self.w
+        if i == 1 or i == -3:
+            return self.x
+        if i == 2 or i == -2:
+            return self.y
+        if i == 3 or i == -1:
+            return self.z
+        raise IndexError("Quaternion index out of range")
+
+    def __iter__(self):
+        yield self.w
+        yield self.x
+        yield self.y
+        yield self.z
+
+    def __repr__(self):
+        return "Quaternion({}, {}, {}, {})".format(self.w, self.x, self.y, self.z)
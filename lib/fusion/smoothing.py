@@ -0,0 +1,49 @@
+# smoothing.py
+#
+# Moving average of the last window_size quaternions, for display and
+# telemetry. The window is a ring buffer with running sums, so apply() is
+# a few additions however long the window; the sums are recomputed from the
+# buffer each time the ring wraps so float error cannot build up. apply()
+# returns the same Quaternion every call, overwritten with the new average.
+
+from array import array
+
+from fusion.quaternion import Quaternion
+
+class MovingAverageFilter:
+    def __init__(self, window_size=12):
+        self.window_size = window_size
+        self.reset()
+
+    def reset(self):
+        self._ring = array('f', [0.0] * (4 * self.window_size))
+        self._sums = array('f', [0.0] * 4)
+        self._next = 0
+        self._count = 0
+        self.q = Quaternion()
+
+    def apply(self, quaternion):
+        ring = self._ring
+        sums = self._sums
+        i = self._next
+        sums[0] += quaternion.w - ring[i]
+        sums[1] += quaternion.x - ring[i + 1]
+        sums[2] += quaternion.y - ring[i + 2]
+        sums[3] += quaternion.z - ring[i + 3]
+        ring[i] = quaternion.w
+        ring[i + 1] = quaternion.x
+        ring[i + 2] = quaternion.y
+        ring[i + 3] = quaternion.z
+        i += 4
+        if i == len(ring):
+            i = 0
+            for k in range(4):
+                s = 0.0
+                for j in range(k, len(ring), 4):
+                    s += ring[j]
+                sums[k] = s
+        self._next = i
+        if self._count < self.window_size:
+            self._count += 1
+        n = self._count
+        return self.q.set(sums[0] / n, sums[1] / n, sums[2] / n, sums[3] / n)
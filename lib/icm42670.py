@@ -1,6 +1,8 @@
 # icm42670.py
 
 from machine import I2C, Pin
+from array import array
+import time
 
 # ICM-42670-P I2C address
 ICM42670_I2C_ADDRESS = 0x69
@@ -11,72 +13,395 @@ ICM42670_PWR_MGMT_1 = 0x1F
 ICM42670_ACCEL_CONFIG = 0x1C
 ICM42670_GYRO_CONFIG = 0x1B
 
-# Initialize I2C (SCL on GPIO 9, SDA on GPIO 8)
-i2c = I2C(0, scl=Pin(9), sda=Pin(8), freq=400000)
+# ODR / filter configuration registers
+ICM42670_GYRO_CONFIG0 = 0x20
+ICM42670_ACCEL_CONFIG0 = 0x21
+ICM42670_GYRO_CONFIG1 = 0x23
+ICM42670_ACCEL_CONFIG1 = 0x24
+
+# Output data registers (big endian, TEMP 0x09-0x0A, ACCEL 0x0B-0x10, GYRO 0x11-0x16)
+ICM42670_TEMP_DATA1 = 0x09
+ICM42670_ACCEL_DATA_X1 = 0x0B
+ICM42670_GYRO_DATA_X1 = 0x11
+
+# FIFO / interrupt registers
+ICM42670_SIGNAL_PATH_RESET = 0x02
+ICM42670_INT_CONFIG = 0x06
+ICM42670_FIFO_CONFIG1 = 0x28
+ICM42670_FIFO_CONFIG2 = 0x29
+ICM42670_FIFO_CONFIG3 = 0x2A
+ICM42670_INT_SOURCE0 = 0x2B
+ICM42670_INT_STATUS = 0x3A
+ICM42670_FIFO_COUNTH = 0x3D
+ICM42670_FIFO_DATA = 0x3F
+ICM42670_BLK_SEL_W = 0x79
+ICM42670_MADDR_W = 0x7A
+ICM42670_M_W = 0x7B
+ICM42670_MREG1_FIFO_CONFIG5 = 0x01
+
+# FIFO packet 3: header, accel (6), gyro (6), temp (1), timestamp (2)
+FIFO_FRAME_SIZE = 16
+FIFO_SIZE = 2048
+FIFO_HEADER_EMPTY = 0x80
+
+ACCEL_SCALE_FACTORS = (2048.0, 1024.0, 512.0, 256.0)
+GYRO_SCALE_FACTORS = (131.0, 65.5, 32.8, 16.4)
+
+# Output data rates (low nibble of GYRO_CONFIG0/ACCEL_CONFIG0)
+ODR_1600HZ = 5
+ODR_800HZ = 6
+ODR_400HZ = 7
+ODR_200HZ = 8
+ODR_100HZ = 9
+ODR_50HZ = 10
+ODR_25HZ = 11
+ODR_12_5HZ = 12
+ODR_6_25HZ = 13     # accel low power only
+ODR_3_125HZ = 14    # accel low power only
+ODR_1_5625HZ = 15   # accel low power only
+
+# UI low pass filter bandwidths (GYRO_CONFIG1/ACCEL_CONFIG1 bits 2:0)
+BW_BYPASS = 0
+BW_180HZ = 1
+BW_121HZ = 2
+BW_73HZ = 3
+BW_53HZ = 4
+BW_34HZ = 5
+BW_25HZ = 6
+BW_16HZ = 7
+
+# Power modes (PWR_MGMT0 ACCEL_MODE/GYRO_MODE fields)
+MODE_OFF = 0
+MODE_STANDBY = 1    # gyro only
+MODE_LOW_POWER = 2  # accel only
+MODE_LOW_NOISE = 3
+
+# Board axis (x, y, z) <- (sensor axis, sign). Matches the mounting of the
+# IMU on the flight computer: x = x, y = -z, z = y
+DEFAULT_AXIS_MAP = ((0, 1), (2, -1), (1, 1))
+
+def _int16(buf, i):
+    value = buf[i] << 8 | buf[i + 1]
+    return value - 65536 if value > 32767 else value
+
+class ICM42670:
+    def __init__(self, i2c, address=ICM42670_I2C_ADDRESS, axis_map=DEFAULT_AXIS_MAP):
+        self.i2c = i2c
+        self.address = address
+
+        # Configuration registers shadowed in RAM. Each register is read from
+        # the chip at most once; after that every change is a single write.
+        self._shadow = {}
+
+        # Preallocated burst read buffers, reused on every sample
+        self._reg_buf = bytearray(1)
+        self._motion_buf = bytearray(12)
+        self._motion_temp_buf = bytearray(14)
+        self._axis_buf = bytearray(6)
+
+        # Scale factors, None until known from a setter or one register read
+        self._accel_scale_factor = None
+        self._gyro_scale_factor = None
+
+        # Flat remap tables: byte offset, multiplier (sign / scale) per axis
+        self._axis_map = axis_map
+        self._accel_table = None
+        self._gyro_table = None
+
+        # FIFO streaming state
+        self._fifo_count_buf = bytearray(2)
+        self._fifo_watermark_flag = False
+        self._fifo_callback = None
+        self._fifo_last_tmst = None
+        self._fifo_time_us = 0
+
+        # Bias/offset correction (lib/imucal.py) applied after the remap, with
+        # the gyro bias at the last temperature read
+        self.calibration = None
+        self._gyro_bias = array('f', [0.0] * 3)
+
+    def write_register(self, reg, data):
+        self._reg_buf[0] = data
+        self.i2c.writeto_mem(self.address, reg, self._reg_buf)
+
+    def read_register(self, reg, num_bytes=1):
+        return self.i2c.readfrom_mem(self.address, reg, num_bytes)
+
+    def read_register_int(self, reg, num_bytes=1):
+        return int.from_bytes(self.i2c.readfrom_mem(self.address, reg, num_bytes), "little")
+
+    def write_mreg1(self, reg, data):
+        # MREG1 registers are written indirectly through BLK_SEL_W/MADDR_W/M_W
+        self.write_register(ICM42670_BLK_SEL_W, 0x00)
+        self.write_register(ICM42670_MADDR_W, reg)
+        self.write_register(ICM42670_M_W, data)
+        time.sleep_us(10)
 
-def write_register(reg, data):
-    i2c.writeto_mem(ICM42670_I2C_ADDRESS, reg, bytes([data]))
+    def _get_shadow(self, reg):
+        value = self._shadow.get(reg)
+        if value is None:
+            value = self.read_register(reg)[0]
+            self._shadow[reg] = value
+        return value
 
-def read_register(reg, num_bytes=1):
-    return i2c.readfrom_mem(ICM42670_I2C_ADDRESS, reg, num_bytes)
+    def _set_shadow(self, reg, value):
+        self._shadow[reg] = value
+        self.write_register(reg, value)
 
-def read_register_int(reg, num_bytes=1):
-    return int.from_bytes(i2c.readfrom_mem(ICM42670_I2C_ADDRESS, reg, num_bytes), "little")
+    def _update_shadow(self, reg, mask, value):
+        self._set_shadow(reg, (self._get_shadow(reg) & ~mask) | (value & mask))
 
-def read_who_am_i():
-    who_am_i = read_register(ICM42670_WHO_AM_I)
-    return who_am_i[0]
+    def read_who_am_i(self):
+        return self.read_register(ICM42670_WHO_AM_I)[0]
 
-def configure_sensor():
-    write_register(ICM42670_PWR_MGMT_1, 0b10001111)
+    def configure_sensor(self):
+        self._set_shadow(ICM42670_PWR_MGMT_1, 0b10001111)
 
-def set_accel_scale(scale):
-    if scale not in [0, 1, 2, 3]:
-        raise ValueError("Invalid accelerometer scale")
-    write_register(ICM42670_ACCEL_CONFIG, scale)
+    def set_power_mode(self, accel_mode=MODE_LOW_NOISE, gyro_mode=MODE_LOW_NOISE):
+        if accel_mode not in (0, 2, 3) or gyro_mode not in (0, 1, 3):
+            raise ValueError("Invalid power mode")
+        self._update_shadow(ICM42670_PWR_MGMT_1, 0x0F, gyro_mode << 2 | accel_mode)
 
-def set_gyro_scale(scale):
-    if scale not in [0, 1, 2, 3]:
-        raise ValueError("Invalid gyroscope scale")
-    write_register(ICM42670_GYRO_CONFIG, scale)
+    def set_accel_scale(self, scale):
+        if scale not in [0, 1, 2, 3]:
+            raise ValueError("Invalid accelerometer scale")
+        self._set_shadow(ICM42670_ACCEL_CONFIG, scale)
+        self._accel_scale_factor = ACCEL_SCALE_FACTORS[scale]
+        self._accel_table = None
 
-def read_temp():
-    return (read_register_int(0x09) << 8 | read_register_int(0x0A))
+    def set_gyro_scale(self, scale):
+        if scale not in [0, 1, 2, 3]:
+            raise ValueError("Invalid gyroscope scale")
+        self._set_shadow(ICM42670_GYRO_CONFIG, scale)
+        self._gyro_scale_factor = GYRO_SCALE_FACTORS[scale]
+        self._gyro_table = None
 
-def read_accel_data():
-    accel_x = (read_register_int(0x0B) << 8 | read_register_int(0x0C))
-    accel_y = (read_register_int(0x0D) << 8 | read_register_int(0x0E))
-    accel_z = (read_register_int(0x0F) << 8 | read_register_int(0x10))
+    def set_accel_odr(self, odr):
+        if not ODR_1600HZ <= odr <= ODR_1_5625HZ:
+            raise ValueError("Invalid accelerometer ODR")
+        self._update_shadow(ICM42670_ACCEL_CONFIG0, 0x0F, odr)
 
-    accel_x = accel_x - 65536 if accel_x > 32767 else accel_x
-    accel_y = accel_y - 65536 if accel_y > 32767 else accel_y
-    accel_z = accel_z - 65536 if accel_z > 32767 else accel_z
+    def set_gyro_odr(self, odr):
+        if not ODR_1600HZ <= odr <= ODR_12_5HZ:
+            raise ValueError("Invalid gyroscope ODR")
+        self._update_shadow(ICM42670_GYRO_CONFIG0, 0x0F, odr)
 
-    scale = read_register(ICM42670_ACCEL_CONFIG)[0] & 0x03
-    scale_factors = [2048.0, 1024.0, 512.0, 256.0]
-    scale_factor = scale_factors[scale]
+    def set_accel_bandwidth(self, bandwidth):
+        if not BW_BYPASS <= bandwidth <= BW_16HZ:
+            raise ValueError("Invalid accelerometer bandwidth")
+        self._update_shadow(ICM42670_ACCEL_CONFIG1, 0x07, bandwidth)
 
-    accel_x_g = accel_x / scale_factor
-    accel_y_g = -1 * accel_z / scale_factor
-    accel_z_g = accel_y / scale_factor
+    def set_gyro_bandwidth(self, bandwidth):
+        if not BW_BYPASS <= bandwidth <= BW_16HZ:
+            raise ValueError("Invalid gyroscope bandwidth")
+        self._update_shadow(ICM42670_GYRO_CONFIG1, 0x07, bandwidth)
 
-    return (accel_x_g, accel_y_g, accel_z_g)
+    def set_axis_map(self, axis_map):
+        for axis, sign in axis_map:
+            if axis not in (0, 1, 2) or sign not in (1, -1):
+                raise ValueError("Invalid axis map")
+        self._axis_map = axis_map
+        self._accel_table = None
+        self._gyro_table = None
 
-def read_gyro_data():
-    gyro_x = (read_register_int(0x11) << 8 | read_register_int(0x12))
-    gyro_y = (read_register_int(0x13) << 8 | read_register_int(0x14))
-    gyro_z = (read_register_int(0x15) << 8 | read_register_int(0x16))
+    def _build_table(self, scale_factor):
+        table = []
+        for axis, sign in self._axis_map:
+            table.append(axis * 2)
+            table.append(sign / scale_factor)
+        return table
 
-    gyro_x = gyro_x - 65536 if gyro_x > 32767 else gyro_x
-    gyro_y = gyro_y - 65536 if gyro_y > 32767 else gyro_y
-    gyro_z = gyro_z - 65536 if gyro_z > 32767 else gyro_z
+    def _accel(self):
+        if self._accel_table is None:
+            if self._accel_scale_factor is None:
+                scale = self._get_shadow(ICM42670_ACCEL_CONFIG) & 0x03
+                self._accel_scale_factor = ACCEL_SCALE_FACTORS[scale]
+            self._accel_table = self._build_table(self._accel_scale_factor)
+        return self._accel_table
 
-    scale = read_register(ICM42670_GYRO_CONFIG)[0] & 0x03
-    scale_factors = [131.0, 65.5, 32.8, 16.4]
-    scale_factor = scale_factors[scale]
+    def _gyro(self):
+        if self._gyro_table is None:
+            if self._gyro_scale_factor is None:
+                scale = self._get_shadow(ICM42670_GYRO_CONFIG) & 0x03
+                self._gyro_scale_factor = GYRO_SCALE_FACTORS[scale]
+            self._gyro_table = self._build_table(self._gyro_scale_factor)
+        return self._gyro_table
+
+    def set_calibration(self, calibration):
+        # Apply an ImuCalibration to every read from now on, or None to stop.
+        # The gyro bias follows the die temperature whenever a read includes
+        # it (read_motion_into(with_temp=True), FIFO frames).
+        self.calibration = calibration
+        if calibration is not None:
+            calibration.gyro_bias_into(calibration.reference_temperature, self._gyro_bias)
+
+    def read_temp(self):
+        return (self.read_register_int(0x09) << 8 | self.read_register_int(0x0A))
+
+    def read_accel_data(self):
+        buf = self._axis_buf
+        self.i2c.readfrom_mem_into(self.address, ICM42670_ACCEL_DATA_X1, buf)
+        t = self._accel()
+        if self.calibration is not None:
+            o = self.calibration.accel_offset
+            return (_int16(buf, t[0]) * t[1] - o[0], _int16(buf, t[2]) * t[3] - o[1],
+                    _int16(buf, t[4]) * t[5] - o[2])
+        return (_int16(buf, t[0]) * t[1], _int16(buf, t[2]) * t[3], _int16(buf, t[4]) * t[5])
+
+    def read_gyro_data(self):
+        buf = self._axis_buf
+        self.i2c.readfrom_mem_into(self.address, ICM42670_GYRO_DATA_X1, buf)
+        t = self._gyro()
+        if self.calibration is not None:
+            b = self._gyro_bias
+            return (_int16(buf, t[0]) * t[1] - b[0], _int16(buf, t[2]) * t[3] - b[1],
+                    _int16(buf, t[4]) * t[5] - b[2])
+        return (_int16(buf, t[0]) * t[1], _int16(buf, t[2]) * t[3], _int16(buf, t[4]) * t[5])
+
+    def _decode_into(self, buf, accel_base, gyro_base, out):
+        t = self._accel()
+        out[0] = _int16(buf, accel_base + t[0]) * t[1]
+        out[1] = _int16(buf, accel_base + t[2]) * t[3]
+        out[2] = _int16(buf, accel_base + t[4]) * t[5]
+        t = self._gyro()
+        out[3] = _int16(buf, gyro_base + t[0]) * t[1]
+        out[4] = _int16(buf, gyro_base + t[2]) * t[3]
+        out[5] = _int16(buf, gyro_base + t[4]) * t[5]
+        if self.calibration is not None:
+            o = self.calibration.accel_offset
+            out[0] -= o[0]
+            out[1] -= o[1]
+            out[2] -= o[2]
+            b = self._gyro_bias
+            out[3] -= b[0]
+            out[4] -= b[1]
+            out[5] -= b[2]
+
+    def read_motion_into(self, out, with_temp=False):
+        # Burst read accel + gyro (and optionally temperature) in one I2C
+        # transaction and decode into a caller-owned array, e.g. array('f', 7):
+        #   out[0:3] = accel (g), out[3:6] = gyro (dps), out[6] = temp (C)
+        if with_temp:
+            buf = self._motion_temp_buf
+            self.i2c.readfrom_mem_into(self.address, ICM42670_TEMP_DATA1, buf)
+            out[6] = _int16(buf, 0) / 128 + 25
+            if self.calibration is not None:
+                self.calibration.gyro_bias_into(out[6], self._gyro_bias)
+            self._decode_into(buf, 2, 8, out)
+        else:
+            buf = self._motion_buf
+            self.i2c.readfrom_mem_into(self.address, ICM42670_ACCEL_DATA_X1, buf)
+            self._decode_into(buf, 0, 6, out)
+        return out
+
+    def _fifo_irq_handler(self, pin):
+        self._fifo_watermark_flag = True
+        if self._fifo_callback is not None:
+            self._fifo_callback(pin)
+
+    def configure_fifo(self, watermark=16, int_pin=None, callback=None):
+        # Stream accel + gyro packets into the on-chip FIFO. watermark is in
+        # frames; when int_pin is given INT1 pulses once that many frames are
+        # queued and callback (if any) is run from the IRQ.
+        watermark_bytes = watermark * FIFO_FRAME_SIZE
+        if not 0 < watermark_bytes < FIFO_SIZE:
+            raise ValueError("Invalid FIFO watermark")
+
+        self.write_register(ICM42670_FIFO_CONFIG1, 0x01)  # bypass while reconfiguring
+        self.write_mreg1(ICM42670_MREG1_FIFO_CONFIG5, 0x03)  # accel + gyro in FIFO
+        self.write_register(ICM42670_FIFO_CONFIG2, watermark_bytes & 0xFF)
+        self.write_register(ICM42670_FIFO_CONFIG3, (watermark_bytes >> 8) & 0x0F)
+        self.write_register(ICM42670_FIFO_CONFIG1, 0x00)  # stream mode, FIFO enabled
+        self.flush_fifo()
+
+        self._fifo_callback = callback
+        self._fifo_watermark_flag = False
+        self._fifo_last_tmst = None
+        self._fifo_time_us = 0
+
+        if int_pin is not None:
+            self.write_register(ICM42670_INT_CONFIG, 0x03)  # INT1 pulsed, push-pull, active high
+            self.write_register(ICM42670_INT_SOURCE0, 0x04)  # FIFO threshold -> INT1
+            int_pin.irq(trigger=Pin.IRQ_RISING, handler=self._fifo_irq_handler)
+
+    def disable_fifo(self):
+        self.write_register(ICM42670_INT_SOURCE0, 0x00)
+        self.write_register(ICM42670_FIFO_CONFIG1, 0x01)
+
+    def flush_fifo(self):
+        self.write_register(ICM42670_SIGNAL_PATH_RESET, 0x04)
+        time.sleep_us(2)
+
+    def fifo_count(self):
+        # Number of bytes queued in the FIFO
+        self.i2c.readfrom_mem_into(self.address, ICM42670_FIFO_COUNTH, self._fifo_count_buf)
+        return self._fifo_count_buf[0] << 8 | self._fifo_count_buf[1]
+
+    def fifo_watermark_reached(self):
+        # True once per watermark interrupt (or when polled status says so)
+        if self._fifo_watermark_flag:
+            self._fifo_watermark_flag = False
+            return True
+        return bool(self.read_register(ICM42670_INT_STATUS)[0] & 0x04)
+
+    def drain(self, buffer):
+        # Read every complete frame currently queued (up to len(buffer) bytes) in
+        # one burst and yield (timestamp_us, frame) for each valid packet. frame is
+        # a 16 byte memoryview into buffer, valid until the next drain() call.
+        # timestamp_us unwraps the 16-bit FIFO timestamp into a running counter.
+        count = self.fifo_count()
+        count = min(count, len(buffer))
+        count -= count % FIFO_FRAME_SIZE
+        if count == 0:
+            return
+
+        view = memoryview(buffer)
+        self.i2c.readfrom_mem_into(self.address, ICM42670_FIFO_DATA, view[:count])
+
+        for offset in range(0, count, FIFO_FRAME_SIZE):
+            if buffer[offset] & FIFO_HEADER_EMPTY:
+                continue
+            tmst = buffer[offset + 14] << 8 | buffer[offset + 15]
+            if self._fifo_last_tmst is not None:
+                self._fifo_time_us += (tmst - self._fifo_last_tmst) & 0xFFFF
+            self._fifo_last_tmst = tmst
+            yield self._fifo_time_us, view[offset:offset + FIFO_FRAME_SIZE]
+
+    def decode_fifo_frame(self, frame, out):
+        # Decode a FIFO frame into out using the same layout and axis remapping as
+        # read_motion_into(); out[6] (if present) receives the 8-bit temperature.
+        if len(out) > 6:
+            temp = frame[13]
+            out[6] = (temp - 256 if temp > 127 else temp) / 2 + 25
+            if self.calibration is not None:
+                self.calibration.gyro_bias_into(out[6], self._gyro_bias)
+        self._decode_into(frame, 1, 7, out)
+        return out
+
+# Initialize I2C (SCL on GPIO 9, SDA on GPIO 8)
+i2c = I2C(0, scl=Pin(9), sda=Pin(8), freq=400000)
 
-    gyro_x_dps = gyro_x / scale_factor
-    gyro_y_dps = -1 * gyro_z / scale_factor
-    gyro_z_dps = gyro_y / scale_factor
+# Module-level API used by the flight and test scripts, backed by a default
+# instance on the board's IMU bus
+imu = ICM42670(i2c)
 
-    return (gyro_x_dps, gyro_y_dps, gyro_z_dps)
+write_register = imu.write_register
+read_register = imu.read_register
+read_register_int = imu.read_register_int
+write_mreg1 = imu.write_mreg1
+read_who_am_i = imu.read_who_am_i
+configure_sensor = imu.configure_sensor
+set_accel_scale = imu.set_accel_scale
+set_gyro_scale = imu.set_gyro_scale
+read_temp = imu.read_temp
+read_accel_data = imu.read_accel_data
+read_gyro_data = imu.read_gyro_data
+read_motion_into = imu.read_motion_into
+set_calibration = imu.set_calibration
+configure_fifo = imu.configure_fifo
+disable_fifo = imu.disable_fifo
+flush_fifo = imu.flush_fifo
+fifo_count = imu.fifo_count
+fifo_watermark_reached = imu.fifo_watermark_reached
+drain = imu.drain
+decode_fifo_frame = imu.decode_fifo_frame
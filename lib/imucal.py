@@ -0,0 +1,181 @@
+# imucal.py
+#
+# Gyro bias and accelerometer offset calibration for the ICM-42670. At
+# startup the board sits still for a few seconds; ImuCalibrator keeps running
+# (Welford) mean and variance of every accel/gyro axis plus each gyro axis'
+# co-moment with the die temperature, so any number of samples costs a fixed
+# few dozen floats, and it gives up as soon as a sample says the board moved.
+#
+# The result is
+#
+#   gyro  -= gyro_bias + gyro_slope * (temperature - reference_temperature)
+#   accel -= accel_offset
+#
+# in the driver's (board) axes. The temperature slope is only measurable when
+# the die temperature changed during the run; otherwise the slope from the
+# previous calibration is kept. ImuCalibration persists the coefficients to
+# flash, and ICM42670.set_calibration() applies them to every read:
+#
+#   cal = ImuCalibration.load() or calibrate(imu)
+#   imu.set_calibration(cal)
+#
+# With the bias removed at the source the attitude filters need no gyro
+# deadband.
+
+import math
+import struct
+import time
+from array import array
+
+CALIBRATION_PATH = 'imucal.bin'
+MAGIC = b'ICAL'
+VERSION = 1
+FILE_FORMAT = '<4sH3f3f3ff'  # magic, version, gyro bias, gyro slope, accel offset, reference temperature
+
+class ImuCalibration:
+    def __init__(self, gyro_bias=(0.0, 0.0, 0.0), gyro_slope=(0.0, 0.0, 0.0),
+                 accel_offset=(0.0, 0.0, 0.0), reference_temperature=25.0):
+        # gyro_bias dps at reference_temperature (C), gyro_slope dps/C,
+        # accel_offset g
+        self.gyro_bias = array('f', gyro_bias)
+        self.gyro_slope = array('f', gyro_slope)
+        self.accel_offset = array('f', accel_offset)
+        self.reference_temperature = reference_temperature
+
+    def gyro_bias_into(self, temperature, out):
+        # Gyro bias (dps) at the given die temperature
+        dt = temperature - self.reference_temperature
+        bias = self.gyro_bias
+        slope = self.gyro_slope
+        out[0] = bias[0] + slope[0] * dt
+        out[1] = bias[1] + slope[1] * dt
+        out[2] = bias[2] + slope[2] * dt
+        return out
+
+    def save(self, path=CALIBRATION_PATH):
+        with open(path, 'wb') as f:
+            f.write(struct.pack(FILE_FORMAT, MAGIC, VERSION, *self.gyro_bias, *self.gyro_slope,
+                                *self.accel_offset, self.reference_temperature))
+
+    @classmethod
+    def load(cls, path=CALIBRATION_PATH):
+        # The saved calibration, or None if there is none (or it is from an
+        # incompatible version)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) != struct.calcsize(FILE_FORMAT):
+            return None
+        values = struct.unpack(FILE_FORMAT, data)
+        if values[0] != MAGIC or values[1] != VERSION:
+            return None
+        return cls(values[2:5], values[5:8], values[8:11], values[11])
+
+class ImuCalibrator:
+    def __init__(self, motion_dps=3.0, motion_g=0.05, settle=10):
+        # A sample more than motion_dps / motion_g away from the running mean
+        # (once settle samples are in) counts as motion
+        self.motion_dps = motion_dps
+        self.motion_g = motion_g
+        self.settle = settle
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.moved = False
+        self._mean = array('f', [0.0] * 7)   # accel xyz, gyro xyz, temperature
+        self._m2 = array('f', [0.0] * 7)
+        self._co = array('f', [0.0] * 3)     # gyro x/y/z with temperature
+
+    def add(self, sample):
+        # Accumulate one read_motion_into(out, with_temp=True) sample. Returns
+        # False (and sets moved) if the board is not stationary.
+        mean = self._mean
+        if self.count >= self.settle:
+            for k in range(6):
+                limit = self.motion_g if k < 3 else self.motion_dps
+                if abs(sample[k] - mean[k]) > limit:
+                    self.moved = True
+                    return False
+        self.count += 1
+        n = self.count
+        m2 = self._m2
+        dt = sample[6] - mean[6]
+        for k in range(7):
+            delta = sample[k] - mean[k]
+            mean[k] += delta / n
+            m2[k] += delta * (sample[k] - mean[k])
+        # Co-moment of each gyro axis with temperature, same update
+        co = self._co
+        for k in range(3):
+            co[k] += dt * (sample[3 + k] - mean[3 + k])
+        return True
+
+    def mean(self, k):
+        return self._mean[k]
+
+    def std(self, k):
+        return math.sqrt(self._m2[k] / (self.count - 1)) if self.count > 1 else 0.0
+
+    def result(self, gravity=None, previous=None, min_temperature_span=1.5):
+        # ImuCalibration from the samples so far. gravity is the expected
+        # accel reading (g, board axes) in the calibration pose, e.g.
+        # (0, 0, 1) flat on the bench; by default only the magnitude error
+        # along the measured direction is removed, which holds in any pose.
+        # Without a usable temperature spread the slope of previous is kept.
+        if self.count < 2:
+            raise ValueError("Not enough samples to calibrate")
+        mean = self._mean
+        if gravity is None:
+            norm = math.sqrt(mean[0] * mean[0] + mean[1] * mean[1] + mean[2] * mean[2])
+            if norm == 0:
+                raise ValueError("No gravity in the accelerometer samples")
+            gravity = (mean[0] / norm, mean[1] / norm, mean[2] / norm)
+        offset = [mean[k] - gravity[k] for k in range(3)]
+
+        variance = self._m2[6]
+        # Spread of the die temperature during the run; with Welford the
+        # +/- 2 std range stands in for min/max
+        if 4 * self.std(6) >= min_temperature_span and variance > 0:
+            slope = [self._co[k] / variance for k in range(3)]
+        elif previous is not None:
+            slope = list(previous.gyro_slope)
+        else:
+            slope = [0.0, 0.0, 0.0]
+        return ImuCalibration([mean[3 + k] for k in range(3)], slope, offset, mean[6])
+
+def calibrate(imu, samples=400, period_ms=5, retries=5, gravity=None,
+              path=CALIBRATION_PATH, previous=None):
+    # Startup routine: average samples stationary readings, starting over
+    # (up to retries times) whenever the board moves, then save. Returns the
+    # ImuCalibration, or None if the board never held still long enough.
+    calibrator = ImuCalibrator()
+    sample = array('f', [0.0] * 7)
+    saved = imu.calibration
+    imu.set_calibration(None)
+    try:
+        for attempt in range(retries + 1):
+            calibrator.reset()
+            while calibrator.count < samples:
+                imu.read_motion_into(sample, with_temp=True)
+                if not calibrator.add(sample):
+                    print("IMU calibration: motion detected, keep the board still")
+                    time.sleep_ms(500)
+                    break
+                time.sleep_ms(period_ms)
+            else:
+                break
+        else:
+            print("IMU calibration aborted")
+            return None
+    finally:
+        imu.set_calibration(saved)
+    calibration = calibrator.result(gravity, previous or saved)
+    calibration.save(path)
+    imu.set_calibration(calibration)
+    bias = calibration.gyro_bias
+    print(f"Saved {path}: gyro bias {bias[0]:.3f} {bias[1]:.3f} {bias[2]:.3f} dps, "
+          f"gyro noise {calibrator.std(3):.3f} dps at {calibration.reference_temperature:.1f} C")
+    return calibration
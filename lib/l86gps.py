@@ -1,107 +1,612 @@
 from machine import UART, Pin
 import time
 
+# Sentence parser states
+_WAIT = 0       # waiting for '$'
+_BODY = 1       # between '$' and '*', checksummed
+_CHECK_HI = 2   # first checksum digit
+_CHECK_LO = 3   # second checksum digit
+_SKIP = 4       # sentence we don't use, ignored up to the next '$'
+
+_MAX_SENTENCE = 82   # NMEA 0183 limit, '$' to checksum
+_MAX_FIELDS = 24
+
+# Sentence ids (3 bytes after the talker) packed into an int
+_GGA = 0x474741
+_RMC = 0x524D43
+_TXT = 0x545854
+_ACK = 0x544B30  # PMTK001
+
+BAUDRATES = (4800, 9600, 14400, 19200, 38400, 57600, 115200)
+
+_DAY_MS = 86400000
+_DRIFT_PPM = 100                    # allowed drift between the module's clock and ours
+_PPS_TIMEOUT_US = 1500000           # PPS edges older than this are stale
+_MAX_EXTRAPOLATION_US = 2000000     # position_at() past the newest fix
+
+# update() result bits
+UPDATED_GGA = 0x01
+UPDATED_RMC = 0x02
+UPDATED_TXT = 0x04  # antenna status changed
+
+def nmea_checksum(body):
+    # XOR of every character between '$' and '*'
+    checksum = 0
+    for c in body.encode():
+        checksum ^= c
+    return checksum
+
+def _hex_digit(c):
+    if 48 <= c <= 57:
+        return c - 48
+    if 65 <= c <= 70:
+        return c - 55
+    if 97 <= c <= 102:
+        return c - 87
+    return -1
+
+def _parse_int(buf, start, end):
+    value = 0
+    for i in range(start, end):
+        value = value * 10 + buf[i] - 48
+    return value
+
+def _parse_float(buf, start, end):
+    # [-]digits[.digits] without building a string
+    negative = start < end and buf[start] == 45
+    if negative:
+        start += 1
+    whole = 0
+    frac = 0
+    div = 1
+    i = start
+    while i < end and buf[i] != 46:
+        whole = whole * 10 + buf[i] - 48
+        i += 1
+    i += 1
+    while i < end:
+        frac = frac * 10 + buf[i] - 48
+        div *= 10
+        i += 1
+    value = whole + frac / div
+    return -value if negative else value
+
+def _parse_coordinate(buf, start, end, hemisphere):
+    # (d)ddmm.mmmm + N/S/E/W -> signed decimal degrees
+    whole = 0
+    i = start
+    while i < end and buf[i] != 46:
+        whole = whole * 10 + buf[i] - 48
+        i += 1
+    frac = 0
+    div = 1
+    i += 1
+    while i < end:
+        frac = frac * 10 + buf[i] - 48
+        div *= 10
+        i += 1
+    degrees = whole // 100 + (whole % 100 + frac / div) / 60.0
+    if hemisphere == 83 or hemisphere == 87:  # 'S', 'W'
+        degrees = -degrees
+    return degrees
+
+def _parse_utc_ms(buf, start, end):
+    # hhmmss[.sss] -> milliseconds since midnight
+    if end - start < 6:
+        return None
+    ms = ((_parse_int(buf, start, start + 2) * 60 + _parse_int(buf, start + 2, start + 4)) * 60
+          + _parse_int(buf, start + 4, start + 6)) * 1000
+    if end - start > 7:
+        digits = end - start - 7
+        frac = _parse_int(buf, start + 7, end)
+        if digits == 1:
+            frac *= 100
+        elif digits == 2:
+            frac *= 10
+        elif digits > 3:
+            frac //= 10 ** (digits - 3)
+        ms += frac
+    return ms
+
+def utc_text(utc_ms):
+    # ms since midnight -> 'hhmmss.sss', as in the sentences
+    utc_ms = utc_ms or 0
+    return '{:02d}{:02d}{:02d}.{:03d}'.format(utc_ms // 3600000, utc_ms // 60000 % 60,
+                                              utc_ms // 1000 % 60, utc_ms % 1000)
+
+class GPSFix:
+    # Latest GPS state, updated in place as sentences arrive. Subscriptable
+    # with the old dict keys (fix['latitude'], ...).
+    __slots__ = ('status', 'latitude', 'longitude', 'altitude', 'satellites',
+                 'quality', 'hdop', 'speed', 'course', 'utc_ms', 'date',
+                 'antenna_status', 'updates', 'rx_us', 'time_us')
+
+    def __init__(self):
+        self.status = 'invalid'   # 'valid', 'no_fix' (GGA) or 'invalid' (RMC)
+        self.latitude = None      # decimal degrees, last known position
+        self.longitude = None
+        self.altitude = None      # m above mean sea level
+        self.satellites = 0
+        self.quality = 0          # GGA fix quality, 0 = no fix
+        self.hdop = None
+        self.speed = None         # knots
+        self.course = None        # degrees true
+        self.utc_ms = None        # UTC time of fix, ms since midnight
+        self.date = None          # ddmmyy
+        self.antenna_status = None
+        self.updates = 0          # GGA/RMC sentences applied
+        self.rx_us = None         # ticks_us the last GGA/RMC finished arriving
+        self.time_us = None       # ticks_us of utc_ms, see L86GPS.ticks_at()
+
+    @property
+    def valid(self):
+        return self.status == 'valid'
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
 class L86GPS:
-    def __init__(self, uart_id=0, tx_pin=0, rx_pin=1):
+    def __init__(self, uart_id=0, tx_pin=0, rx_pin=1, rxbuf=512, pps_pin=None):
         # Default baudrate is 9600 according to datasheet
-        self.uart = UART(uart_id, baudrate=9600, tx=Pin(tx_pin), rx=Pin(rx_pin))
+        self._tx_pin = tx_pin
+        self._rx_pin = rx_pin
+        self._rxbuf = rxbuf
+        self.baudrate = 9600
+        self._byte_us = 10000000 // 9600
+        self.uart = UART(uart_id, baudrate=9600, tx=Pin(tx_pin), rx=Pin(rx_pin), rxbuf=rxbuf)
+        self.fix = GPSFix()
+
+        # Preallocated parser state; sentences may span update() calls
+        self._rx = bytearray(128)
+        self._line = bytearray(_MAX_SENTENCE)
+        self._commas = [0] * (_MAX_FIELDS + 1)
+        self._state = _WAIT
+        self._length = 0
+        self._checksum = 0
+        self._check_hi = 0
+
+        self.sentences = 0         # valid GGA/RMC/TXT sentences seen
+        self.checksum_errors = 0
+        self.overruns = 0          # sentences longer than the NMEA limit
+
+        # PMTK001 acknowledgements seen by update(): command number -> flag
+        # (3 = success); see ack_status()
+        self._acks = {}
+        # After a baud rate change, commands wait here until a valid sentence
+        # shows the module has switched too
+        self._switching = False
+        self._queued = []
+
+        # UTC <-> ticks_us mapping: the module's clock read _sync_utc_ms at
+        # ticks_us _sync_us. Taken from sentence arrival times, or from the
+        # 1PPS edges when pps_pin is wired ('nmea' / 'pps').
+        self.time_source = None
+        self._sync_us = None
+        self._sync_utc_ms = 0
+        self._rx_us = 0           # arrival of the sentence being applied
+        self._start_us = 0
+        self._pps_us = None       # written by the PPS interrupt
+        self._pps_used = None
+
+        # Last two timed GGA positions, for position_at()
+        self._gga_us = None
+        self._gga_lat = self._gga_lon = self._gga_alt = 0.0
+        self._prev_us = None
+        self._prev_lat = self._prev_lon = self._prev_alt = 0.0
+
+        # read_gps(): sentences applied but not yet returned, and the
+        # per-sentence state the fix does not keep apart
+        self._unread = 0
+        self._gga_valid = False
+        self._gga_utc_ms = None
+        self._rmc_valid = False
+        self._rmc_utc_ms = None
+
+        if pps_pin is not None:
+            self._pps = Pin(pps_pin, Pin.IN)
+            self._pps.irq(self._on_pps, Pin.IRQ_RISING)
+
         self.init_module()
-    
+
     def init_module(self):
-        # Enable default configurations as per datasheet
-        self._send_command("$PMTK286,1*23")  # Enable AIC
-        self._send_command("$PMTK314,1,1,1,1,1,1,0,0,0,0,0,0,0,0,0,0,0,1,0*28")  # Enable default NMEA sentences
-        self._send_command("$PMTK220,1000*1F")  # Set update rate to 1Hz
-        
-    def _send_command(self, command):
-        self.uart.write((command + '\r\n').encode())
-        time.sleep(0.1)
-    
-    def read_gps(self):
-        if self.uart.any():
-            try:
-                sentence = self.uart.readline().decode('utf-8').strip()
-                if sentence.startswith('$GPGGA'):
-                    return self.parse_gpgga(sentence)
-                elif sentence.startswith('$GPRMC'):
-                    return self.parse_gprmc(sentence)
-                elif sentence.startswith('$GPTXT'):
-                    return self.parse_gptxt(sentence)
-            except Exception:
+        # Enable default configurations as per datasheet. Not waited for, so
+        # the constructor returns at once even with no module attached.
+        self._send_command("PMTK286,1")  # Enable AIC
+        self._send_command("PMTK314,1,1,1,1,1,1,0,0,0,0,0,0,0,0,0,0,0,1,0")  # Enable default NMEA sentences
+        self._send_command("PMTK220,1000")  # Set update rate to 1Hz
+
+    def _send_command(self, body, wait_ack=False, timeout_ms=1000):
+        # Send $<body>*hh. With wait_ack, wait for the module's PMTK001
+        # acknowledgement, which can queue behind a whole burst of sentences
+        # (~0.6 s of the default set at 9600 baud), and return True if the
+        # command was accepted, False if it was rejected or no acknowledgement
+        # arrived in time. Otherwise return None at once; update() still
+        # records the acknowledgement for ack_status().
+        command = int(body[4:7])
+        self._acks.pop(command, None)
+        start = time.ticks_ms()
+        if self._switching:
+            if not wait_ack:
+                self._queued.append(body)
                 return None
+            while self._switching:  # update() sends the queue once it is
+                if time.ticks_diff(time.ticks_ms(), start) >= timeout_ms:
+                    return False
+                self.update()
+                time.sleep_ms(5)
+        self._write_command(body)
+        if not wait_ack:
+            return None
+        while time.ticks_diff(time.ticks_ms(), start) < timeout_ms:
+            self.update()
+            if command in self._acks:
+                return self._acks[command] == 3
+            time.sleep_ms(5)
+        return False
+
+    def _write_command(self, body):
+        self.uart.write('${}*{:02X}\r\n'.format(body, nmea_checksum(body)).encode())
+
+    def _switched(self):
+        # First valid sentence at the new baud rate
+        self._switching = False
+        for body in self._queued:
+            self._write_command(body)
+        self._queued.clear()
+
+    def ack_status(self, command):
+        # For the last PMTK<command> sent: True if acknowledged as accepted,
+        # False if rejected, None if no acknowledgement has been parsed yet
+        flag = self._acks.get(command)
+        if flag is None:
+            return None
+        return flag == 3
+
+    def set_update_rate(self, rate_hz, wait_ack=False):
+        # Position fix rate, 1-10 Hz. Above 1 Hz, trim the sentences with
+        # set_sentences() and raise the baud rate so each fix fits on the wire.
+        # Returns the acknowledgement with wait_ack (see _send_command).
+        if not 1 <= rate_hz <= 10:
+            raise ValueError("Invalid GPS update rate")
+        return self._send_command('PMTK220,{}'.format(int(1000 / rate_hz)), wait_ack)
+
+    def set_sentences(self, gga=1, rmc=1, vtg=0, gsa=0, gsv=0, gll=0, wait_ack=False):
+        # Sentence output, each value is "every N fixes" (0 = off). Defaults
+        # to GGA + RMC only, which is all update() uses.
+        for rate in (gga, rmc, vtg, gsa, gsv, gll):
+            if not 0 <= rate <= 5:
+                raise ValueError("Invalid NMEA sentence rate")
+        return self._send_command('PMTK314,{},{},{},{},{},{},0,0,0,0,0,0,0,0,0,0,0,0,0'.format(
+            gll, rmc, vtg, gga, gsa, gsv), wait_ack)
+
+    def set_baudrate(self, baudrate):
+        # Switch the module's UART and re-initialise ours to match. PMTK251 is
+        # not acknowledged reliably (any ack comes back at the old rate while
+        # the switch is under way), so it is not waited for; instead later
+        # commands are held back until a valid sentence arrives at the new
+        # rate, so none are sent while the module is still at the old one.
+        if baudrate not in BAUDRATES:
+            raise ValueError("Unsupported GPS baud rate")
+        self._send_command('PMTK251,{}'.format(baudrate))
+        self.uart.flush()
+        time.sleep_ms(20)  # the module's own switch-over
+        self.update()      # what already arrived at the old rate
+        self._switching = True
+        self.uart.init(baudrate=baudrate, tx=Pin(self._tx_pin), rx=Pin(self._rx_pin),
+                       rxbuf=self._rxbuf)
+        self.baudrate = baudrate
+        self._byte_us = 10000000 // baudrate
+        self._state = _WAIT  # drop any sentence cut by the switch
+
+    def configure(self, rate_hz=10, baudrate=115200, gga=1, rmc=1, wait_ack=False):
+        # Fast, lean output for flight: baud rate first so there is room on the
+        # wire, then the sentence mask, then the fix rate. With wait_ack,
+        # returns True if the sentence and rate commands were both
+        # acknowledged (up to ~2 s with no module); otherwise returns at once
+        # and ack_status(314) / ack_status(220) tell once update() has run.
+        if baudrate != self.baudrate:
+            self.set_baudrate(baudrate)
+        sentences = self.set_sentences(gga=gga, rmc=rmc, wait_ack=wait_ack)
+        rate = self.set_update_rate(rate_hz, wait_ack)
+        if wait_ack:
+            return sentences and rate
         return None
-    
-    def parse_gpgga(self, sentence):
-        try:
-            parts = sentence.split(',')
-            if parts[6] == '0':  # Fix quality indicator
+
+    def update(self):
+        # Drain every byte waiting in the UART and apply each complete, valid
+        # sentence to self.fix. Returns UPDATED_GGA/UPDATED_RMC/UPDATED_TXT bits
+        # for what changed, 0 if nothing did.
+        #
+        # Bytes queued in the UART arrived back to back at the line rate, so
+        # a sentence's arrival time is worked out from how many bytes came in
+        # after it, not from when update() happened to run.
+        updated = 0
+        rx = self._rx
+        line = self._line
+        state = self._state
+        length = self._length
+        checksum = self._checksum
+        while True:
+            count = self.uart.readinto(rx)
+            if not count:
+                break
+            now = time.ticks_us()
+            behind = count - 1 + self.uart.any()
+            for i in range(count):
+                c = rx[i]
+                if c == 36:  # '$' always starts a new sentence
+                    state = _BODY
+                    length = 0
+                    checksum = 0
+                elif state == _BODY:
+                    if c == 42:  # '*'
+                        state = _CHECK_HI
+                    elif length < _MAX_SENTENCE:
+                        line[length] = c
+                        length += 1
+                        checksum ^= c
+                        if length == 5 and not self._wanted(line):
+                            state = _SKIP
+                    else:
+                        self.overruns += 1
+                        state = _WAIT
+                elif state == _CHECK_HI:
+                    self._check_hi = _hex_digit(c)
+                    state = _CHECK_LO
+                elif state == _CHECK_LO:
+                    state = _WAIT
+                    lo = _hex_digit(c)
+                    if self._check_hi < 0 or lo < 0 or (self._check_hi << 4 | lo) != checksum:
+                        self.checksum_errors += 1
+                    else:
+                        self.sentences += 1
+                        if self._switching:
+                            self._switched()
+                        self._rx_us = time.ticks_add(now, -(behind - i) * self._byte_us)
+                        # '$', the body and '*h' went out before this byte
+                        self._start_us = time.ticks_add(self._rx_us, -(length + 3) * self._byte_us)
+                        updated |= self._apply(line, length)
+            if count < len(rx):
+                break
+        self._state = state
+        self._length = length
+        self._checksum = checksum
+        return updated
+
+    def _wanted(self, line):
+        sentence = line[2] << 16 | line[3] << 8 | line[4]
+        return sentence == _GGA or sentence == _RMC or sentence == _TXT or sentence == _ACK
+
+    def _apply(self, line, length):
+        if length < 6:
+            return 0
+        # Field k spans commas[k - 1] + 1 .. commas[k]; field 0 is the address
+        commas = self._commas
+        fields = 0
+        for i in range(length):
+            if line[i] == 44 and fields < _MAX_FIELDS:
+                commas[fields] = i
+                fields += 1
+        commas[fields] = length
+
+        sentence = line[2] << 16 | line[3] << 8 | line[4]
+        if sentence == _GGA and fields >= 10:
+            return self._apply_gga(line, commas)
+        if sentence == _RMC and fields >= 9:
+            return self._apply_rmc(line, commas)
+        if sentence == _TXT and fields >= 4:
+            return self._apply_txt(line, commas[3] + 1, length)
+        if sentence == _ACK and fields >= 2 and line[5] == 48 and line[6] == 49:
+            # $PMTK001,<command>,<flag>
+            self._acks[_parse_int(line, commas[0] + 1, commas[1])] = _parse_int(line, commas[1] + 1, commas[2])
+        return 0
+
+    def _apply_gga(self, line, c):
+        fix = self.fix
+        if c[1] > c[0] + 1:
+            fix.utc_ms = _parse_utc_ms(line, c[0] + 1, c[1])
+        self._timestamp(fix)
+        quality = _parse_int(line, c[5] + 1, c[6])
+        fix.quality = quality
+        fix.satellites = _parse_int(line, c[6] + 1, c[7])
+        self._gga_utc_ms = fix.utc_ms
+        self._gga_valid = False
+        if quality == 0 or c[2] == c[1] + 1 or c[4] == c[3] + 1:
+            fix.status = 'no_fix'
+        else:
+            fix.latitude = _parse_coordinate(line, c[1] + 1, c[2], line[c[2] + 1])
+            fix.longitude = _parse_coordinate(line, c[3] + 1, c[4], line[c[4] + 1])
+            if c[8] > c[7] + 1:
+                fix.hdop = _parse_float(line, c[7] + 1, c[8])
+            if c[9] > c[8] + 1:
+                fix.altitude = _parse_float(line, c[8] + 1, c[9])
+            fix.status = 'valid'
+            self._gga_valid = True
+            if fix.time_us is not None and fix.altitude is not None:
+                self._prev_us = self._gga_us
+                self._prev_lat = self._gga_lat
+                self._prev_lon = self._gga_lon
+                self._prev_alt = self._gga_alt
+                self._gga_us = fix.time_us
+                self._gga_lat = fix.latitude
+                self._gga_lon = fix.longitude
+                self._gga_alt = fix.altitude
+        fix.updates += 1
+        return UPDATED_GGA
+
+    def _apply_rmc(self, line, c):
+        fix = self.fix
+        if c[1] > c[0] + 1:
+            fix.utc_ms = _parse_utc_ms(line, c[0] + 1, c[1])
+        self._timestamp(fix)
+        self._rmc_utc_ms = fix.utc_ms
+        self._rmc_valid = False
+        if line[c[1] + 1] != 65:  # 'A' = valid, 'V' = invalid
+            fix.status = 'invalid'
+        else:
+            fix.latitude = _parse_coordinate(line, c[2] + 1, c[3], line[c[3] + 1])
+            fix.longitude = _parse_coordinate(line, c[4] + 1, c[5], line[c[5] + 1])
+            if c[7] > c[6] + 1:
+                fix.speed = _parse_float(line, c[6] + 1, c[7])
+            if c[8] > c[7] + 1:
+                fix.course = _parse_float(line, c[7] + 1, c[8])
+            if c[9] > c[8] + 1:
+                fix.date = _parse_int(line, c[8] + 1, c[9])
+            fix.status = 'valid'
+            self._rmc_valid = True
+        fix.updates += 1
+        return UPDATED_RMC
+
+    def _on_pps(self, pin):
+        # Rising edge at the top of every UTC second
+        self._pps_us = time.ticks_us()
+
+    def _timestamp(self, fix):
+        # Stamp the sentence being applied and refine the UTC mapping with it
+        fix.rx_us = self._rx_us
+        utc_ms = fix.utc_ms
+        if utc_ms is None:
+            fix.time_us = None
+            return
+
+        pps = self._pps_us
+        if (pps is not None and pps != self._pps_used and self._sync_us is not None
+                and 0 <= time.ticks_diff(self._rx_us, pps) < _PPS_TIMEOUT_US):
+            # The edge marks the whole second nearest to where the current
+            # mapping puts it, which is good to well under half a second
+            self._pps_used = pps
+            self._sync(int(self.utc_at(pps) + 500) // 1000 * 1000 % _DAY_MS, pps)
+            self.time_source = 'pps'
+        elif (self.time_source != 'pps' or
+              time.ticks_diff(self._rx_us, self._sync_us) >= _PPS_TIMEOUT_US):
+            # No PPS: the fix can't have been taken after its sentence started
+            # going out, and arrival times are only upper bounds (the line may
+            # have gone idle before update() ran), so keep the earliest start
+            # seen, letting it slip later only as fast as the clocks can drift.
+            # What remains is the module's output latency, a few ms at 115200.
+            epoch = self.ticks_at(utc_ms)
+            if epoch is None:
+                self._sync(utc_ms, self._start_us)
+            else:
+                lag = time.ticks_diff(self._start_us, epoch)
+                drift = abs(time.ticks_diff(self._start_us, self._sync_us)) * _DRIFT_PPM // 1000000
+                if lag < drift:
+                    self._sync(utc_ms, self._start_us)
+                else:
+                    self._sync(utc_ms, time.ticks_add(epoch, drift))
+            self.time_source = 'nmea'
+        fix.time_us = self.ticks_at(utc_ms)
+
+    def _sync(self, utc_ms, ticks_us):
+        self._sync_utc_ms = utc_ms
+        self._sync_us = ticks_us
+
+    def ticks_at(self, utc_ms):
+        # ticks_us at which the module's clock read utc_ms (ms since midnight),
+        # None before the first timed sentence. Good within ~8 minutes of the
+        # latest fix, the ticks_us wrap.
+        if self._sync_us is None:
+            return None
+        delta = utc_ms - self._sync_utc_ms
+        if delta > _DAY_MS // 2:
+            delta -= _DAY_MS
+        elif delta < -_DAY_MS // 2:
+            delta += _DAY_MS
+        return time.ticks_add(self._sync_us, int(delta * 1000))
+
+    def utc_at(self, ticks_us):
+        # UTC ms since midnight at ticks_us, None before the first timed sentence
+        if self._sync_us is None:
+            return None
+        return (self._sync_utc_ms + time.ticks_diff(ticks_us, self._sync_us) / 1000) % _DAY_MS
+
+    def position_at(self, ticks_us, out):
+        # Latitude, longitude and altitude at ticks_us (e.g. an IMU sample),
+        # interpolated between the last two valid GGA fixes and extrapolated
+        # at most 2 s past the newest. Written into out['latitude'] etc.;
+        # returns False, leaving out alone, until there is a timed fix.
+        if self._gga_us is None:
+            return False
+        latitude = self._gga_lat
+        longitude = self._gga_lon
+        altitude = self._gga_alt
+        if self._prev_us is not None:
+            span = time.ticks_diff(self._gga_us, self._prev_us)
+            if span > 0:
+                dt = time.ticks_diff(ticks_us, self._gga_us)
+                if dt > _MAX_EXTRAPOLATION_US:
+                    dt = _MAX_EXTRAPOLATION_US
+                elif dt < -span:
+                    dt = -span
+                k = dt / span
+                latitude += (latitude - self._prev_lat) * k
+                longitude += (longitude - self._prev_lon) * k
+                altitude += (altitude - self._prev_alt) * k
+        out['latitude'] = latitude
+        out['longitude'] = longitude
+        out['altitude'] = altitude
+        return True
+
+    def _apply_txt(self, line, start, end):
+        # Antenna status messages: $GPTXT,01,01,02,ANTSTATUS=OK
+        if line[start:start + 10] == b'ANTSTATUS=':
+            status = line[start + 10:end]
+            if self.fix.antenna_status is None or status != self.fix.antenna_status.encode():
+                self.fix.antenna_status = status.decode()
+                return UPDATED_TXT
+        return 0
+
+    def read_gps(self):
+        # Compatibility wrapper for the older scripts: drains the UART like
+        # update() and returns one dict per call, as the old line reader did:
+        # GPGGA, then GPRMC, then GPTXT (antenna status changes), or None.
+        # Sentences that arrived together are returned by the following
+        # calls. Only the newest sentence of each type is kept. New code
+        # should call update() and read self.fix instead.
+        self._unread |= self.update()
+        unread = self._unread
+        fix = self.fix
+        if unread & UPDATED_GGA:
+            self._unread &= ~UPDATED_GGA
+            if not self._gga_valid:
                 return {'type': 'GPGGA', 'status': 'no_fix'}
-            
             return {
                 'type': 'GPGGA',
                 'status': 'valid',
-                'time': parts[1],
-                'latitude': self._convert_to_degrees(parts[2], parts[3]),
-                'longitude': self._convert_to_degrees(parts[4], parts[5]),
-                'quality': int(parts[6]),
-                'satellites': int(parts[7]),
-                'altitude': float(parts[9]),
-                'altitude_unit': parts[10]
+                'time': utc_text(self._gga_utc_ms),
+                'latitude': fix.latitude,
+                'longitude': fix.longitude,
+                'quality': fix.quality,
+                'satellites': fix.satellites,
+                'altitude': fix.altitude,
+                'altitude_unit': 'M'
             }
-        except Exception as e:
-            return {'type': 'GPGGA', 'status': 'error', 'error': str(e)}
-    
-    def parse_gprmc(self, sentence):
-        try:
-            parts = sentence.split(',')
-            if parts[2] != 'A':  # A = valid, V = invalid
+        if unread & UPDATED_RMC:
+            self._unread &= ~UPDATED_RMC
+            if not self._rmc_valid:
                 return {'type': 'GPRMC', 'status': 'invalid'}
-            
             return {
                 'type': 'GPRMC',
                 'status': 'valid',
-                'time': parts[1],
-                'latitude': self._convert_to_degrees(parts[3], parts[4]),
-                'longitude': self._convert_to_degrees(parts[5], parts[6]),
-                'speed': float(parts[7]),
-                'date': parts[9]
+                'time': utc_text(self._rmc_utc_ms),
+                'latitude': fix.latitude,
+                'longitude': fix.longitude,
+                'speed': fix.speed,
+                'date': '{:06d}'.format(fix.date) if fix.date is not None else ''
             }
-        except Exception as e:
-            return {'type': 'GPRMC', 'status': 'error', 'error': str(e)}
-    
-    def parse_gptxt(self, sentence):
-        # Parse antenna status messages
-        try:
-            parts = sentence.split(',')
-            if 'ANTSTATUS' in sentence:
-                return {
-                    'type': 'GPTXT',
-                    'antenna_status': parts[-1].split('*')[0]
-                }
-        except Exception:
-            return None
-    
-    def _convert_to_degrees(self, value, direction):
-        if not value:
-            return None
-        
-        try:
-            # Handle NMEA format (ddmm.mmmm)
-            decimal_degrees = float(value[:2]) + float(value[2:]) / 60.0
-            if direction in ['S', 'W']:
-                decimal_degrees = -decimal_degrees
-            return round(decimal_degrees, 6)
-        except Exception:
-            return None
-            
+        if unread & UPDATED_TXT:
+            self._unread &= ~UPDATED_TXT
+            return {'type': 'GPTXT', 'antenna_status': fix.antenna_status}
+        return None
+
     def enable_easy(self):
-        self._send_command("$PMTK869,1,1*34")
-        
+        self._send_command("PMTK869,1,1")
+
     def disable_easy(self):
-        self._send_command("$PMTK869,1,0*34")
-        
+        self._send_command("PMTK869,1,0")
+
     def enter_standby(self):
-        self._send_command("$PMTK161,0*28")
-        
+        self._send_command("PMTK161,0")
+
     def enter_backup(self):
-        self._send_command("$PMTK225,4*2F")
\ No newline at end of file
+        self._send_command("PMTK225,4")
@@ -0,0 +1,207 @@
+# linalg.py
+#
+# Small dense linear algebra for the on-board filters. Matrices are flat,
+# row-major array('f') buffers (element (i, j) of an n x m matrix at
+# a[i * m + j]) that the caller allocates once; every kernel writes into a
+# caller-owned output and returns it, so a filter step builds no lists.
+#
+#   gemm        out = alpha * A B (or A B^T) + beta * out
+#   syrk        out = alpha * A A^T + beta * out, both triangles
+#   cholesky    in-place lower factor of a symmetric positive definite matrix
+#   solve_lower, solve_upper_t, cho_solve    triangular / Cholesky solves
+#   cho_solve_rows                           X A = B for every row of B
+#   mat3_mul, mat3_vec, mat3_t_vec, mat4_mul, mat4_vec, quat_mul
+#                                            fixed-size fast paths
+#
+# Outputs must not alias inputs unless a function says otherwise.
+#
+# The loop kernels are compiled with the native emitter on the board, which
+# takes the bytecode dispatch out of the inner loops (float arithmetic still
+# goes through the runtime). Viper gains nothing here: its fast paths are
+# integer and pointer arithmetic, and float32 arrays would come back as raw
+# bit patterns.
+
+import math
+
+try:
+    import micropython
+except ImportError:
+    class micropython:
+        # Plain Python on the host
+        @staticmethod
+        def native(f):
+            return f
+
+@micropython.native
+def gemm(a, b, out, n, k, m, alpha=1.0, beta=0.0, trans_b=False):
+    # out (n x m) = alpha * A (n x k) B (k x m) + beta * out; with trans_b, B
+    # is given as its m x k transpose
+    for i in range(n):
+        ik = i * k
+        im = i * m
+        for j in range(m):
+            s = 0.0
+            if trans_b:
+                jk = j * k
+                for p in range(k):
+                    s += a[ik + p] * b[jk + p]
+            else:
+                for p in range(k):
+                    s += a[ik + p] * b[p * m + j]
+            if beta == 0.0:
+                out[im + j] = alpha * s
+            else:
+                out[im + j] = alpha * s + beta * out[im + j]
+    return out
+
+@micropython.native
+def syrk(a, out, n, k, alpha=1.0, beta=0.0):
+    # Symmetric rank-k update: out (n x n) = alpha * A (n x k) A^T + beta * out.
+    # Only the upper triangle is computed; it is mirrored into the lower.
+    for i in range(n):
+        ik = i * k
+        for j in range(i, n):
+            jk = j * k
+            s = 0.0
+            for p in range(k):
+                s += a[ik + p] * a[jk + p]
+            if beta == 0.0:
+                v = alpha * s
+            else:
+                v = alpha * s + beta * out[i * n + j]
+            out[i * n + j] = v
+            out[j * n + i] = v
+    return out
+
+@micropython.native
+def cholesky(a, n):
+    # In-place lower Cholesky factor of the symmetric n x n a (the upper
+    # triangle is zeroed). Returns False if a is not positive definite.
+    for j in range(n):
+        jn = j * n
+        s = a[jn + j]
+        for p in range(j):
+            s -= a[jn + p] * a[jn + p]
+        if s <= 0:
+            return False
+        d = math.sqrt(s)
+        a[jn + j] = d
+        for i in range(j + 1, n):
+            i_n = i * n
+            s = a[i_n + j]
+            for p in range(j):
+                s -= a[i_n + p] * a[jn + p]
+            a[i_n + j] = s / d
+            a[jn + i] = 0.0
+    return True
+
+@micropython.native
+def solve_lower(l, b, n, offset=0):
+    # L y = b in place, b[offset:offset + n], with L the lower factor
+    for i in range(n):
+        i_n = i * n
+        s = b[offset + i]
+        for p in range(i):
+            s -= l[i_n + p] * b[offset + p]
+        b[offset + i] = s / l[i_n + i]
+    return b
+
+@micropython.native
+def solve_upper_t(l, b, n, offset=0):
+    # L^T x = b in place, b[offset:offset + n], with L the lower factor
+    for i in range(n - 1, -1, -1):
+        s = b[offset + i]
+        for p in range(i + 1, n):
+            s -= l[p * n + i] * b[offset + p]
+        b[offset + i] = s / l[i * n + i]
+    return b
+
+def cho_solve(l, b, n, offset=0):
+    # A x = b in place given L = cholesky(A)
+    solve_lower(l, b, n, offset)
+    return solve_upper_t(l, b, n, offset)
+
+def cho_solve_rows(l, b, rows, n):
+    # X A = B in place for the rows x n B, given L = cholesky(A) of the
+    # symmetric n x n A: each row of B is solved against A. This is the
+    # Kalman gain K = Pxz S^-1 without forming S^-1.
+    for r in range(rows):
+        solve_lower(l, b, n, r * n)
+        solve_upper_t(l, b, n, r * n)
+    return b
+
+def mat3_mul(a, b, out):
+    # out = A B, 3 x 3
+    out[0] = a[0] * b[0] + a[1] * b[3] + a[2] * b[6]
+    out[1] = a[0] * b[1] + a[1] * b[4] + a[2] * b[7]
+    out[2] = a[0] * b[2] + a[1] * b[5] + a[2] * b[8]
+    out[3] = a[3] * b[0] + a[4] * b[3] + a[5] * b[6]
+    out[4] = a[3] * b[1] + a[4] * b[4] + a[5] * b[7]
+    out[5] = a[3] * b[2] + a[4] * b[5] + a[5] * b[8]
+    out[6] = a[6] * b[0] + a[7] * b[3] + a[8] * b[6]
+    out[7] = a[6] * b[1] + a[7] * b[4] + a[8] * b[7]
+    out[8] = a[6] * b[2] + a[7] * b[5] + a[8] * b[8]
+    return out
+
+def mat3_vec(a, v, out):
+    # out = A v; out may alias v
+    x = v[0]
+    y = v[1]
+    z = v[2]
+    out[0] = a[0] * x + a[1] * y + a[2] * z
+    out[1] = a[3] * x + a[4] * y + a[5] * z
+    out[2] = a[6] * x + a[7] * y + a[8] * z
+    return out
+
+def mat3_t_vec(a, v, out):
+    # out = A^T v; out may alias v
+    x = v[0]
+    y = v[1]
+    z = v[2]
+    out[0] = a[0] * x + a[3] * y + a[6] * z
+    out[1] = a[1] * x + a[4] * y + a[7] * z
+    out[2] = a[2] * x + a[5] * y + a[8] * z
+    return out
+
+@micropython.native
+def mat4_mul(a, b, out):
+    # out = A B, 4 x 4
+    for i in range(0, 16, 4):
+        a0 = a[i]
+        a1 = a[i + 1]
+        a2 = a[i + 2]
+        a3 = a[i + 3]
+        out[i] = a0 * b[0] + a1 * b[4] + a2 * b[8] + a3 * b[12]
+        out[i + 1] = a0 * b[1] + a1 * b[5] + a2 * b[9] + a3 * b[13]
+        out[i + 2] = a0 * b[2] + a1 * b[6] + a2 * b[10] + a3 * b[14]
+        out[i + 3] = a0 * b[3] + a1 * b[7] + a2 * b[11] + a3 * b[15]
+    return out
+
+def mat4_vec(a, v, out):
+    # out = A v; out may alias v
+    x = v[0]
+    y = v[1]
+    z = v[2]
+    w = v[3]
+    out[0] = a[0] * x + a[1] * y + a[2] * z + a[3] * w
+    out[1] = a[4] * x + a[5] * y + a[6] * z + a[7] * w
+    out[2] = a[8] * x + a[9] * y + a[10] * z + a[11] * w
+    out[3] = a[12] * x + a[13] * y + a[14] * z + a[15] * w
+    return out
+
+def quat_mul(a, ao, b, bo, out, oo):
+    # Hamilton product out[oo:oo + 4] = a[ao:ao + 4] * b[bo:bo + 4], (w, x,
+    # y, z) order; out may alias a or b
+    w1 = a[ao]
+    x1 = a[ao + 1]
+    y1 = a[ao + 2]
+    z1 = a[ao + 3]
+    w2 = b[bo]
+    x2 = b[bo + 1]
+    y2 = b[bo + 2]
+    z2 = b[bo + 3]
+    out[oo] = w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2
+    out[oo + 1] = w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2
+    out[oo + 2] = w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2
+    out[oo + 3] = w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2
+    return out
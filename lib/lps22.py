@@ -5,25 +5,77 @@
 # v1.0 2016.4
 # v2.0 2019.7
 
+import time
+from array import array
+
+from altitude import BaroAltimeter
+
 LPS22_CTRL_REG1    = const(0x10)
 LPS22_CTRL_REG2    = const(0x11)
+LPS22_CTRL_REG3    = const(0x12)
+LPS22_FIFO_CTRL    = const(0x14)
+LPS22_FIFO_STATUS  = const(0x26)
 LPS22_STATUS       = const(0x27)
 LPS22_TEMP_OUT_L   = const(0x2B)
 LPS22_PRESS_OUT_XL = const(0x28)
 LPS22_PRESS_OUT_L  = const(0x29)
 
+# CTRL_REG1 low-pass filter on pressure, bandwidth ODR/2 (off), ODR/9, ODR/20
+LPS22_LPF_OFF      = const(0x00)
+LPS22_LPF_ODR9     = const(0x08)
+LPS22_LPF_ODR20    = const(0x0C)
+LPS22_BDU          = const(0x02)
+
+# Output data rates (Hz) by CTRL_REG1 ODR[2:0]; 0 = power down / one-shot
+LPS22_ODR = (0, 1, 10, 25, 50, 75)
+
+# FIFO_CTRL F_MODE[2:0], FIFO_EN in CTRL_REG2, watermark flag/interrupt
+LPS22_FIFO_BYPASS  = const(0x00)
+LPS22_FIFO_FIFO    = const(0x20)
+LPS22_FIFO_STREAM  = const(0x40)
+LPS22_FIFO_EN      = const(0x40)
+LPS22_INT_F_FTH    = const(0x10)
+LPS22_FIFO_DEPTH   = const(32)
+
 class LPS22():
-    def __init__(self, i2c, addr = 0x5D):
+    def __init__(self, i2c, addr = 0x5D, odr = 1, lpf = LPS22_LPF_ODR9):
         self.i2c = i2c
         self.addr = addr
         self.tb = bytearray(1)
         self.rb = bytearray(1)
+        self.burst = bytearray(5)  # PRESS_OUT_XL..TEMP_OUT_H
+        self.odr = odr
+        self.fifo = False
+        self.fifo_overruns = 0
+        self.fifo_t = None         # ticks_us given to the newest drained sample
+        self.fifo_buf = None       # allocated by fifo_mode()
         self.oneshot = False
         self.irq_v = [0, 0]
-        # ODR=1 EN_LPFP=1 BDU=1
-        self.setreg(LPS22_CTRL_REG1, 0x1A)
+        self.get_v = [0.0, 0.0]    # get()'s reading, kept apart from irq_v
+        self.altimeter = None      # BaroAltimeter, built by arm() / altitude()
+        self.odr_bits = self._odr_bits(odr)
+        # ODR, LPF, BDU=1 (1 Hz, ODR/9 by default)
+        self.setreg(LPS22_CTRL_REG1, self.odr_bits | lpf | LPS22_BDU)
         self.oneshot_mode(False)
 
+    def _odr_bits(self, odr):
+        if odr not in LPS22_ODR or odr == 0:
+            raise ValueError("Invalid LPS22 output data rate")
+        return LPS22_ODR.index(odr) << 4
+
+    def set_odr(self, odr):
+        # Continuous output data rate: 1, 10, 25, 50 or 75 Hz
+        self.odr_bits = self._odr_bits(odr)
+        self.odr = odr
+        if not self.oneshot:
+            self.setreg(LPS22_CTRL_REG1, (self.getreg(LPS22_CTRL_REG1) & 0x8F) | self.odr_bits)
+
+    def set_lpf(self, lpf):
+        # LPS22_LPF_OFF, LPS22_LPF_ODR9 or LPS22_LPF_ODR20
+        if lpf not in (LPS22_LPF_OFF, LPS22_LPF_ODR9, LPS22_LPF_ODR20):
+            raise ValueError("Invalid LPS22 low-pass filter")
+        self.setreg(LPS22_CTRL_REG1, (self.getreg(LPS22_CTRL_REG1) & 0xF3) | lpf)
+
     def oneshot_mode(self, oneshot=None):
         if oneshot is None:
             return self.oneshot
@@ -31,7 +83,7 @@ class LPS22():
             self.getreg(LPS22_CTRL_REG1)
             self.oneshot = oneshot
             if oneshot: self.rb[0] &= 0x0F
-            else: self.rb[0] |= 0x10
+            else: self.rb[0] = (self.rb[0] & 0x0F) | self.odr_bits
             self.setreg(LPS22_CTRL_REG1, self.rb[0])
 
     def int16(self, d):
@@ -48,13 +100,94 @@ class LPS22():
     def get2reg(self, reg):
         return self.getreg(reg) + self.getreg(reg+1) * 256
 
-    def ONE_SHOT(self, b):
+    def ONE_SHOT(self, b, timeout_ms = 50):
+        # Conversion takes ~13 ms with the LPF on; give up rather than spin
+        # forever on a wedged sensor or bus
         if self.oneshot:
             self.setreg(LPS22_CTRL_REG2, self.getreg(LPS22_CTRL_REG2) | 0x01)
             self.getreg(0x28 + b*2)
+            start = time.ticks_ms()
             while 1:
                 if self.getreg(LPS22_STATUS) & b:
                     return
+                if time.ticks_diff(time.ticks_ms(), start) > timeout_ms:
+                    raise OSError("LPS22 one-shot conversion timed out")
+
+    def fifo_mode(self, mode = LPS22_FIFO_STREAM, watermark = 0, int_watermark = False):
+        # Buffer samples on chip at the continuous ODR: LPS22_FIFO_STREAM keeps
+        # the newest 32 (overwriting), LPS22_FIFO_FIFO stops when full,
+        # LPS22_FIFO_BYPASS turns the FIFO off. watermark (1-31, 0 = off) sets
+        # FTH in FIFO_STATUS and, with int_watermark, drives INT_DRDY.
+        if mode not in (LPS22_FIFO_BYPASS, LPS22_FIFO_FIFO, LPS22_FIFO_STREAM):
+            raise ValueError("Invalid LPS22 FIFO mode")
+        if not 0 <= watermark < LPS22_FIFO_DEPTH:
+            raise ValueError("Invalid LPS22 FIFO watermark")
+        if mode != LPS22_FIFO_BYPASS and self.oneshot:
+            raise ValueError("LPS22 FIFO needs continuous mode")
+        if self.fifo_buf is None and mode != LPS22_FIFO_BYPASS:
+            # One view per possible sample count, so drain_into() can burst
+            # read without slicing
+            self.fifo_buf = bytearray(5 * LPS22_FIFO_DEPTH)
+            mv = memoryview(self.fifo_buf)
+            self.fifo_views = [mv[:5 * n] for n in range(LPS22_FIFO_DEPTH + 1)]
+        # Passing through bypass empties the FIFO
+        self.setreg(LPS22_FIFO_CTRL, LPS22_FIFO_BYPASS)
+        reg2 = self.getreg(LPS22_CTRL_REG2) & ~LPS22_FIFO_EN
+        reg3 = self.getreg(LPS22_CTRL_REG3) & ~LPS22_INT_F_FTH
+        if mode != LPS22_FIFO_BYPASS:
+            reg2 |= LPS22_FIFO_EN
+            if int_watermark and watermark:
+                reg3 |= LPS22_INT_F_FTH
+        self.setreg(LPS22_CTRL_REG3, reg3)
+        self.setreg(LPS22_CTRL_REG2, reg2)
+        self.setreg(LPS22_FIFO_CTRL, mode | watermark)
+        self.fifo = mode != LPS22_FIFO_BYPASS
+        self.fifo_t = None
+
+    def fifo_level(self):
+        # Unread samples (0-32)
+        return self.getreg(LPS22_FIFO_STATUS) & 0x3F
+
+    def drain_into(self, out, times = None):
+        # Read every sample in the FIFO with one burst, oldest first, into
+        # out[2k] = pressure (hPa), out[2k + 1] = temperature (C), up to
+        # len(out) // 2 samples. If given, times[k] gets the sample's ticks_us,
+        # spread evenly since the previous drain (nominal ODR after an overrun
+        # or on the first call); the newest is put half a period before now.
+        # Returns the number of samples.
+        status = self.getreg(LPS22_FIFO_STATUS)
+        now = time.ticks_us()
+        level = status & 0x3F
+        n = level
+        if n > len(out) // 2:
+            n = len(out) // 2
+        if n == 0:
+            return 0
+        b = self.fifo_buf
+        self.i2c.readfrom_mem_into(self.addr, LPS22_PRESS_OUT_XL, self.fifo_views[n])
+        for k in range(n):
+            i = 5 * k
+            p = b[i] | b[i + 1] << 8 | b[i + 2] << 16
+            if p & 0x800000:
+                p -= 0x1000000
+            out[2 * k] = p / 4096
+            out[2 * k + 1] = self.int16(b[i + 3] | b[i + 4] << 8) / 100
+
+        # The newest sample on chip converted within the last period; any left
+        # behind in the FIFO came after the ones read
+        period = 1000000 // self.odr
+        newest = time.ticks_add(now, -(period >> 1) - (level - n) * period)
+        if status & 0x40:
+            self.fifo_overruns += 1
+        elif self.fifo_t is not None and n == level < LPS22_FIFO_DEPTH:
+            span = time.ticks_diff(newest, self.fifo_t)
+            if span > 0:
+                period = span // n
+        if times is not None:
+            for k in range(n):
+                times[k] = time.ticks_add(newest, -(n - 1 - k) * period)
+        self.fifo_t = newest
+        return n
 
     def temperature(self):
         self.ONE_SHOT(2)
@@ -70,14 +203,58 @@ class LPS22():
         except MemoryError:
             return self.pressure_irq()
 
+    def get_into(self, out):
+        # Pressure (hPa) and temperature (C) into out[0], out[1], the same
+        # order as one drain_into() sample, from a single 5-byte read of
+        # PRESS_OUT_XL..TEMP_OUT_H (auto-increment, BDU keeps the two coherent)
+        self.ONE_SHOT(1)
+        b = self.burst
+        self.i2c.readfrom_mem_into(self.addr, LPS22_PRESS_OUT_XL, b)
+        p = b[0] | b[1] << 8 | b[2] << 16
+        if p & 0x800000:
+            p -= 0x1000000
+        out[0] = p / 4096
+        out[1] = self.int16(b[3] | b[4] << 8) / 100
+        return out
+
     def get(self):
+        # (temperature, pressure)
         try:
-            return self.temperature(), self.pressure()
+            v = self.get_into(self.get_v)
+            return v[1], v[0]
         except MemoryError:
             return self.get_irq()
 
+    def arm(self, samples = 16, timeout_ms = 2000):
+        # Average samples readings as the ground reference for altitude() (and
+        # for self.altimeter's batch altitude_into() on drain_into() pairs).
+        # Call on the pad; in FIFO mode the samples come from the FIFO.
+        buf = array('f', [0.0] * (2 * samples))
+        n = 0
+        start = time.ticks_ms()
+        while n < samples:
+            if self.fifo:
+                n += self.drain_into(memoryview(buf)[2 * n:])
+            else:
+                self.get_into(memoryview(buf)[2 * n:2 * n + 2])
+                n += 1
+            if n < samples:
+                if time.ticks_diff(time.ticks_ms(), start) > timeout_ms:
+                    raise OSError("LPS22 ground reference timed out")
+                if not self.oneshot:
+                    time.sleep_ms(1000 // self.odr)
+        if self.altimeter is None:
+            self.altimeter = BaroAltimeter()
+        self.altimeter.arm_from(buf, samples)
+        return self.altimeter
+
     def altitude(self):
-        return (((1013.25 / self.pressure())**(1/5.257)) - 1.0) * (self.temperature() + 273.15) / 0.0065
+        # Metres above the ground reference set by arm() (standard sea level,
+        # 1013.25 hPa and 15 C, until then) from one pressure reading, through
+        # the altimeter's lookup table rather than a float pow
+        if self.altimeter is None:
+            self.altimeter = BaroAltimeter()
+        return self.altimeter.altitude(self.pressure())
 
     def temperature_irq(self):
         self.ONE_SHOT(2)
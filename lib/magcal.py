@@ -0,0 +1,341 @@
+# magcal.py
+#
+# Magnetometer hard/soft-iron calibration. Samples taken while the board is
+# turned through every orientation lie on an ellipsoid
+#
+#   (m - c)^T A (m - c) = 1
+#
+# whose centre c is the hard-iron offset and whose shape A the soft-iron
+# distortion. MagCalibrator fits the general quadric
+#
+#   a x^2 + b y^2 + c z^2 + 2d xy + 2e xz + 2f yz + 2g x + 2h y + 2i z = 1
+#
+# by least squares, streaming: each sample only adds into the 9x9 normal
+# equations, so memory stays fixed however long the rotation routine runs.
+# fit() solves them once and turns the quadric into an offset and a 3x3
+# correction matrix W = R * sqrt(A) with R the geometric-mean field radius,
+# so corrected samples lie on a sphere of that radius (in uT).
+#
+# MagCalibration holds the result, persists it to flash and applies it in the
+# read path as one subtract and one precomputed 3x3 multiply, with the
+# sensor-to-board axis remap folded into the same matrix:
+#
+#   cal = MagCalibration.load() or MagCalibration()
+#   if mmc.read_if_ready(raw) is not None:
+#       cal.correct_into(raw, mag)
+#
+# calibrate(mmc) runs the routine interactively: turn the board slowly
+# through all orientations until it reports done.
+
+import math
+import struct
+import time
+from array import array
+
+CALIBRATION_PATH = 'magcal.bin'
+MAGIC = b'MCAL'
+VERSION = 1
+FILE_FORMAT = '<4sH3f9f2f'   # magic, version, offset, soft-iron matrix, radius, rms
+
+# MMC5603 axes to board axes: board x = sensor y, y = sensor z, z = -sensor x
+BOARD_AXES = (0.0, 1.0, 0.0,
+              0.0, 0.0, 1.0,
+              -1.0, 0.0, 0.0)
+IDENTITY = (1.0, 0.0, 0.0,
+            0.0, 1.0, 0.0,
+            0.0, 0.0, 1.0)
+
+def _mul3(a, b):
+    # Row-major 3x3 product
+    out = [0.0] * 9
+    for i in range(3):
+        for j in range(3):
+            out[3 * i + j] = a[3 * i] * b[j] + a[3 * i + 1] * b[3 + j] + a[3 * i + 2] * b[6 + j]
+    return out
+
+def _solve(a, b, n):
+    # Gaussian elimination with partial pivoting on the row-major n x n a;
+    # a and b are overwritten, the solution is returned in b
+    for k in range(n):
+        p = k
+        for i in range(k + 1, n):
+            if abs(a[i * n + k]) > abs(a[p * n + k]):
+                p = i
+        if a[p * n + k] == 0:
+            raise ValueError("Singular fit, rotate through more orientations")
+        if p != k:
+            for j in range(n):
+                a[k * n + j], a[p * n + j] = a[p * n + j], a[k * n + j]
+            b[k], b[p] = b[p], b[k]
+        pivot = a[k * n + k]
+        for i in range(k + 1, n):
+            f = a[i * n + k] / pivot
+            if f:
+                for j in range(k, n):
+                    a[i * n + j] -= f * a[k * n + j]
+                b[i] -= f * b[k]
+    for k in range(n - 1, -1, -1):
+        s = b[k]
+        for j in range(k + 1, n):
+            s -= a[k * n + j] * b[j]
+        b[k] = s / a[k * n + k]
+    return b
+
+def _eigen_sym3(m):
+    # Jacobi eigen decomposition of a symmetric row-major 3x3:
+    # returns (eigenvalues, eigenvectors as the columns of a row-major 3x3)
+    a = list(m)
+    v = list(IDENTITY)
+    for _ in range(50):
+        off = a[1] * a[1] + a[2] * a[2] + a[5] * a[5]
+        if off < 1e-20 * (a[0] * a[0] + a[4] * a[4] + a[8] * a[8]):
+            break
+        for p, q in ((0, 1), (0, 2), (1, 2)):
+            apq = a[3 * p + q]
+            if apq == 0:
+                continue
+            theta = (a[3 * q + q] - a[3 * p + p]) / (2 * apq)
+            t = (1.0 if theta >= 0 else -1.0) / (abs(theta) + math.sqrt(theta * theta + 1))
+            c = 1 / math.sqrt(t * t + 1)
+            s = t * c
+            for k in range(3):
+                akp = a[3 * k + p]
+                akq = a[3 * k + q]
+                a[3 * k + p] = c * akp - s * akq
+                a[3 * k + q] = s * akp + c * akq
+            for k in range(3):
+                apk = a[3 * p + k]
+                aqk = a[3 * q + k]
+                a[3 * p + k] = c * apk - s * aqk
+                a[3 * q + k] = s * apk + c * aqk
+            for k in range(3):
+                vkp = v[3 * k + p]
+                vkq = v[3 * k + q]
+                v[3 * k + p] = c * vkp - s * vkq
+                v[3 * k + q] = s * vkp + c * vkq
+    return (a[0], a[4], a[8]), v
+
+class MagCalibration:
+    def __init__(self, offset=(0.0, 0.0, 0.0), soft_iron=IDENTITY,
+                 radius=0.0, rms=0.0, axes=BOARD_AXES):
+        # offset and soft_iron are in the sensor frame; axes maps the
+        # corrected sensor vector to the board frame
+        self.offset = array('f', offset)
+        self.soft_iron = array('f', soft_iron)
+        self.radius = radius
+        self.rms = rms
+        self.axes = axes
+        self.matrix = array('f', _mul3(axes, soft_iron))
+
+    def correct_into(self, raw, out):
+        # out = axes * soft_iron * (raw - offset). raw and out may be the
+        # same 3-element array.
+        m = self.matrix
+        o = self.offset
+        x = raw[0] - o[0]
+        y = raw[1] - o[1]
+        z = raw[2] - o[2]
+        out[0] = m[0] * x + m[1] * y + m[2] * z
+        out[1] = m[3] * x + m[4] * y + m[5] * z
+        out[2] = m[6] * x + m[7] * y + m[8] * z
+        return out
+
+    def save(self, path=CALIBRATION_PATH):
+        with open(path, 'wb') as f:
+            f.write(struct.pack(FILE_FORMAT, MAGIC, VERSION, *self.offset,
+                                *self.soft_iron, self.radius, self.rms))
+
+    @classmethod
+    def load(cls, path=CALIBRATION_PATH, axes=BOARD_AXES):
+        # The saved calibration, or None if there is none (or it is from an
+        # incompatible version)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) != struct.calcsize(FILE_FORMAT):
+            return None
+        values = struct.unpack(FILE_FORMAT, data)
+        if values[0] != MAGIC or values[1] != VERSION:
+            return None
+        return cls(values[2:5], values[5:14], values[14], values[15], axes)
+
+class MagCalibrator:
+    def __init__(self, field_ut=50.0, min_spacing=2.0, center=(0.0, 0.0, 0.0)):
+        # field_ut scales samples to order one so the float32 sums stay well
+        # conditioned; center (e.g. a previous calibration's offset) is
+        # subtracted for the same reason. Samples closer than min_spacing uT
+        # to the last accepted one are skipped so holding still does not
+        # outweigh the rest of the sphere.
+        self._scale = 1.0 / field_ut
+        self._center = tuple(center)
+        self._min_spacing2 = min_spacing * min_spacing
+        self._row = array('f', [0.0] * 9)
+        self._last = array('f', [1e9, 1e9, 1e9])
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self._ata = array('f', [0.0] * 45)   # upper triangle of D^T D
+        self._atb = array('f', [0.0] * 9)    # D^T 1
+        self._lo = array('f', [1e9, 1e9, 1e9])
+        self._hi = array('f', [-1e9, -1e9, -1e9])
+        self.octants = 0
+        for k in range(3):
+            self._last[k] = 1e9
+
+    def add(self, x, y, z):
+        # Accumulate one raw sample (uT, sensor frame). Returns True if it
+        # was used.
+        last = self._last
+        dx = x - last[0]
+        dy = y - last[1]
+        dz = z - last[2]
+        if dx * dx + dy * dy + dz * dz < self._min_spacing2:
+            return False
+        last[0] = x
+        last[1] = y
+        last[2] = z
+
+        lo = self._lo
+        hi = self._hi
+        octant = 0
+        for k, v in ((0, x), (1, y), (2, z)):
+            if v < lo[k]:
+                lo[k] = v
+            if v > hi[k]:
+                hi[k] = v
+            if v > (lo[k] + hi[k]) * 0.5:
+                octant |= 1 << k
+        self.octants |= 1 << octant
+
+        s = self._scale
+        c = self._center
+        x = (x - c[0]) * s
+        y = (y - c[1]) * s
+        z = (z - c[2]) * s
+        row = self._row
+        row[0] = x * x
+        row[1] = y * y
+        row[2] = z * z
+        row[3] = 2 * x * y
+        row[4] = 2 * x * z
+        row[5] = 2 * y * z
+        row[6] = 2 * x
+        row[7] = 2 * y
+        row[8] = 2 * z
+        ata = self._ata
+        atb = self._atb
+        k = 0
+        for i in range(9):
+            ri = row[i]
+            atb[i] += ri
+            for j in range(i, 9):
+                ata[k] += ri * row[j]
+                k += 1
+        self.count += 1
+        return True
+
+    def coverage(self):
+        # Octants (of the eight around the running min/max midpoint) that
+        # samples have been seen in
+        n = 0
+        mask = self.octants
+        while mask:
+            n += mask & 1
+            mask >>= 1
+        return n
+
+    def ready(self, min_samples=300):
+        return self.count >= min_samples and self.octants == 0xFF
+
+    def fit(self, axes=BOARD_AXES):
+        # Solve the accumulated fit and return a MagCalibration. Raises
+        # ValueError if the samples do not describe an ellipsoid.
+        if self.count < 9:
+            raise ValueError("Not enough samples to fit")
+        a = [0.0] * 81
+        k = 0
+        for i in range(9):
+            for j in range(i, 9):
+                a[9 * i + j] = a[9 * j + i] = self._ata[k]
+                k += 1
+        p = _solve(list(a), list(self._atb), 9)
+
+        # Algebraic residual |Dp - 1|^2 = p^T D^T D p - 2 p^T D^T 1 + n
+        residual = self.count
+        for i in range(9):
+            residual -= 2 * p[i] * self._atb[i]
+            for j in range(9):
+                residual += p[i] * a[9 * i + j] * p[j]
+
+        quadric = (p[0], p[3], p[4],
+                   p[3], p[1], p[5],
+                   p[4], p[5], p[2])
+        # Centre: A c = -(g, h, i)
+        c = _solve(list(quadric), [-p[6], -p[7], -p[8]], 3)
+        # Translated to the centre the constant becomes 1 + c^T A c
+        k = 1.0 + (c[0] * (quadric[0] * c[0] + quadric[1] * c[1] + quadric[2] * c[2])
+                   + c[1] * (quadric[3] * c[0] + quadric[4] * c[1] + quadric[5] * c[2])
+                   + c[2] * (quadric[6] * c[0] + quadric[7] * c[1] + quadric[8] * c[2]))
+        values, vectors = _eigen_sym3(quadric)
+        # With the origin outside the ellipsoid (offset larger than the field)
+        # the "= 1" normalisation flips the quadric's sign: A and k both come
+        # out negative. The shape A / k is the same either way.
+        if k < 0:
+            k = -k
+            values = [-v for v in values]
+        if k == 0 or min(values) <= 0:
+            raise ValueError("Fit is not an ellipsoid, rotate through more orientations")
+
+        # Back to uT: with u = (m - center) * s the shape is s^2 A / k
+        s2 = self._scale * self._scale
+        values = [v * s2 / k for v in values]
+        radius = (values[0] * values[1] * values[2]) ** (-1 / 6)
+        roots = [math.sqrt(v) * radius for v in values]
+        w = [0.0] * 9
+        for i in range(3):
+            for j in range(3):
+                w[3 * i + j] = (vectors[3 * i] * roots[0] * vectors[3 * j]
+                                + vectors[3 * i + 1] * roots[1] * vectors[3 * j + 1]
+                                + vectors[3 * i + 2] * roots[2] * vectors[3 * j + 2])
+        offset = [self._center[i] + c[i] / self._scale for i in range(3)]
+        # Near the surface an algebraic residual e is a radial error of ~r e / 2k
+        rms = radius * math.sqrt(max(residual, 0.0) / self.count) * 0.5 / k
+        return MagCalibration(offset, w, radius, rms, axes)
+
+def calibrate(mmc, seconds=60, path=CALIBRATION_PATH, min_samples=300, data_rate=50,
+              previous=None):
+    # Rotation routine: stream continuous-mode samples while the board is
+    # turned through every orientation, then fit and save. Returns the
+    # MagCalibration, or None if coverage was not reached in time. The sums
+    # are centred on previous' offset (e.g. MagCalibration.load()) if given.
+    calibrator = MagCalibrator(center=previous.offset if previous is not None else (0.0, 0.0, 0.0))
+    raw = array('f', [0.0] * 3)
+    was_continuous = mmc.continuous_mode
+    mmc.data_rate = data_rate
+    mmc.continuous_mode = True
+    print("Turn the board slowly through all orientations...")
+    start = time.ticks_ms()
+    reported = 0
+    try:
+        while time.ticks_diff(time.ticks_ms(), start) < seconds * 1000:
+            if mmc.read_if_ready(raw) is not None:
+                calibrator.add(raw[0], raw[1], raw[2])
+                if calibrator.ready(min_samples):
+                    break
+                if calibrator.count >= reported + 50:
+                    reported = calibrator.count
+                    print(f"{calibrator.count} samples, {calibrator.coverage()}/8 octants")
+            time.sleep_ms(5)
+    finally:
+        mmc.continuous_mode = was_continuous
+    if not calibrator.ready(min_samples):
+        print(f"Incomplete: {calibrator.count} samples, {calibrator.coverage()}/8 octants")
+        return None
+    calibration = calibrator.fit()
+    calibration.save(path)
+    print(f"Saved {path}: offset {[round(v, 2) for v in calibration.offset]} uT, "
+          f"field {calibration.radius:.1f} uT, rms {calibration.rms:.2f} uT")
+    return calibration
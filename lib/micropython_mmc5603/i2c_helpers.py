@@ -45,9 +45,36 @@ except ImportError:
     import ustruct as struct
 
 
+def _scratch(obj, key, size):
+    """
+    Per-instance buffer, allocated on first use and reused afterwards, so the
+    descriptors do not create garbage on every access
+    """
+    try:
+        buffers = obj._register_buffers
+    except AttributeError:
+        buffers = obj._register_buffers = {}
+    buf = buffers.get(key)
+    if buf is None:
+        buf = buffers[key] = bytearray(size)
+    return buf
+
+
+def _shadows(obj):
+    try:
+        return obj._register_shadows
+    except AttributeError:
+        obj._register_shadows = {}
+        return obj._register_shadows
+
+
 class CBits:
     """
     Changes bits from a byte register
+
+    With ``shadow=True`` the register is treated as write-only: reads and
+    read-modify-writes use the last value written (0 after reset) instead of
+    the bus
     """
 
     def __init__(
@@ -57,83 +84,125 @@ class CBits:
         start_bit: int,
         register_width=1,
         lsb_first=True,
+        shadow=False,
     ) -> None:
         self.bit_mask = ((1 << num_bits) - 1) << start_bit
         self.register = register_address
         self.star_bit = start_bit
         self.lenght = register_width
         self.lsb_first = lsb_first
+        self.shadow = shadow
+
+    def _read(self, obj) -> int:
+        if self.shadow:
+            return _shadows(obj).get(self.register, 0)
+
+        mem_value = _scratch(obj, self.lenght, self.lenght)
+        obj._i2c.readfrom_mem_into(obj._address, self.register, mem_value)
+
+        if self.lenght == 1:
+            return mem_value[0]
+        reg = 0
+        if self.lsb_first:
+            for i in range(self.lenght - 1, -1, -1):
+                reg = (reg << 8) | mem_value[i]
+        else:
+            for i in range(self.lenght):
+                reg = (reg << 8) | mem_value[i]
+        return reg
 
     def __get__(
         self,
         obj,
         objtype=None,
     ) -> int:
-
-        mem_value = obj._i2c.readfrom_mem(obj._address, self.register, self.lenght)
-
-        reg = 0
-        order = range(len(mem_value) - 1, -1, -1)
-        if not self.lsb_first:
-            order = reversed(order)
-        for i in order:
-            reg = (reg << 8) | mem_value[i]
-
-        reg = (reg & self.bit_mask) >> self.star_bit
-
-        return reg
+        return (self._read(obj) & self.bit_mask) >> self.star_bit
 
     def __set__(self, obj, value: int) -> None:
+        reg = self._read(obj) & ~self.bit_mask
+        reg |= value << self.star_bit
 
-        memory_value = obj._i2c.readfrom_mem(obj._address, self.register, self.lenght)
-
-        reg = 0
-        order = range(len(memory_value) - 1, -1, -1)
-        if not self.lsb_first:
-            order = range(0, len(memory_value))
-        for i in order:
-            reg = (reg << 8) | memory_value[i]
-        reg &= ~self.bit_mask
+        if self.shadow:
+            _shadows(obj)[self.register] = reg
 
-        value <<= self.star_bit
-        reg |= value
-        reg = reg.to_bytes(self.lenght, "big")
-
-        obj._i2c.writeto_mem(obj._address, self.register, reg)
+        memory_value = _scratch(obj, self.lenght, self.lenght)
+        for i in range(self.lenght - 1, -1, -1):
+            memory_value[i] = reg & 0xFF
+            reg >>= 8
+        obj._i2c.writeto_mem(obj._address, self.register, memory_value)
 
 
 class RegisterStruct:
     """
     Register Struct
+
+    Single unsigned/signed bytes and 16-bit words are decoded directly from a
+    per-instance buffer; other formats go through ``struct.unpack_from``.
+    With ``shadow=True`` the register is write-only and reads return the last
+    value written (0 after reset) without touching the bus
     """
 
-    def __init__(self, register_address: int, form: str) -> None:
+    def __init__(self, register_address: int, form: str, shadow=False) -> None:
         self.format = form
         self.register = register_address
         self.lenght = struct.calcsize(form)
+        self.shadow = shadow
+        code = form[-1] if len(form) - (form[0] in "<>!=@") == 1 else None
+        self.code = code if code in ("B", "b", "H", "h") else None
+        self.big_endian = form[0] in ">!"
 
     def __get__(
         self,
         obj,
         objtype=None,
     ):
-
-        if self.lenght <= 2:
-            value = struct.unpack(
-                self.format,
-                memoryview(
-                    obj._i2c.readfrom_mem(obj._address, self.register, self.lenght)
-                ),
-            )[0]
+        if self.shadow:
+            return _shadows(obj).get(self.register, 0)
+
+        buf = _scratch(obj, self.lenght, self.lenght)
+        obj._i2c.readfrom_mem_into(obj._address, self.register, buf)
+
+        code = self.code
+        if code is None:
+            value = struct.unpack_from(self.format, buf)
+            return value[0] if self.lenght <= 2 else value
+        if code == "B":
+            return buf[0]
+        if code == "b":
+            return buf[0] - 256 if buf[0] & 0x80 else buf[0]
+        if self.big_endian:
+            value = buf[0] << 8 | buf[1]
         else:
-            value = struct.unpack(
-                self.format,
-                memoryview(
-                    obj._i2c.readfrom_mem(obj._address, self.register, self.lenght)
-                ),
-            )
+            value = buf[1] << 8 | buf[0]
+        if code == "h" and value & 0x8000:
+            value -= 0x10000
         return value
 
     def __set__(self, obj, value):
-        mem_value = value.to_bytes(self.lenght, "big")
+        if self.shadow:
+            _shadows(obj)[self.register] = value
+        mem_value = _scratch(obj, self.lenght, self.lenght)
+        for i in range(self.lenght - 1, -1, -1):
+            mem_value[i] = value & 0xFF
+            value >>= 8
         obj._i2c.writeto_mem(obj._address, self.register, mem_value)
+
+
+class RegisterBlock:
+    """
+    Batched read of ``length`` consecutive registers in one transfer. Returns
+    a per-instance buffer that the next read of the same block overwrites
+    """
+
+    def __init__(self, register_address: int, length: int) -> None:
+        self.register = register_address
+        self.lenght = length
+
+    def __get__(
+        self,
+        obj,
+        objtype=None,
+    ):
+        buf = _scratch(obj, self, self.lenght)
+        obj._i2c.readfrom_mem_into(obj._address, self.register, buf)
+        return buf
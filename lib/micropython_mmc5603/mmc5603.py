@@ -16,7 +16,12 @@ MicroPython driver for the Memsic MMC5603 Magnetometer
 
 import time
 from micropython import const
-from micropython_mmc5603.i2c_helpers import CBits, RegisterStruct
+from micropython_mmc5603.i2c_helpers import CBits, RegisterBlock, RegisterStruct
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
 
 try:
     from typing import Tuple
@@ -37,6 +42,7 @@ _CTRL_REG0 = const(0x1B)
 _CTRL_REG1 = const(0x1C)
 _CTRL_REG2 = const(0x1D)
 
+
 MT_6_6ms = const(0b00)
 MT_3_5ms = const(0b01)
 MT_2_0ms = const(0b10)
@@ -78,12 +84,17 @@ class MMC5603:
     """
 
     _device_id = RegisterStruct(_REG_WHOIAM, "<B")
-    _ctrl0_reg = RegisterStruct(_CTRL_REG0, "<B")
-    _ctrl1_reg = RegisterStruct(_CTRL_REG1, "<B")
-    _ctrl2_reg = RegisterStruct(_CTRL_REG2, "B")
-
-    _odr_reg = RegisterStruct(_ODR_REG, "<B")
+    # The control and ODR registers are write-only; their shadows hold the
+    # last value written
+    _ctrl0_reg = RegisterStruct(_CTRL_REG0, "<B", shadow=True)
+    _ctrl1_reg = RegisterStruct(_CTRL_REG1, "<B", shadow=True)
+    _ctrl2_reg = RegisterStruct(_CTRL_REG2, "B", shadow=True)
+    _cmm_en = CBits(1, _CTRL_REG2, 4, shadow=True)
+    _hpower = CBits(1, _CTRL_REG2, 7, shadow=True)
+
+    _odr_reg = RegisterStruct(_ODR_REG, "<B", shadow=True)
     _raw_temp_data = RegisterStruct(_TEMP, "B")
+    _raw_field_data = RegisterBlock(_DATA, 9)
 
     _meas_m_done = CBits(1, _STATUS_REG, 6)
     _meas_t_done = CBits(1, _STATUS_REG, 7)
@@ -95,11 +106,8 @@ class MMC5603:
         if self._device_id != 0x10:
             raise RuntimeError("Failed to find MMC5603")
 
-        self._ctrl2_cache = 0
         self._odr_cache = 0
         self._measure_time_cached = 0
-
-        self._buffer = bytearray(9)
         # self.continuous_mode = False
 
         self._ctrl1_reg = 0x80
@@ -123,20 +131,50 @@ class MMC5603:
             while not self._meas_m_done:
                 time.sleep(0.005)
 
-        self._i2c.readfrom_mem_into(self._address, _DATA, self._buffer)
-
-        x = self._buffer[0] << 12 | self._buffer[1] << 4 | self._buffer[6] >> 4
-        y = self._buffer[2] << 12 | self._buffer[3] << 4 | self._buffer[7] >> 4
-        z = self._buffer[4] << 12 | self._buffer[5] << 4 | self._buffer[8] >> 4
-
-        x -= 1 << 19
-        y -= 1 << 19
-        z -= 1 << 19
-        # scale to uT by LSB in datasheet
-        x *= 0.00625
-        y *= 0.00625
-        z *= 0.00625
-        return x, y, z
+        return self._read_field()
+
+    def _data_ready(self) -> bool:
+        return bool(self._meas_m_done)
+
+    def _read_field(self, out=None):
+        buf = self._raw_field_data
+
+        x = buf[0] << 12 | buf[1] << 4 | buf[6] >> 4
+        y = buf[2] << 12 | buf[3] << 4 | buf[7] >> 4
+        z = buf[4] << 12 | buf[5] << 4 | buf[8] >> 4
+
+        # offset binary, scaled to uT by LSB in datasheet
+        x = (x - (1 << 19)) * 0.00625
+        y = (y - (1 << 19)) * 0.00625
+        z = (z - (1 << 19)) * 0.00625
+        if out is None:
+            return x, y, z
+        out[0] = x
+        out[1] = y
+        out[2] = z
+        return out
+
+    def read_if_ready(self, out=None):
+        """Non-blocking read for continuous mode: the new X, Y, Z sample in
+        microteslas, or ``None`` straight away if the sensor has not finished
+        one since the last read. With ``out`` (e.g. an ``array('f', 3)``) the
+        values are written into it and it is returned instead of a new tuple.
+        """
+        if not self._data_ready():
+            return None
+        return self._read_field(out)
+
+    async def read_async(self, out=None):
+        """Like :attr:`magnetic`, but yields to other asyncio tasks while the
+        measurement is in progress instead of sleeping. In one-shot mode it
+        starts a measurement; in continuous mode it waits for the next sample.
+        ``out`` works as in :meth:`read_if_ready`.
+        """
+        if not self.continuous_mode:
+            self._ctrl0_reg = 0x01
+        while not self._data_ready():
+            await asyncio.sleep_ms(1)
+        return self._read_field(out)
 
     @property
     def temperature(self) -> float:
@@ -165,29 +203,26 @@ class MMC5603:
         self._odr_cache = value
         if value == 1000:
             self._odr_reg = 255
-            self._ctrl2_cache |= 0x80  # turn on hpower bit
-            self._ctrl2_reg = self._ctrl2_cache
+            self._hpower = 1
         else:
             self._odr_reg = value
-            self._ctrl2_cache &= ~0x80  # turn off hpower bit
-            self._ctrl2_reg = self._ctrl2_cache
+            self._hpower = 0
 
     @property
     def continuous_mode(self) -> bool:
         """Whether or not to put the chip in continous mode - be sure
         to set the data_rate as well!
         """
-        return self._ctrl2_cache & 0x10
+        return bool(self._cmm_en)
 
     @continuous_mode.setter
     def continuous_mode(self, value: bool) -> None:
         if value:
-            self._ctrl0_reg = 0x80  # turn on cmm_freq_en bit
-            self._ctrl2_cache |= 0x10  # turn on cmm_en bit
+            # turn on cmm_freq_en bit, keeping the automatic set/reset
+            self._ctrl0_reg = 0xA0
+            self._cmm_en = 1
         else:
-            self._ctrl2_cache &= ~0x10  # turn off cmm_en bit
-
-        self._ctrl2_reg = self._ctrl2_cache
+            self._cmm_en = 0
 
     @property
     def measure_time(self) -> str:
@@ -38,6 +38,11 @@ import time
 import random
 from micropython import const
 
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
 __version__ = "0.0.0-auto.0"
 __repo__ = "https://github.com/adafruit/Adafruit_CircuitPython_RFM9x.git"
 
@@ -148,6 +153,11 @@ class RFM9x:
     is True for high power.
     - baudrate: Baud rate of the SPI connection, default is 10mhz but you might
     choose to lower to 1mhz if using long wires or a breadboard.
+    - irq: The Pin connected to the radio's DIO0 output.  When given, the end of
+    a transmission started with :py:func:`start_send` is signalled by a pin
+    interrupt instead of by polling the IRQ flags register.  The interrupt
+    only sets a flag; the radio is read and the send finished from
+    :py:func:`tx_busy`, never from interrupt context.
 
     Remember this library makes a best effort at receiving packets with pure
     Python code.  Trying to receive packets too quickly will result in lost data
@@ -239,10 +249,22 @@ class RFM9x:
         *,
         preamble_length=8,
         high_power=True,
-        baudrate=5000000
+        baudrate=5000000,
+        irq=None
     ):
         self.high_power = high_power
         self._reset = reset
+        # persistent buffers so the register, send and receive paths do not allocate
+        self._cmd = bytearray(2)
+        self._cmd1 = memoryview(self._cmd)[:1]
+        self._tx_packet = bytearray(256)
+        self._tx_view = memoryview(self._tx_packet)
+        self.tx_buffer = self._tx_view[4:]
+        """Payload area of the transmit buffer (252 bytes). Fill it in place,
+           e.g. with struct.pack_into, and send it with :py:func:`send_view`.
+        """
+        self._rx_packet = bytearray(256)
+        self._rx_view = memoryview(self._rx_packet)
         # initialize Reset High
         self.spi = spi
         self.cs = cs
@@ -336,40 +358,53 @@ class RFM9x:
            Fourth byte of the RadioHead header.
         """
         self.crc_error_count = 0
+        # non-blocking transmit state (see start_send)
+        self._tx_pending = False
+        self._tx_success = True
+        self._tx_start = 0
+        self._tx_keep_listening = False
+        self._tx_callback = None
+        self._tx_irq = False  # set by the DIO0 interrupt
+        self._irq = irq
+        if irq is not None:
+            irq.irq(trigger=irq.IRQ_RISING, handler=self._handle_interrupt)
 
     # pylint: disable=no-member
     # Reconsider pylint: disable when this can be tested
     def _read_into(self, address, buf):
         # Read from the specified address into the provided
         # buffer.
+        self._cmd[0] = address & 0x7F
         self.cs.value(0)
-        self.spi.write(bytes([address & 0x7F]))
+        self.spi.write(self._cmd1)
         self.spi.readinto(buf)
         self.cs.value(1)
 
     def _read_u8(self, address):
         # Read a single byte from the provided address and return it.
+        self._cmd[0] = address & 0x7F
         self.cs.value(0)
-        self.spi.write(bytes([address & 0x7F]))
-        value = self.spi.read(1)
+        self.spi.write(self._cmd1)
+        self.spi.readinto(self._cmd1)
         self.cs.value(1)
-        return value[0]
+        return self._cmd[0]
 
     def _write_from(self, address, buf):
         # Write to the provided address and taken from the
         # provided buffer.
+        self._cmd[0] = (address | 0x80) & 0xFF
         self.cs.value(0)
-        self.spi.write(bytes([(address | 0x80) & 0xFF]))
+        self.spi.write(self._cmd1)
         self.spi.write(buf)  # send data
         self.cs.value(1)
 
     def _write_u8(self, address, val):
         # Write a byte register to the chip.  Specify the 7-bit address and the
         # 8-bit value to write to that address.
-        address = (address | 0x80) & 0xFF  # Set top bit to 1 to
-        val = val & 0xFF
+        self._cmd[0] = (address | 0x80) & 0xFF  # Set top bit to 1 to
+        self._cmd[1] = val & 0xFF
         self.cs.value(0)
-        self.spi.write(bytes([address,val]))
+        self.spi.write(self._cmd)
         self.cs.value(1)
 
     def reset(self):
@@ -590,7 +625,25 @@ class RFM9x:
         """crc status"""
         return (self._read_u8(_RH_RF95_REG_12_IRQ_FLAGS) & 0x20) >> 5
 
-    def send(
+    def _load_packet(self, length, destination, node, identifier, flags):
+        # Write the RadioHead header and the first length bytes of tx_buffer
+        # into the FIFO straight from the persistent transmit buffer.
+        assert 0 < length <= 252
+        self.idle()  # Stop receiving to clear FIFO and keep it clear.
+        # Fill the FIFO with a packet to send.
+        self._write_u8(_RH_RF95_REG_0D_FIFO_ADDR_PTR, 0x00)  # FIFO starts at 0.
+        # Header (To,From,ID,Flags), kwargs override the attributes
+        packet = self._tx_packet
+        packet[0] = self.destination if destination is None else destination
+        packet[1] = self.node if node is None else node
+        packet[2] = self.identifier if identifier is None else identifier
+        packet[3] = self.flags if flags is None else flags
+        # Write header and payload.
+        self._write_from(_RH_RF95_REG_00_FIFO, self._tx_view[: length + 4])
+        # Write payload and header length.
+        self._write_u8(_RH_RF95_REG_22_PAYLOAD_LENGTH, length + 4)
+
+    def start_send(
         self,
         data,
         *,
@@ -598,20 +651,15 @@ class RFM9x:
         destination=None,
         node=None,
         identifier=None,
-        flags=None
+        flags=None,
+        callback=None
     ):
-        """Send a string of data using the transmitter.
-           You can only send 252 bytes at a time
-           (limited by chip's FIFO size and appended headers).
-           This appends a 4 byte header to be compatible with the RadioHead library.
-           The header defaults to using the initialized attributes:
-           (destination,node,identifier,flags)
-           It may be temporarily overidden via the kwargs - destination,node,identifier,flags.
-           Values passed via kwargs do not alter the attribute settings.
-           The keep_listening argument should be set to True if you want to start listening
-           automatically after the packet is sent. The default setting is False.
-
-           Returns: True if success or False if the send timed out.
+        """Start transmitting a packet and return immediately.
+           Arguments are the same as :py:func:`send`.
+           Completion is detected by calling :py:func:`tx_busy`; with an irq pin
+           given to the constructor that is a flag check until DIO0 fires.
+           If given, callback(success) is called once, from :py:func:`tx_busy`,
+           after the transmission has finished or timed out.
         """
         # Disable pylint warning to not use length as a check for zero.
         # This is a puzzling warning as the below code is clearly the most
@@ -620,50 +668,158 @@ class RFM9x:
         # pylint: disable=len-as-condition
         assert 0 < len(data) <= 252
         # pylint: enable=len-as-condition
-        self.idle()  # Stop receiving to clear FIFO and keep it clear.
-        # Fill the FIFO with a packet to send.
-        self._write_u8(_RH_RF95_REG_0D_FIFO_ADDR_PTR, 0x00)  # FIFO starts at 0.
-        # Combine header and data to form payload
-        payload = bytearray(4)
-        if destination is None:  # use attribute
-            payload[0] = self.destination
-        else:  # use kwarg
-            payload[0] = destination
-        if node is None:  # use attribute
-            payload[1] = self.node
-        else:  # use kwarg
-            payload[1] = node
-        if identifier is None:  # use attribute
-            payload[2] = self.identifier
-        else:  # use kwarg
-            payload[2] = identifier
-        if flags is None:  # use attribute
-            payload[3] = self.flags
-        else:  # use kwarg
-            payload[3] = flags
-        payload = payload + data
-        # Write payload.
-        self._write_from(_RH_RF95_REG_00_FIFO, payload)
-        # Write payload and header length.
-        self._write_u8(_RH_RF95_REG_22_PAYLOAD_LENGTH, len(payload))
+        self.tx_buffer[: len(data)] = data
+        self.start_send_view(
+            len(data),
+            keep_listening=keep_listening,
+            destination=destination,
+            node=node,
+            identifier=identifier,
+            flags=flags,
+            callback=callback,
+        )
+
+    def start_send_view(
+        self,
+        length,
+        *,
+        keep_listening=False,
+        destination=None,
+        node=None,
+        identifier=None,
+        flags=None,
+        callback=None
+    ):
+        """Like :py:func:`start_send` but transmits the first length bytes already
+           written into :py:attr:`tx_buffer`, without copying or allocating.
+        """
+        self._load_packet(length, destination, node, identifier, flags)
+        self._tx_keep_listening = keep_listening
+        self._tx_callback = callback
+        self._tx_success = True
+        self._tx_start = time.ticks_ms()
+        self._tx_irq = False
+        self._tx_pending = True
         # Turn on transmit mode to send out the packet.
         self.transmit()
-        # Wait for tx done interrupt with explicit polling (not ideal but
-        # best that can be done right now without interrupts).
-        start = time.ticks_ms()
-        timed_out = False
-        while not timed_out and not self.tx_done():
-            if time.ticks_diff(time.ticks_ms(), start) >= self.xmit_timeout:
-                timed_out = True
-        # Listen again if necessary and return the result packet.
-        if keep_listening:
+
+    def _finish_send(self, success):
+        # Runs once per packet, in task context
+        if not self._tx_pending:
+            return
+        self._tx_pending = False
+        self._tx_success = success
+        # Listen again if necessary.
+        if self._tx_keep_listening:
             self.listen()
         else:
             # Enter idle mode to stop receiving other packets.
             self.idle()
         # Clear interrupt.
         self._write_u8(_RH_RF95_REG_12_IRQ_FLAGS, 0xFF)
-        return not timed_out
+        callback = self._tx_callback
+        if callback is not None:
+            self._tx_callback = None
+            callback(success)
+
+    def _poll_send(self):
+        if self.tx_done():
+            self._finish_send(True)
+        elif time.ticks_diff(time.ticks_ms(), self._tx_start) >= self.xmit_timeout:
+            self._finish_send(False)
+
+    def _handle_interrupt(self, pin):
+        # DIO0 rising edge: tx done while transmitting, rx done while listening.
+        # No SPI here; tx_busy() checks the radio once the flag is set.
+        self._tx_irq = True
+
+    def tx_busy(self):
+        """True while a packet started with :py:func:`start_send` is still being
+           transmitted. Without an irq pin this polls the radio (one register read).
+        """
+        if self._tx_pending:
+            if self._irq is None or self._tx_irq:
+                self._poll_send()
+            elif time.ticks_diff(time.ticks_ms(), self._tx_start) >= self.xmit_timeout:
+                self._finish_send(False)
+        return self._tx_pending
+
+    async def send_async(self, data, **kwargs):
+        """Awaitable version of :py:func:`send` that yields to other tasks while
+           the packet is on air. Returns: True if success or False if the send timed out.
+        """
+        self.start_send(data, **kwargs)
+        while self.tx_busy():
+            await asyncio.sleep_ms(1)
+        return self._tx_success
+
+    def send(
+        self,
+        data,
+        *,
+        keep_listening=False,
+        destination=None,
+        node=None,
+        identifier=None,
+        flags=None
+    ):
+        """Send a string of data using the transmitter.
+           You can only send 252 bytes at a time
+           (limited by chip's FIFO size and appended headers).
+           This appends a 4 byte header to be compatible with the RadioHead library.
+           The header defaults to using the initialized attributes:
+           (destination,node,identifier,flags)
+           It may be temporarily overidden via the kwargs - destination,node,identifier,flags.
+           Values passed via kwargs do not alter the attribute settings.
+           The keep_listening argument should be set to True if you want to start listening
+           automatically after the packet is sent. The default setting is False.
+
+           This blocks until the packet is sent, use :py:func:`start_send` or
+           :py:func:`send_async` to transmit without waiting.
+
+           Returns: True if success or False if the send timed out.
+        """
+        self.start_send(
+            data,
+            keep_listening=keep_listening,
+            destination=destination,
+            node=node,
+            identifier=identifier,
+            flags=flags,
+        )
+        return self._wait_send()
+
+    def send_view(
+        self,
+        length,
+        *,
+        keep_listening=False,
+        destination=None,
+        node=None,
+        identifier=None,
+        flags=None
+    ):
+        """Send the first length bytes of :py:attr:`tx_buffer`. Same as
+           :py:func:`send` but the payload is packed in place by the caller, so
+           no packet buffer is built or copied.
+
+           Returns: True if success or False if the send timed out.
+        """
+        self.start_send_view(
+            length,
+            keep_listening=keep_listening,
+            destination=destination,
+            node=node,
+            identifier=identifier,
+            flags=flags,
+        )
+        return self._wait_send()
+
+    def _wait_send(self):
+        # Wait for tx done with explicit polling.
+        while self._tx_pending:
+            self._poll_send()
+        return self._tx_success
 
     def send_with_ack(self, data):
         """Reliable Datagram mode:
@@ -804,3 +960,73 @@ class RFM9x:
         # Clear interrupt.
         self._write_u8(_RH_RF95_REG_12_IRQ_FLAGS, 0xFF)
         return packet
+
+    def receive_into(self, buf, *, keep_listening=True, with_header=False, timeout=None):
+        """Wait to receive a packet and copy it into buf without allocating.
+           Same filtering as :py:func:`receive` (no ACKs are sent).
+           Returns the number of bytes written to buf, or 0 if no valid packet was
+           received before the timeout. Packets longer than buf are truncated.
+        """
+        timed_out = False
+        if timeout is None:
+            timeout = self.receive_timeout
+        if timeout is not None:
+            self.listen()
+            start = time.ticks_ms()
+            while not timed_out and not self.rx_done():
+                if time.ticks_diff(time.ticks_ms(), start) >= timeout:
+                    timed_out = True
+        length = 0
+        # save last RSSI reading
+        self.last_rssi = self.rssi
+        # Enter idle mode to stop receiving other packets.
+        self.idle()
+        if not timed_out:
+            length = self.read_fifo_into(buf, with_header=with_header)
+        # Listen again if necessary and return the result packet.
+        if keep_listening:
+            self.listen()
+        else:
+            # Enter idle mode to stop receiving other packets.
+            self.idle()
+        # Clear interrupt.
+        self._write_u8(_RH_RF95_REG_12_IRQ_FLAGS, 0xFF)
+        return length
+
+    def read_fifo_into(self, buf, *, with_header=False):
+        """Copy the packet waiting in the FIFO (once :py:func:`rx_done` is True)
+           into buf without allocating, applying the RadioHead address filter,
+           and record its RSSI in last_rssi. The radio mode is left unchanged,
+           so in RX continuous mode it keeps listening.
+           Returns the number of bytes copied, or 0 for a CRC error or a rejected
+           packet. The IRQ flags are cleared on every path, so rx_done() is False
+           afterwards.
+        """
+        try:
+            if self.enable_crc and self.crc_error():
+                self.crc_error_count += 1
+                return 0
+            fifo_length = self._read_u8(_RH_RF95_REG_13_RX_NB_BYTES)
+            if fifo_length > 0:  # read and clear the FIFO if anything in it
+                current_addr = self._read_u8(_RH_RF95_REG_10_FIFO_RX_CURRENT_ADDR)
+                self._write_u8(_RH_RF95_REG_0D_FIFO_ADDR_PTR, current_addr)
+                self._read_into(_RH_RF95_REG_00_FIFO, self._rx_view[:fifo_length])
+                # Packet RSSI, before the next packet can replace it
+                self.last_rssi = self._read_u8(_RH_RF95_REG_1A_PKT_RSSI_VALUE) - 137
+        finally:
+            # Clear interrupt.
+            self._write_u8(_RH_RF95_REG_12_IRQ_FLAGS, 0xFF)
+        # Reject packets too small for the header and one byte of data
+        if fifo_length < 5:
+            return 0
+        packet = self._rx_packet
+        if (
+            self.node != _RH_BROADCAST_ADDRESS
+            and packet[0] != _RH_BROADCAST_ADDRESS
+            and packet[0] != self.node
+        ):
+            return 0
+        start = 0 if with_header else 4
+        length = min(fifo_length - start, len(buf))
+        buf[:length] = self._rx_view[start : start + length]
+        return length
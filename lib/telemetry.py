@@ -0,0 +1,196 @@
+# telemetry.py
+#
+# Compact, versioned downlink packet codec shared by the flight computer and
+# the ground stations. Every packet starts with one header byte:
+#
+#   bits 7-4  schema version (1)
+#   bits 3-2  packet type (TYPE_STATE or TYPE_REFERENCE)
+#   bit 0     GPS fix valid
+#
+# State packet, version 1 (25 bytes, all little endian):
+#
+#   B   header
+#   B   sequence number (wraps at 256)
+#   3B  timestamp, ms since boot (uint24, wraps after ~4.6 h)
+#   3H  quaternion, "smallest three": the largest component is dropped (and
+#       made positive), the other three are stored as 15-bit values scaled to
+#       +-1/sqrt(2); its index is kept in the top bit of the first two words
+#   i   latitude delta from the reference point, 1e-7 deg
+#   i   longitude delta from the reference point, 1e-7 deg
+#   h   GPS altitude, m
+#   B   satellites
+#   3B  pressure, Pa (uint24)
+#
+# Reference packet: header, i latitude, i longitude (1e-7 deg, absolute).
+# The encoder sends one whenever the reference point changes and then every
+# REFERENCE_INTERVAL packets so a receiver that starts late can sync.
+#
+# The legacy '<4f3fif' packet (36 bytes) is still accepted by the decoder.
+
+import struct
+from math import sqrt
+
+VERSION = 1
+TYPE_STATE = 0
+TYPE_REFERENCE = 1
+FLAG_GPS_VALID = 0x01
+
+STATE_SIZE = 25
+REFERENCE_SIZE = 9
+REFERENCE_INTERVAL = 64
+
+LEGACY_FORMAT = '<4f3fif'
+LEGACY_SIZE = 36
+
+_QUAT_SCALE = 16383
+_QUAT_RANGE = 0.7071067811865476  # 1 / sqrt(2)
+_DEG_SCALE = 10000000
+
+def _put_u24(buf, offset, value):
+    buf[offset] = value & 0xFF
+    buf[offset + 1] = (value >> 8) & 0xFF
+    buf[offset + 2] = (value >> 16) & 0xFF
+
+def _get_u24(buf, offset):
+    return buf[offset] | buf[offset + 1] << 8 | buf[offset + 2] << 16
+
+def _clamp(value, low, high):
+    return low if value < low else high if value > high else value
+
+def pack_quaternion(buf, offset, w, x, y, z):
+    # Smallest-three encoding into 3 uint16 words (48 bits)
+    q = (w, x, y, z)
+    largest = 0
+    for i in (1, 2, 3):
+        if abs(q[i]) > abs(q[largest]):
+            largest = i
+    sign = -1 if q[largest] < 0 else 1
+    words = [0, 0, 0]
+    k = 0
+    for i in range(4):
+        if i != largest:
+            v = int(sign * q[i] / _QUAT_RANGE * _QUAT_SCALE + (0.5 if sign * q[i] >= 0 else -0.5))
+            words[k] = _clamp(v, -_QUAT_SCALE, _QUAT_SCALE) + _QUAT_SCALE
+            k += 1
+    words[0] |= (largest & 1) << 15
+    words[1] |= (largest >> 1) << 15
+    struct.pack_into('<3H', buf, offset, words[0], words[1], words[2])
+
+def unpack_quaternion(buf, offset):
+    w0, w1, w2 = struct.unpack_from('<3H', buf, offset)
+    largest = (w0 >> 15) | (w1 >> 15) << 1
+    small = [((w & 0x7FFF) - _QUAT_SCALE) * _QUAT_RANGE / _QUAT_SCALE for w in (w0, w1, w2)]
+    rest = 1.0 - small[0] * small[0] - small[1] * small[1] - small[2] * small[2]
+    small.insert(largest, sqrt(rest) if rest > 0 else 0.0)
+    return tuple(small)
+
+class TelemetryEncoder:
+    def __init__(self, reference=None):
+        self.sequence = 0
+        self._ref_lat = 0
+        self._ref_lon = 0
+        self._has_reference = False
+        self._since_reference = 0
+        if reference is not None:
+            self.set_reference(reference[0], reference[1])
+
+    def set_reference(self, latitude, longitude):
+        # Reference point (e.g. the launch site) that positions are sent relative to
+        self._ref_lat = int(latitude * _DEG_SCALE)
+        self._ref_lon = int(longitude * _DEG_SCALE)
+        self._has_reference = True
+        self._since_reference = REFERENCE_INTERVAL
+
+    def encode_into(self, buf, timestamp_ms, quaternion, gps_data, pressure):
+        # Write the next packet into buf (e.g. rfm9x.tx_buffer) and return its
+        # length. Takes the first valid GPS fix as the reference point if none
+        # was set, and interleaves reference packets as needed.
+        gps_valid = gps_data['status'] == 'valid' and gps_data['latitude'] is not None
+        if gps_valid and not self._has_reference:
+            self.set_reference(gps_data['latitude'], gps_data['longitude'])
+
+        if self._has_reference and self._since_reference >= REFERENCE_INTERVAL:
+            self._since_reference = 0
+            buf[0] = VERSION << 4 | TYPE_REFERENCE << 2
+            struct.pack_into('<ii', buf, 1, self._ref_lat, self._ref_lon)
+            return REFERENCE_SIZE
+        self._since_reference += 1
+
+        buf[0] = VERSION << 4 | TYPE_STATE << 2 | (FLAG_GPS_VALID if gps_valid else 0)
+        buf[1] = self.sequence
+        self.sequence = (self.sequence + 1) & 0xFF
+        _put_u24(buf, 2, timestamp_ms & 0xFFFFFF)
+        pack_quaternion(buf, 5, quaternion[0], quaternion[1], quaternion[2], quaternion[3])
+        if gps_valid:
+            dlat = int(gps_data['latitude'] * _DEG_SCALE) - self._ref_lat
+            dlon = int(gps_data['longitude'] * _DEG_SCALE) - self._ref_lon
+            altitude = _clamp(int(gps_data['altitude'] or 0), -32768, 32767)
+        else:
+            dlat = dlon = altitude = 0
+        struct.pack_into('<iihB', buf, 11, dlat, dlon, altitude,
+                         _clamp(gps_data['satellites'] or 0, 0, 255))
+        _put_u24(buf, 22, _clamp(int(pressure * 100 + 0.5), 0, 0xFFFFFF))
+        return STATE_SIZE
+
+class TelemetryDecoder:
+    def __init__(self):
+        self.reference = None
+        self.last_sequence = None
+        self.lost = 0
+        self.errors = 0
+
+    def decode(self, packet):
+        # Returns a dict with the same keys as the legacy receivers, or None for
+        # reference packets and undecodable data. latitude/longitude are None
+        # until a fix and a reference point have both been received.
+        length = len(packet)
+        if length == LEGACY_SIZE:
+            return self._decode_legacy(packet)
+        if length == 0 or packet[0] >> 4 != VERSION:
+            self.errors += 1
+            return None
+
+        kind = (packet[0] >> 2) & 0x03
+        if kind == TYPE_REFERENCE and length == REFERENCE_SIZE:
+            lat, lon = struct.unpack_from('<ii', packet, 1)
+            self.reference = (lat, lon)
+            return None
+        if kind != TYPE_STATE or length != STATE_SIZE:
+            self.errors += 1
+            return None
+
+        sequence = packet[1]
+        if self.last_sequence is not None:
+            self.lost += (sequence - self.last_sequence - 1) & 0xFF
+        self.last_sequence = sequence
+
+        dlat, dlon, altitude, satellites = struct.unpack_from('<iihB', packet, 11)
+        latitude = longitude = None
+        if packet[0] & FLAG_GPS_VALID and self.reference is not None:
+            latitude = (self.reference[0] + dlat) / _DEG_SCALE
+            longitude = (self.reference[1] + dlon) / _DEG_SCALE
+        return {
+            'version': VERSION,
+            'sequence': sequence,
+            'timestamp_ms': _get_u24(packet, 2),
+            'quaternions': unpack_quaternion(packet, 5),
+            'latitude': latitude,
+            'longitude': longitude,
+            'altitude': altitude,
+            'satellites': satellites,
+            'pressure': _get_u24(packet, 22) / 100,
+        }
+
+    def _decode_legacy(self, packet):
+        values = struct.unpack(LEGACY_FORMAT, packet)
+        return {
+            'version': 0,
+            'sequence': None,
+            'timestamp_ms': None,
+            'quaternions': values[0:4],
+            'latitude': values[4],
+            'longitude': values[5],
+            'altitude': values[6],
+            'satellites': values[7],
+            'pressure': values[8],
+        }
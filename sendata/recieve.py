@@ -1,7 +1,8 @@
 from micropython_rfm9x import *
+from asyncrfm9x import AsyncRFM9x
 from machine import SPI, Pin
 import struct
-import time
+import asyncio
 
 def decode_quaternions(data):
     try:
@@ -12,42 +13,43 @@ def decode_quaternions(data):
         print(f"Decoding error: {e}")
         return None
 
-# Initialize radio
-try:
-    CS = Pin(20, Pin.OUT)
-    RESET = Pin(17, Pin.OUT)
-    spi = SPI(0,
-        baudrate=1000000,
-        polarity=0,
-        phase=0,
-        bits=8,
-        firstbit=SPI.MSB,
-        sck=Pin(18),
-        mosi=Pin(19),
-        miso=Pin(16))
-
-    rfm9x = RFM9x(spi, CS, RESET, 915.0)
-    rfm9x.tx_power = 14
-    rfm9x.signal_bandwidth = 500000
-    rfm9x.coding_rate = 5
-    rfm9x.spreading_factor = 9
-    rfm9x.enable_crc = True
-    
-    print("Waiting for quaternion packets...")
-    
-    while True:
-        try:
-            packet = rfm9x.receive(timeout=5.0)
-            if packet is not None:
+async def main():
+    # Initialize radio
+    try:
+        CS = Pin(20, Pin.OUT)
+        RESET = Pin(17, Pin.OUT)
+        spi = SPI(0,
+            baudrate=1000000,
+            polarity=0,
+            phase=0,
+            bits=8,
+            firstbit=SPI.MSB,
+            sck=Pin(18),
+            mosi=Pin(19),
+            miso=Pin(16))
+
+        rfm9x = RFM9x(spi, CS, RESET, 915.0)
+        rfm9x.tx_power = 14
+        rfm9x.signal_bandwidth = 500000
+        rfm9x.coding_rate = 5
+        rfm9x.spreading_factor = 9
+        rfm9x.enable_crc = True
+
+        radio = AsyncRFM9x(rfm9x)
+        radio.start()
+
+        print("Waiting for quaternion packets...")
+
+        async for packet in radio.packets():
+            try:
                 quaternions = decode_quaternions(packet)
                 if quaternions:
                     print("Received quaternions:", quaternions)
-                    print(f"RSSI: {rfm9x.last_rssi} dB")
-            time.sleep(0.1)
-            
-        except Exception as e:
-            print(f"Reception error: {e}")
-            time.sleep(1)
-            
-except Exception as e:
-    print(f"Initialization error: {e}")
+                    print(f"RSSI: {radio.last_rssi} dB, dropped: {radio.dropped}")
+            except Exception as e:
+                print(f"Reception error: {e}")
+
+    except Exception as e:
+        print(f"Initialization error: {e}")
+
+asyncio.run(main())
@@ -2,9 +2,11 @@ from lib.micropython_rfm9x import *
 from machine import SPI, Pin, I2C
 from lib.icm42670 import read_who_am_i, configure_sensor, read_accel_data, read_gyro_data, set_accel_scale, set_gyro_scale
 from lib.fusionmadgwick import Fusion
-from lib.l86gps import L86GPS
+from lib.l86gps import L86GPS, UPDATED_GGA
 from lib.lps22 import LPS22
 from micropython_mmc5603 import mmc5603
+from lib.magcal import MagCalibration
+from array import array
 import time
 import sys
 
@@ -18,6 +20,11 @@ i2c_magnetometer = I2C(0, sda=Pin(8), scl=Pin(9))
 lps = LPS22(i2c_barometer)
 mmc = mmc5603.MMC5603(i2c_magnetometer)
 
+# Magnetometer in the IMU's board axes; without a saved calibration only the
+# axis remap is applied
+magcal = MagCalibration.load() or MagCalibration()
+mag = array('f', [0.0] * 3)
+
 def main():
     if read_who_am_i() != 0x67:
         print("ICM-42670-P not found.")
@@ -54,20 +61,21 @@ def main():
                 # Read sensors
                 accel = read_accel_data()
                 gyro = read_gyro_data()
+                magcal.correct_into(mmc.magnetic, mag)
                 _, pressure = lps.get()
                 
-                # Update fusion without magnetometer
-                fuse.update_nomag(accel, gyro)
+                # Update fusion with magnetometer
+                fuse.update(accel, gyro, mag)
                 
                 # Read GPS
-                gps_data = gps.read_gps()
+                fix = gps.fix
                 
                 # Update GPS values if valid
-                if gps_data and gps_data['type'] == 'GPGGA' and gps_data['status'] == 'valid':
-                    last_longitude = gps_data['longitude']
-                    last_latitude = gps_data['latitude']
-                    last_altitude = gps_data['altitude']
-                    last_satellites = gps_data.get('satellites', 0)
+                if gps.update() & UPDATED_GGA and fix.status == 'valid':
+                    last_longitude = fix.longitude
+                    last_latitude = fix.latitude
+                    last_altitude = fix.altitude
+                    last_satellites = fix.satellites
                 
                 # Get RSSI
                 rssi = rfm9x.rssi
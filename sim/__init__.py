@@ -0,0 +1,135 @@
+# sim
+#
+# Host-side stand-ins for the flight computer hardware, so the flight scripts
+# and the drivers in lib/ run unchanged under CPython on a Linux machine:
+#
+#   python -m sim --duration 30 --profile async.py
+#
+# or from Python, before anything imports machine:
+#
+#   import sim
+#   board = sim.install()
+#   board.barometer.pressure = lambda t: 1009.6 - t * 0.5   # climbing
+#   from lib.lps22 import LPS22
+#   ...
+#   board.radio.sent    # packets put on air
+#
+# install() puts fake `machine`, `micropython` and `neopixel` modules into
+# sys.modules, adds the MicroPython-only helpers the code relies on
+# (time.ticks_ms & co, time.sleep_ms, asyncio.sleep_ms, asyncio.ThreadSafeFlag
+# and the `const` builtin) and returns the Board whose register-level device
+# models sit behind machine.I2C/SPI/UART: ICM-42670, MMC5603 and LPS22 on
+# I2C0, the RFM9x on SPI0 and the L86 GPS on UART0.
+#
+# Timing comes from the host clock, so the models keep real-time behaviour
+# (ODRs, conversion times, LoRa time on air, UART byte rate); bus transfer
+# time at the configured clock is estimated and reported, not slept.
+
+import asyncio
+import builtins
+import sys
+import time
+
+from sim import board as _board
+from sim.board import Board, now_us
+
+TICKS_PERIOD = 1 << 30
+_TICKS_MAX = TICKS_PERIOD - 1
+_TICKS_HALF = TICKS_PERIOD // 2
+
+def ticks_us():
+    _board.current().poll()
+    return now_us() & _TICKS_MAX
+
+def ticks_ms():
+    _board.current().poll()
+    return (now_us() // 1000) & _TICKS_MAX
+
+def ticks_cpu():
+    return now_us() & _TICKS_MAX
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+def ticks_diff(ticks1, ticks2):
+    return ((ticks1 - ticks2 + _TICKS_HALF) & _TICKS_MAX) - _TICKS_HALF
+
+def _sleep_until(deadline_us):
+    board = _board.current()
+    while True:
+        board.poll()
+        remaining = deadline_us - now_us()
+        if remaining <= 0:
+            return
+        # Wake up for scheduled device events (e.g. DIO0) like a real IRQ would
+        if board._events:
+            remaining = min(remaining, max(board._events[0][0] - now_us(), 0))
+        _host_sleep(min(remaining, 1000) / 1e6)
+
+def sleep(seconds):
+    _sleep_until(now_us() + int(seconds * 1e6))
+
+def sleep_ms(ms):
+    _sleep_until(now_us() + int(ms) * 1000)
+
+def sleep_us(us):
+    _sleep_until(now_us() + int(us))
+
+async def _async_sleep_ms(ms):
+    _board.current().poll()
+    await asyncio.sleep(ms / 1000)
+    _board.current().poll()
+
+class ThreadSafeFlag:
+    # asyncio.ThreadSafeFlag: set() from an IRQ handler, awaited by one task
+    def __init__(self):
+        self._flag = False
+
+    def set(self):
+        self._flag = True
+
+    def clear(self):
+        self._flag = False
+
+    async def wait(self):
+        board = _board.current()
+        while not self._flag:
+            board.poll()
+            if self._flag:
+                break
+            await asyncio.sleep(0.0002)
+        self._flag = False
+
+_host_sleep = time.sleep
+_installed = None
+
+def install(board=None):
+    # Patch the running interpreter to look like MicroPython on the flight
+    # computer. Safe to call more than once; returns the active board.
+    global _installed
+    if board is not None:
+        _board.use(board)
+    board = _board.current()
+    if _installed is not None:
+        return board
+
+    from sim import machine, micropython, neopixel
+    sys.modules['machine'] = machine
+    sys.modules['micropython'] = micropython
+    sys.modules['neopixel'] = neopixel
+    sys.modules.setdefault('uasyncio', asyncio)
+    builtins.const = micropython.const
+
+    time.ticks_us = ticks_us
+    time.ticks_ms = ticks_ms
+    time.ticks_cpu = ticks_cpu
+    time.ticks_add = ticks_add
+    time.ticks_diff = ticks_diff
+    time.sleep = sleep
+    time.sleep_ms = sleep_ms
+    time.sleep_us = sleep_us
+    asyncio.sleep_ms = _async_sleep_ms
+    asyncio.ThreadSafeFlag = ThreadSafeFlag
+
+    _installed = board
+    return board
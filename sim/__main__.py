@@ -0,0 +1,81 @@
+# python -m sim [options] script.py [script args]
+#
+# Run a flight script unchanged against the simulated board, optionally under
+# cProfile, and print bus/device statistics at the end. The script runs with
+# the repository root and lib/ on sys.path (as on the board's filesystem) and
+# with a scratch directory as the working directory, so logs land there.
+
+import argparse
+import cProfile
+import os
+import pstats
+import runpy
+import signal
+import sys
+import tempfile
+
+import sim
+from sim.board import Board
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class SimTimeout(BaseException):
+    # BaseException so the scripts' `except Exception` loops don't swallow it
+    pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m sim',
+                                     description="Run a flight script on the simulated board")
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help="stop the script after this many seconds (0 = run until it exits)")
+    parser.add_argument('--profile', action='store_true', help="run under cProfile")
+    parser.add_argument('--sort', default='tottime', help="cProfile sort key")
+    parser.add_argument('--top', type=int, default=30, help="profile rows to print")
+    parser.add_argument('--seed', type=int, default=None, help="seed for sensor noise")
+    parser.add_argument('--workdir', default=None,
+                        help="working directory for the script (default: a temp dir)")
+    parser.add_argument('script')
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    options = parser.parse_args(argv)
+
+    script = os.path.abspath(options.script)
+    board = sim.install(Board(seed=options.seed))
+    sys.path[0:0] = [ROOT, os.path.join(ROOT, 'lib')]
+
+    workdir = options.workdir or tempfile.mkdtemp(prefix='flightsim-')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    sys.argv = [script] + options.args
+
+    def timeout(signum, frame):
+        raise SimTimeout()
+    if options.duration > 0:
+        signal.signal(signal.SIGALRM, timeout)
+        signal.setitimer(signal.ITIMER_REAL, options.duration)
+
+    # Like `python script.py`, the script's own directory goes first so it
+    # can import the modules next to it
+    saved_path = sys.path[:]
+    sys.path.insert(0, os.path.dirname(script))
+
+    profiler = cProfile.Profile() if options.profile else None
+    try:
+        if profiler is not None:
+            profiler.enable()
+        runpy.run_path(script, run_name='__main__')
+    except (SimTimeout, KeyboardInterrupt):
+        pass
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        sys.path[:] = saved_path
+
+    print(f"\n--- sim: {os.path.basename(script)}, working directory {workdir}", file=sys.stderr)
+    print(board.report(), file=sys.stderr)
+    if profiler is not None:
+        stats = pstats.Stats(profiler, stream=sys.stderr)
+        stats.sort_stats(options.sort).print_stats(options.top)
+
+if __name__ == '__main__':
+    main()
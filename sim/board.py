@@ -0,0 +1,258 @@
+# board.py
+#
+# The simulated flight computer: GPIO lines, I2C/SPI buses and UART ports with
+# the device models attached, plus a small event scheduler.
+#
+# Device models run lazily: they work out what the chip would have done since
+# the last bus access whenever they are touched. Anything that has to happen
+# without bus traffic (TX done on DIO0, FIFO watermark, GPS PPS) is scheduled
+# on the board and runs from poll(), which the time/asyncio shims call. Pin
+# interrupts are delivered like MicroPython soft IRQs: queued, then run from
+# poll() on the main thread, never in the middle of a bus transaction.
+
+import heapq
+import random
+import threading
+import time
+
+# Flight computer wiring
+I2C_SENSORS = 0       # I2C0: SCL GP9, SDA GP8
+SPI_RADIO = 0         # SPI0: SCK GP18, MOSI GP19, MISO GP16
+PIN_RADIO_CS = 20
+PIN_RADIO_RESET = 17
+PIN_RADIO_DIO0 = 21
+UART_GPS = 0          # UART0: TX GP0, RX GP1
+
+# rp2 machine.Pin IRQ trigger bits
+IRQ_FALLING = 4
+IRQ_RISING = 8
+
+_t0 = time.perf_counter_ns()
+
+def now_us():
+    # Simulation time, microseconds since import (never wraps)
+    return (time.perf_counter_ns() - _t0) // 1000
+
+class Line:
+    # One GPIO, shared by every machine.Pin created for it
+    def __init__(self, board, gpio):
+        self.board = board
+        self.gpio = gpio
+        self.level = 0
+        self.handler = None
+        self.trigger = 0
+        self.pin = None       # Pin object passed to the handler
+        self.listeners = []   # callables notified when the MCU drives the line
+
+    def set(self, level):
+        # Driven by the MCU (CS, reset, ...)
+        level = 1 if level else 0
+        if level != self.level:
+            self.level = level
+            for listener in self.listeners:
+                listener(level)
+
+    def drive(self, level):
+        # Driven by a device; queues the IRQ handler on a matching edge
+        level = 1 if level else 0
+        if level == self.level:
+            return
+        self.level = level
+        edge = IRQ_RISING if level else IRQ_FALLING
+        if self.handler is not None and self.trigger & edge:
+            self.board.soft_irq(self.handler, self.pin)
+
+    def pulse(self):
+        self.drive(1)
+        self.drive(0)
+
+class I2CBus:
+    def __init__(self, bus_id):
+        self.id = bus_id
+        self.freq = 400000
+        self.devices = {}
+        self.transactions = 0
+        self.bytes = 0
+        self.busy_us = 0.0    # estimated time on the wire at self.freq
+
+    def attach(self, device):
+        self.devices[device.address] = device
+        return device
+
+    def _account(self, nbytes):
+        self.transactions += 1
+        self.bytes += nbytes
+        # 9 clocks per byte (8 data + ack), plus start/stop
+        self.busy_us += (nbytes * 9 + 2) * 1e6 / self.freq
+
+class SPIBus:
+    def __init__(self, bus_id):
+        self.id = bus_id
+        self.baudrate = 1000000
+        self.devices = []
+        self.transfers = 0
+        self.bytes = 0
+        self.busy_us = 0.0
+
+    def attach(self, device, line):
+        self.devices.append(device)
+        device.cs_line = line
+        line.level = 1
+        line.listeners.append(device.chip_select)
+        return device
+
+    def selected(self):
+        for device in self.devices:
+            if device.cs_line.level == 0:
+                return device
+        return None
+
+    def _account(self, nbytes):
+        self.transfers += 1
+        self.bytes += nbytes
+        self.busy_us += nbytes * 8 * 1e6 / self.baudrate
+
+class UARTPort:
+    # MCU side of a UART: the RX ring the firmware reads from
+    def __init__(self, port_id, rxbuf=256):
+        self.id = port_id
+        self.baudrate = 9600
+        self.rxbuf = rxbuf
+        self.rx = bytearray()
+        self.device = None
+        self.overflow = 0     # bytes lost because the RX ring was full
+        self.received = 0
+        self.sent = 0
+
+    def attach(self, device):
+        self.device = device
+        device.port = self
+        return device
+
+    def deliver(self, data):
+        # Called by the device with bytes that finished arriving on RX
+        room = self.rxbuf - len(self.rx)
+        if len(data) > room:
+            self.overflow += len(data) - room
+            data = data[:room]
+        self.rx += data
+        self.received += len(data)
+
+    def update(self):
+        if self.device is not None:
+            self.device.update(now_us())
+
+class Board:
+    def __init__(self, seed=None, devices=True):
+        self.random = random.Random(seed)
+        self.lines = {}
+        self.i2c_buses = {}
+        self.spi_buses = {}
+        self.uart_ports = {}
+        self._events = []
+        self._event_seq = 0
+        self._soft_irqs = []
+        self._polling = False
+        self._main_thread = threading.main_thread()
+        self.irqs_run = 0
+        if devices:
+            self._wire_flight_computer()
+
+    def _wire_flight_computer(self):
+        from sim.icm42670 import ICM42670Model
+        from sim.mmc5603 import MMC5603Model
+        from sim.lps22 import LPS22Model
+        from sim.l86gps import L86Model
+        from sim.rfm9x import RFM9xModel
+
+        bus = self.i2c(I2C_SENSORS)
+        self.imu = bus.attach(ICM42670Model(self))
+        self.magnetometer = bus.attach(MMC5603Model(self))
+        self.barometer = bus.attach(LPS22Model(self))
+        self.gps = self.uart(UART_GPS).attach(L86Model(self))
+        self.radio = self.spi(SPI_RADIO).attach(
+            RFM9xModel(self, dio0=self.line(PIN_RADIO_DIO0)), self.line(PIN_RADIO_CS))
+
+    def line(self, gpio):
+        line = self.lines.get(gpio)
+        if line is None:
+            line = self.lines[gpio] = Line(self, gpio)
+        return line
+
+    def i2c(self, bus_id):
+        bus = self.i2c_buses.get(bus_id)
+        if bus is None:
+            bus = self.i2c_buses[bus_id] = I2CBus(bus_id)
+        return bus
+
+    def spi(self, bus_id):
+        bus = self.spi_buses.get(bus_id)
+        if bus is None:
+            bus = self.spi_buses[bus_id] = SPIBus(bus_id)
+        return bus
+
+    def uart(self, port_id):
+        port = self.uart_ports.get(port_id)
+        if port is None:
+            port = self.uart_ports[port_id] = UARTPort(port_id)
+        return port
+
+    def schedule(self, at_us, callback):
+        # Run callback(at_us) from poll() once simulation time reaches at_us
+        self._event_seq += 1
+        heapq.heappush(self._events, (at_us, self._event_seq, callback))
+
+    def soft_irq(self, handler, arg):
+        self._soft_irqs.append((handler, arg))
+
+    def poll(self):
+        # Run due events and queued pin IRQs. Only the main thread runs them,
+        # like the MicroPython scheduler on core 0.
+        if self._polling or threading.current_thread() is not self._main_thread:
+            return
+        if not self._soft_irqs and not (self._events and self._events[0][0] <= now_us()):
+            return
+        self._polling = True
+        try:
+            now = now_us()
+            while self._events and self._events[0][0] <= now:
+                at, _, callback = heapq.heappop(self._events)
+                callback(at)
+            while self._soft_irqs:
+                handler, arg = self._soft_irqs.pop(0)
+                self.irqs_run += 1
+                handler(arg)
+        finally:
+            self._polling = False
+
+    def report(self):
+        lines = []
+        for bus in self.i2c_buses.values():
+            lines.append(f"I2C{bus.id}: {bus.transactions} transactions, {bus.bytes} bytes, "
+                         f"~{bus.busy_us / 1000:.1f} ms on the bus at {bus.freq // 1000} kHz")
+        for bus in self.spi_buses.values():
+            lines.append(f"SPI{bus.id}: {bus.transfers} transfers, {bus.bytes} bytes, "
+                         f"~{bus.busy_us / 1000:.1f} ms on the bus at {bus.baudrate // 1000} kHz")
+        for port in self.uart_ports.values():
+            lines.append(f"UART{port.id}: {port.received} bytes received, {port.overflow} lost "
+                         f"to RX overflow, {port.sent} bytes sent")
+        lines.append(f"pin IRQs: {self.irqs_run}")
+        for name in ('imu', 'magnetometer', 'barometer', 'gps', 'radio'):
+            device = getattr(self, name, None)
+            if device is not None:
+                lines.append(f"{name}: {device.summary()}")
+        return '\n'.join(lines)
+
+_board = None
+
+def current():
+    # The board machine.* objects are wired to; created on first use
+    global _board
+    if _board is None:
+        _board = Board()
+    return _board
+
+def use(board):
+    global _board
+    _board = board
+    return board
@@ -0,0 +1,46 @@
+# device.py
+#
+# Base class for register-level I2C device models.
+
+from sim.board import now_us
+
+class I2CDevice:
+    address = None
+
+    def __init__(self, board):
+        self.board = board
+        self.random = board.random
+        self.regs = bytearray(256)
+
+    def read_into(self, reg, buf):
+        self.update(now_us())
+        self.before_read(reg, len(buf))
+        for i in range(len(buf)):
+            buf[i] = self.read_reg(reg)
+            reg = self.next_reg(reg)
+
+    def write(self, reg, data):
+        self.update(now_us())
+        for value in data:
+            self.write_reg(reg, value)
+            reg = self.next_reg(reg)
+
+    def update(self, now):
+        # Advance the model to simulation time now (us)
+        pass
+
+    def before_read(self, reg, count):
+        # Latch output registers once per burst, so a multi-byte read is coherent
+        pass
+
+    def read_reg(self, reg):
+        return self.regs[reg]
+
+    def write_reg(self, reg, value):
+        self.regs[reg] = value
+
+    def next_reg(self, reg):
+        return (reg + 1) & 0xFF
+
+    def summary(self):
+        return ''
@@ -0,0 +1,192 @@
+# icm42670.py
+#
+# Register model of the ICM-42670-P as lib/icm42670.py uses it: WHO_AM_I,
+# big endian data registers, the scale bits at 0x1C/0x1B (with the driver's
+# scale tables), ODR nibbles in GYRO_CONFIG0/ACCEL_CONFIG0, and the FIFO in
+# stream mode with 16 byte packets, watermark status and an optional INT1 line.
+#
+# `motion(t)` gives ((ax, ay, az) g, (gx, gy, gz) dps) in the board frame at
+# t seconds; the model rotates it into the sensor frame with the inverse of
+# the driver's default axis map, so the driver reports it back unchanged.
+
+from sim.board import now_us
+from sim.device import I2CDevice
+
+WHO_AM_I = 0x75
+SIGNAL_PATH_RESET = 0x02
+TEMP_DATA1 = 0x09
+GYRO_DATA_Z0 = 0x16
+GYRO_CONFIG = 0x1B
+ACCEL_CONFIG = 0x1C
+GYRO_CONFIG0 = 0x20
+FIFO_CONFIG1 = 0x28
+FIFO_CONFIG2 = 0x29
+FIFO_CONFIG3 = 0x2A
+INT_SOURCE0 = 0x2B
+INT_STATUS = 0x3A
+FIFO_COUNTH = 0x3D
+FIFO_COUNTL = 0x3E
+FIFO_DATA = 0x3F
+BLK_SEL_W = 0x79
+MADDR_W = 0x7A
+M_W = 0x7B
+
+ACCEL_SCALE_FACTORS = (2048.0, 1024.0, 512.0, 256.0)
+GYRO_SCALE_FACTORS = (131.0, 65.5, 32.8, 16.4)
+ODR_HZ = {5: 1600.0, 6: 800.0, 7: 400.0, 8: 200.0, 9: 100.0,
+          10: 50.0, 11: 25.0, 12: 12.5}
+
+FIFO_SIZE = 2048
+FIFO_FRAME_SIZE = 16
+FIFO_HEADER = 0x68      # accel + gyro + 16-bit timestamp
+FIFO_HEADER_EMPTY = 0x80
+
+def _int16(value):
+    value = int(round(value))
+    return -32768 if value < -32768 else 32767 if value > 32767 else value
+
+class ICM42670Model(I2CDevice):
+    address = 0x69
+
+    def __init__(self, board, int1=None):
+        super().__init__(board)
+        self.motion = self.stationary
+        self.temperature = 27.0
+        self.gyro_bias = (0.35, -0.2, 0.15)
+        self.accel_noise = 0.002
+        self.gyro_noise = 0.05
+        self.int1 = int1        # Line for INT1, or None if not wired
+
+        self.regs[WHO_AM_I] = 0x67
+        self.regs[GYRO_CONFIG0] = 0x06
+        self.regs[GYRO_CONFIG0 + 1] = 0x06
+        self.regs[FIFO_CONFIG1] = 0x01      # FIFO bypassed
+        self.mreg1 = {}
+
+        self.fifo = bytearray()
+        self.fifo_overflow = 0               # frames lost to a full FIFO
+        self.samples = 0
+        self._fifo_next_us = None
+        self._wm_armed = True
+
+    def stationary(self, t):
+        # Sitting level on the pad, +z up, with a small gyro bias and noise
+        g = self.random.gauss
+        bias = self.gyro_bias
+        return ((g(0, self.accel_noise), g(0, self.accel_noise), 1.0 + g(0, self.accel_noise)),
+                (bias[0] + g(0, self.gyro_noise), bias[1] + g(0, self.gyro_noise),
+                 bias[2] + g(0, self.gyro_noise)))
+
+    def _sample(self, t):
+        # Raw big endian accel + gyro words in the sensor frame. Board axes
+        # are x = x, y = -z, z = y, so sensor (x, y, z) = (bx, bz, -by).
+        accel, gyro = self.motion(t)
+        a_scale = ACCEL_SCALE_FACTORS[self.regs[ACCEL_CONFIG] & 0x03]
+        g_scale = GYRO_SCALE_FACTORS[self.regs[GYRO_CONFIG] & 0x03]
+        out = bytearray(12)
+        values = (accel[0] * a_scale, accel[2] * a_scale, -accel[1] * a_scale,
+                  gyro[0] * g_scale, gyro[2] * g_scale, -gyro[1] * g_scale)
+        for i, value in enumerate(values):
+            raw = _int16(value) & 0xFFFF
+            out[2 * i] = raw >> 8
+            out[2 * i + 1] = raw & 0xFF
+        self.samples += 1
+        return out
+
+    def _fifo_enabled(self):
+        return not self.regs[FIFO_CONFIG1] & 0x01
+
+    def _watermark(self):
+        return self.regs[FIFO_CONFIG2] | (self.regs[FIFO_CONFIG3] & 0x0F) << 8
+
+    def update(self, now):
+        if not self._fifo_enabled():
+            self._fifo_next_us = None
+            return
+        period = 1e6 / ODR_HZ.get(self.regs[GYRO_CONFIG0] & 0x0F, 800.0)
+        if self._fifo_next_us is None:
+            self._fifo_next_us = now + period
+        while self._fifo_next_us <= now:
+            t_us = self._fifo_next_us
+            self._fifo_next_us += period
+            if len(self.fifo) + FIFO_FRAME_SIZE > FIFO_SIZE:
+                del self.fifo[:FIFO_FRAME_SIZE]    # stream mode drops the oldest
+                self.fifo_overflow += 1
+            temp = int(round((self.temperature - 25) * 2))
+            tmst = int(t_us) & 0xFFFF
+            self.fifo.append(FIFO_HEADER)
+            self.fifo += self._sample(t_us / 1e6)
+            self.fifo.append(temp & 0xFF)
+            self.fifo.append(tmst >> 8)
+            self.fifo.append(tmst & 0xFF)
+        self._check_watermark()
+
+    def _check_watermark(self):
+        watermark = self._watermark()
+        if watermark and len(self.fifo) >= watermark:
+            self.regs[INT_STATUS] |= 0x04
+            if self._wm_armed and self.int1 is not None and self.regs[INT_SOURCE0] & 0x04:
+                self.int1.pulse()
+            self._wm_armed = False
+        else:
+            self._wm_armed = True
+
+    def schedule_watermark(self):
+        # With INT1 wired, raise the watermark interrupt even when nobody
+        # touches the bus
+        if self.int1 is None or not self._fifo_enabled():
+            return
+        def tick(at):
+            self.update(now_us())
+            self.schedule_watermark()
+        period = 1e6 / ODR_HZ.get(self.regs[GYRO_CONFIG0] & 0x0F, 800.0)
+        frames = max(self._watermark() - len(self.fifo), 1) // FIFO_FRAME_SIZE + 1
+        self.board.schedule(now_us() + frames * period, tick)
+
+    def before_read(self, reg, count):
+        if reg <= GYRO_DATA_Z0 and reg + count > TEMP_DATA1:
+            raw = int(round((self.temperature - 25) * 128)) & 0xFFFF
+            self.regs[TEMP_DATA1] = raw >> 8
+            self.regs[TEMP_DATA1 + 1] = raw & 0xFF
+            self.regs[0x0B:0x17] = self._sample(now_us() / 1e6)
+        if reg <= FIFO_COUNTL and reg + count > FIFO_COUNTH:
+            count = len(self.fifo)
+            self.regs[FIFO_COUNTH] = count >> 8
+            self.regs[FIFO_COUNTL] = count & 0xFF
+
+    def read_into(self, reg, buf):
+        if reg != FIFO_DATA:
+            return super().read_into(reg, buf)
+        # FIFO_DATA does not auto-increment; a burst pops that many bytes
+        self.update(now_us())
+        count = min(len(buf), len(self.fifo))
+        buf[:count] = self.fifo[:count]
+        del self.fifo[:count]
+        for i in range(count, len(buf)):
+            buf[i] = FIFO_HEADER_EMPTY
+        self._wm_armed = len(self.fifo) < self._watermark()
+
+    def read_reg(self, reg):
+        value = self.regs[reg]
+        if reg == INT_STATUS:
+            self.regs[reg] = 0      # clear on read
+        return value
+
+    def write_reg(self, reg, value):
+        if reg == SIGNAL_PATH_RESET:
+            if value & 0x04:
+                del self.fifo[:]
+                self._wm_armed = True
+            return
+        if reg == M_W:
+            self.mreg1[self.regs[MADDR_W]] = value
+            return
+        was_enabled = self._fifo_enabled()
+        self.regs[reg] = value
+        if reg == FIFO_CONFIG1 and not was_enabled and self._fifo_enabled():
+            self._fifo_next_us = None
+            self.schedule_watermark()
+
+    def summary(self):
+        return (f"{self.samples} samples, FIFO {len(self.fifo)} bytes queued, "
+                f"{self.fifo_overflow} frames lost to overflow")
@@ -0,0 +1,228 @@
+# l86gps.py
+#
+# Model of the Quectel L86 as seen from the UART: at every fix it emits the
+# NMEA sentences enabled with PMTK314 (GLL, RMC, VTG, GGA, GSA, GSV) plus the
+# antenna status GPTXT, and the bytes reach the RX ring at the line rate
+# (10 bits per byte) so a slow reader sees the same backlog and overflow as on
+# the board. PMTK220 (fix interval) and PMTK251 (baud rate) are obeyed and
+# acknowledged with PMTK001. If the host UART runs at a different baud rate
+# than the module, both directions turn into garbage.
+#
+# `position(t)` gives (latitude, longitude, altitude m, satellites) at t
+# seconds, or None for no fix. `pps` is an optional Line pulsed at the top of
+# every UTC second.
+
+import time
+
+from sim.board import now_us
+
+# PMTK314 field order
+SENTENCES = ('GLL', 'RMC', 'VTG', 'GGA', 'GSA', 'GSV')
+
+def nmea_checksum(body):
+    checksum = 0
+    for c in body.encode():
+        checksum ^= c
+    return checksum
+
+def nmea(body):
+    return f"${body}*{nmea_checksum(body):02X}\r\n".encode()
+
+def _lat(value):
+    value_abs = abs(value)
+    degrees = int(value_abs)
+    return f"{degrees:02d}{(value_abs - degrees) * 60:07.4f}", 'N' if value >= 0 else 'S'
+
+def _lon(value):
+    value_abs = abs(value)
+    degrees = int(value_abs)
+    return f"{degrees:03d}{(value_abs - degrees) * 60:07.4f}", 'E' if value >= 0 else 'W'
+
+class L86Model:
+    def __init__(self, board, pps=None):
+        self.board = board
+        self.random = board.random
+        self.port = None
+        self.position = self.launch_site
+        self.pps = pps
+        self.baudrate = 9600
+        self.interval_ms = 1000
+        self.rates = {name: 1 for name in SENTENCES}
+        self.commands = []          # PMTK commands received, in order
+        self.fixes = 0
+        self.utc_start = time.time()
+
+        self._tx = bytearray()      # bytes queued on the module's TX line
+        self._tx_time_us = now_us() # line time the head of _tx has reached
+        self._next_fix_us = None
+        self._epoch = 0
+        self._rx_line = bytearray()
+        self._pps_scheduled = False
+        self._pending_baud = None
+        self._switch_after = 0      # bytes of _tx still to go at the old rate
+
+    def launch_site(self, t):
+        return 43.657699, -79.378803, 76.2, 9
+
+    def _utc(self, now):
+        return self.utc_start + now / 1e6
+
+    def _fix_sentences(self, now):
+        utc = self._utc(now)
+        tm = time.gmtime(utc)
+        hms = f"{tm.tm_hour:02d}{tm.tm_min:02d}{tm.tm_sec:02d}.{int(utc * 1000) % 1000:03d}"
+        date = f"{tm.tm_mday:02d}{tm.tm_mon:02d}{tm.tm_year % 100:02d}"
+        fix = self.position(now / 1e6)
+        out = bytearray()
+        epoch = self._epoch
+
+        if fix is None:
+            lat = lon = ('', '')
+            alt = ''
+            sats = 0
+        else:
+            lat = _lat(fix[0])
+            lon = _lon(fix[1])
+            alt = f"{fix[2]:.1f}"
+            sats = fix[3]
+
+        for name in SENTENCES:
+            rate = self.rates.get(name, 0)
+            if not rate or epoch % rate:
+                continue
+            if name == 'GGA':
+                if fix is None:
+                    out += nmea(f"GPGGA,{hms},,,,,0,00,,,M,,M,,")
+                else:
+                    out += nmea(f"GPGGA,{hms},{lat[0]},{lat[1]},{lon[0]},{lon[1]},1,{sats:02d},"
+                                f"0.92,{alt},M,-34.0,M,,")
+            elif name == 'RMC':
+                status = 'V' if fix is None else 'A'
+                mode = 'N' if fix is None else 'A'
+                out += nmea(f"GPRMC,{hms},{status},{lat[0]},{lat[1]},{lon[0]},{lon[1]},"
+                            f"0.02,31.66,{date},,,{mode}")
+            elif name == 'GLL':
+                status = 'V' if fix is None else 'A'
+                out += nmea(f"GPGLL,{lat[0]},{lat[1]},{lon[0]},{lon[1]},{hms},{status},A")
+            elif name == 'VTG':
+                out += nmea("GPVTG,31.66,T,,M,0.02,N,0.04,K,A")
+            elif name == 'GSA':
+                prns = [f"{p:02d}" for p in (14, 6, 16, 31, 23, 3, 26, 22, 29, 1, 11, 32)[:sats]]
+                prns += [''] * (12 - len(prns))
+                mode = '1' if fix is None else '3'
+                out += nmea(f"GPGSA,A,{mode},{','.join(prns)},1.24,0.92,0.83")
+            elif name == 'GSV':
+                count = max(sats, 1)
+                messages = (count + 3) // 4
+                for m in range(messages):
+                    sats_in = []
+                    for k in range(m * 4, min(m * 4 + 4, count)):
+                        sats_in.append(f"{k + 1:02d},{20 + 7 * k % 60:02d},{(37 * k) % 360:03d},"
+                                       f"{30 + k % 15:02d}")
+                    out += nmea(f"GPGSV,{messages},{m + 1},{sats:02d},{','.join(sats_in)}")
+        out += nmea("GPTXT,01,01,02,ANTSTATUS=OK")
+        self._epoch += 1
+        self.fixes += 1
+        return out
+
+    def _transmit(self, data, now):
+        if not self._tx:
+            self._tx_time_us = now
+        self._tx += data
+
+    def update(self, now):
+        # Emit every fix due by now, then move the bytes that have finished
+        # crossing the line into the host RX ring
+        if self._next_fix_us is None:
+            # Fixes are aligned to the UTC second, like the module's
+            utc_ms = self._utc(now) * 1000
+            self._next_fix_us = now + int((self.interval_ms - utc_ms % self.interval_ms) * 1000)
+            self._schedule_pps(now)
+        while self._next_fix_us <= now:
+            # Finish what was on the line before this fix, so an idle line
+            # restarts at the fix time rather than back to back
+            self._send(self._next_fix_us)
+            self._transmit(self._fix_sentences(self._next_fix_us), self._next_fix_us)
+            self._next_fix_us += self.interval_ms * 1000
+        self._send(now)
+
+    def _send(self, now):
+        while self._tx:
+            byte_us = 10e6 / self.baudrate
+            count = min(int((now - self._tx_time_us) / byte_us), len(self._tx))
+            if self._pending_baud is not None:
+                count = min(count, self._switch_after)
+            if count <= 0:
+                break
+            data = bytes(self._tx[:count])
+            del self._tx[:count]
+            self._tx_time_us += count * byte_us
+            if self.port.baudrate != self.baudrate:
+                data = bytes(self.random.randrange(256) for _ in data)
+            self.port.deliver(data)
+            if self._pending_baud is not None:
+                self._switch_after -= count
+                if self._switch_after == 0:
+                    # Acknowledgement is out: the rest goes at the new rate
+                    self.baudrate = self._pending_baud
+                    self._pending_baud = None
+
+    def _schedule_pps(self, now):
+        if self.pps is None or self._pps_scheduled:
+            return
+        self._pps_scheduled = True
+        def pulse(at):
+            self.pps.pulse()
+            utc = self._utc(at)
+            self.board.schedule(at + int((1.0 - utc % 1.0) * 1e6), pulse)
+        utc = self._utc(now)
+        self.board.schedule(now + int((1.0 - utc % 1.0) * 1e6), pulse)
+
+    def receive(self, data, baudrate):
+        # Bytes written by the host
+        self.update(now_us())
+        if baudrate != self.baudrate:
+            return
+        for c in data:
+            if c == 0x0A:
+                self._command(self._rx_line.decode('ascii', 'replace').strip())
+                del self._rx_line[:]
+            else:
+                self._rx_line.append(c)
+
+    def _command(self, sentence):
+        if not sentence.startswith('$PMTK') or '*' not in sentence:
+            return
+        body, checksum = sentence[1:].split('*', 1)
+        try:
+            if int(checksum, 16) != nmea_checksum(body):
+                return
+        except ValueError:
+            return
+        self.commands.append(sentence)
+        fields = body.split(',')
+        command = fields[0][4:]
+        flag = 3
+        if command == '220' and len(fields) > 1:
+            interval = int(fields[1])
+            if 100 <= interval <= 10000:
+                self.interval_ms = interval
+                self._next_fix_us = None    # realign to the new interval
+            else:
+                flag = 2
+        elif command == '314' and len(fields) > 6:
+            for name, rate in zip(SENTENCES, fields[1:7]):
+                self.rates[name] = int(rate)
+        elif command == '251' and len(fields) > 1:
+            baud = int(fields[1]) or 9600
+            if baud in (4800, 9600, 14400, 19200, 38400, 57600, 115200):
+                # Acknowledged at the old rate, then the module switches
+                self._pending_baud = baud
+            else:
+                flag = 2
+        self._transmit(nmea(f"PMTK001,{command},{flag}"), now_us())
+        if self._pending_baud is not None and not self._switch_after:
+            self._switch_after = len(self._tx)
+
+    def summary(self):
+        return f"{self.fixes} fixes at {1000 / self.interval_ms:g} Hz, {self.baudrate} baud"
@@ -0,0 +1,155 @@
+# lps22.py
+#
+# Register model of the LPS22HB/HH barometer: WHO_AM_I, continuous conversion
+# at the CTRL_REG1 ODR, ONE_SHOT conversions, STATUS data-available bits that
+# clear when the high output byte is read, and IF_ADD_INC auto increment.
+# Pressure is 24-bit at 4096 LSB/hPa, temperature 16-bit at 100 LSB/C.
+#
+# The 32-sample FIFO (FIFO_EN in CTRL_REG2) supports the FIFO, stream and
+# bypass modes of FIFO_CTRL with the watermark and overrun flags in
+# FIFO_STATUS. While it is enabled the output registers show the oldest
+# sample, reading TEMP_OUT_H pops it, and auto-increment wraps from 0x2C back
+# to 0x28 so a burst read can empty the FIFO.
+#
+# `pressure(t)` gives hPa and `temperature(t)` C at t seconds.
+
+from sim.board import now_us
+from sim.device import I2CDevice
+
+WHO_AM_I = 0x0F
+CTRL_REG1 = 0x10
+CTRL_REG2 = 0x11
+CTRL_REG3 = 0x12
+FIFO_CTRL = 0x14
+FIFO_STATUS = 0x26
+STATUS = 0x27
+PRESS_OUT_XL = 0x28
+PRESS_OUT_H = 0x2A
+TEMP_OUT_L = 0x2B
+TEMP_OUT_H = 0x2C
+
+ODR_HZ = (0, 1, 10, 25, 50, 75, 75, 75)
+ONE_SHOT_US = 13000     # conversion time with the LPF enabled
+FIFO_DEPTH = 32
+
+FIFO_EN = 0x40
+FIFO_MODE_BYPASS = 0
+FIFO_MODE_FIFO = 1
+FIFO_MODE_STREAM = 2
+
+class LPS22Model(I2CDevice):
+    address = 0x5D
+
+    def __init__(self, board):
+        super().__init__(board)
+        self.pressure = self.ground_pressure
+        self.temperature = lambda t: 22.5
+        self.noise = 0.015
+        self.regs[WHO_AM_I] = 0xB1
+        self.regs[CTRL_REG2] = 0x10     # IF_ADD_INC
+        self.conversions = 0
+        self.fifo = []              # (pressure raw, temperature raw), oldest first
+        self.fifo_overruns = 0
+        self._one_shot_us = None
+        self._next_sample_us = None
+
+    def ground_pressure(self, t):
+        return 1009.6 + self.random.gauss(0, self.noise)
+
+    def _fifo_enabled(self):
+        return bool(self.regs[CTRL_REG2] & FIFO_EN)
+
+    def _fifo_mode(self):
+        return self.regs[FIFO_CTRL] >> 5
+
+    def _convert(self, now):
+        t = now / 1e6
+        pressure = int(round(self.pressure(t) * 4096)) & 0xFFFFFF
+        temperature = int(round(self.temperature(t) * 100)) & 0xFFFF
+        self.conversions += 1
+        if self._fifo_enabled() and self._fifo_mode() != FIFO_MODE_BYPASS:
+            if len(self.fifo) == FIFO_DEPTH:
+                if self._fifo_mode() == FIFO_MODE_FIFO:
+                    return          # FIFO mode stops when full
+                del self.fifo[0]
+                self.fifo_overruns += 1
+                self.regs[FIFO_STATUS] |= 0x40
+            self.fifo.append((pressure, temperature))
+            if len(self.fifo) == 1:
+                self._load(pressure, temperature)
+            return
+        self._load(pressure, temperature)
+
+    def _load(self, pressure, temperature):
+        self.regs[PRESS_OUT_XL] = pressure & 0xFF
+        self.regs[PRESS_OUT_XL + 1] = (pressure >> 8) & 0xFF
+        self.regs[PRESS_OUT_H] = pressure >> 16
+        self.regs[TEMP_OUT_L] = temperature & 0xFF
+        self.regs[TEMP_OUT_H] = temperature >> 8
+        self.regs[STATUS] |= 0x03
+
+    def update(self, now):
+        if self._one_shot_us is not None and now >= self._one_shot_us:
+            self._one_shot_us = None
+            self.regs[CTRL_REG2] &= ~0x01 & 0xFF
+            self._convert(now)
+        rate = ODR_HZ[(self.regs[CTRL_REG1] >> 4) & 0x07]
+        if rate:
+            period = 1e6 / rate
+            if self._next_sample_us is None:
+                self._next_sample_us = now + period
+            if now >= self._next_sample_us:
+                # Every sample since the last access, for the FIFO; of a long
+                # gap only the last FIFO_DEPTH (plus one to flag the overrun)
+                # can matter
+                due = int((now - self._next_sample_us) // period) + 1
+                first = self._next_sample_us + max(due - FIFO_DEPTH - 1, 0) * period
+                for k in range(min(due, FIFO_DEPTH + 1)):
+                    self._convert(first + k * period)
+                self._next_sample_us += due * period
+        else:
+            self._next_sample_us = None
+
+    def read_reg(self, reg):
+        if reg == FIFO_STATUS:
+            level = len(self.fifo)
+            threshold = self.regs[FIFO_CTRL] & 0x1F
+            value = (self.regs[FIFO_STATUS] & 0x40) | level
+            if threshold and level >= threshold:
+                value |= 0x80
+            if level == FIFO_DEPTH:
+                value |= 0x20
+            self.regs[FIFO_STATUS] &= ~0x40 & 0xFF
+            return value
+        value = self.regs[reg]
+        if reg == PRESS_OUT_H:
+            self.regs[STATUS] &= ~0x01 & 0xFF
+        elif reg == TEMP_OUT_H:
+            self.regs[STATUS] &= ~0x02 & 0xFF
+            if self._fifo_enabled() and self.fifo:
+                del self.fifo[0]
+                if self.fifo:
+                    self._load(*self.fifo[0])
+        return value
+
+    def write_reg(self, reg, value):
+        self.regs[reg] = value
+        if reg == CTRL_REG2 and value & 0x01 and self._one_shot_us is None:
+            self._one_shot_us = now_us() + ONE_SHOT_US
+        if reg == FIFO_CTRL and value >> 5 == FIFO_MODE_BYPASS:
+            del self.fifo[:]        # bypass empties the FIFO
+        if reg == CTRL_REG2 and not value & FIFO_EN:
+            del self.fifo[:]
+
+    def next_reg(self, reg):
+        if self.regs[CTRL_REG2] & 0x10:
+            if reg == TEMP_OUT_H and self._fifo_enabled():
+                return PRESS_OUT_XL
+            return (reg + 1) & 0xFF
+        return reg
+
+    def summary(self):
+        if self._fifo_enabled():
+            return (f"{self.conversions} conversions, FIFO {len(self.fifo)} samples queued, "
+                    f"{self.fifo_overruns} lost to overrun")
+        return f"{self.conversions} conversions"
@@ -0,0 +1,245 @@
+# machine.py
+#
+# Stand-in for the rp2 `machine` module. Pin, I2C, SPI and UART objects are
+# thin handles onto the current sim board, so several objects created for the
+# same GPIO or bus (as the flight scripts do) share one line or bus.
+
+import errno
+import time
+
+from sim import board as _board
+from sim.board import IRQ_FALLING, IRQ_RISING
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    ALT = 3
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = IRQ_FALLING
+    IRQ_RISING = IRQ_RISING
+
+    def __init__(self, id, mode=-1, pull=-1, *, value=None, **kwargs):
+        self.id = id
+        self._line = _board.current().line(id)
+        if value is not None:
+            self._line.set(value)
+
+    def init(self, mode=-1, pull=-1, *, value=None, **kwargs):
+        if value is not None:
+            self._line.set(value)
+
+    def value(self, x=None):
+        if x is None:
+            _board.current().poll()
+            return self._line.level
+        self._line.set(x)
+
+    __call__ = value
+
+    def on(self):
+        self._line.set(1)
+
+    def off(self):
+        self._line.set(0)
+
+    def high(self):
+        self._line.set(1)
+
+    def low(self):
+        self._line.set(0)
+
+    def toggle(self):
+        self._line.set(not self._line.level)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._line.handler = handler
+        self._line.trigger = trigger
+        self._line.pin = self
+
+    def __repr__(self):
+        return f"Pin({self.id})"
+
+class I2C:
+    def __init__(self, id=0, *, scl=None, sda=None, freq=400000, timeout=50000):
+        self._bus = _board.current().i2c(id)
+        self._bus.freq = freq
+        self._last = None   # (address, next register) for readfrom()
+
+    def init(self, *, scl=None, sda=None, freq=400000, timeout=50000):
+        self._bus.freq = freq
+
+    def _device(self, addr):
+        device = self._bus.devices.get(addr)
+        if device is None:
+            raise OSError(errno.EIO)
+        return device
+
+    def scan(self):
+        return sorted(self._bus.devices)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, *, addrsize=8):
+        self._device(addr).read_into(memaddr, buf)
+        self._bus._account(len(buf) + 3)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, *, addrsize=8):
+        buf = bytearray(nbytes)
+        self.readfrom_mem_into(addr, memaddr, buf)
+        return bytes(buf)
+
+    def writeto_mem(self, addr, memaddr, buf, *, addrsize=8):
+        self._device(addr).write(memaddr, bytes(buf))
+        self._bus._account(len(buf) + 2)
+
+    def writeto(self, addr, buf, stop=True):
+        # First byte selects the register, the rest is written to it
+        device = self._device(addr)
+        if len(buf):
+            device.write(buf[0], bytes(buf[1:]))
+            self._last = (addr, buf[0])
+        self._bus._account(len(buf) + 1)
+        return len(buf)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        device = self._device(addr)
+        reg = self._last[1] if self._last and self._last[0] == addr else 0
+        device.read_into(reg, buf)
+        self._bus._account(len(buf) + 1)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        buf = bytearray(nbytes)
+        self.readfrom_into(addr, buf, stop)
+        return bytes(buf)
+
+SoftI2C = I2C
+
+class SPI:
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, id=0, baudrate=1000000, *, polarity=0, phase=0, bits=8,
+                 firstbit=MSB, sck=None, mosi=None, miso=None):
+        self._bus = _board.current().spi(id)
+        self._bus.baudrate = baudrate
+
+    def init(self, baudrate=1000000, **kwargs):
+        self._bus.baudrate = baudrate
+
+    def deinit(self):
+        pass
+
+    def write(self, buf):
+        device = self._bus.selected()
+        if device is not None:
+            device.spi_write(buf)
+        self._bus._account(len(buf))
+
+    def readinto(self, buf, write=0x00):
+        device = self._bus.selected()
+        if device is not None:
+            device.spi_readinto(buf)
+        else:
+            for i in range(len(buf)):
+                buf[i] = 0xFF
+        self._bus._account(len(buf))
+
+    def read(self, nbytes, write=0x00):
+        buf = bytearray(nbytes)
+        self.readinto(buf, write)
+        return bytes(buf)
+
+SoftSPI = SPI
+
+class UART:
+    def __init__(self, id=0, baudrate=9600, bits=8, parity=None, stop=1, *,
+                 tx=None, rx=None, rxbuf=256, timeout=0, **kwargs):
+        self._port = _board.current().uart(id)
+        self.init(baudrate, bits, parity, stop, rxbuf=rxbuf)
+
+    def init(self, baudrate=9600, bits=8, parity=None, stop=1, *, rxbuf=None, **kwargs):
+        self._port.baudrate = baudrate
+        if rxbuf is not None:
+            self._port.rxbuf = rxbuf
+        del self._port.rx[:]
+
+    def deinit(self):
+        pass
+
+    def any(self):
+        self._port.update()
+        return len(self._port.rx)
+
+    def read(self, nbytes=None):
+        self._port.update()
+        rx = self._port.rx
+        if not rx:
+            return None
+        if nbytes is None or nbytes > len(rx):
+            nbytes = len(rx)
+        data = bytes(rx[:nbytes])
+        del rx[:nbytes]
+        return data
+
+    def readinto(self, buf, nbytes=None):
+        self._port.update()
+        rx = self._port.rx
+        if not rx:
+            return None
+        if nbytes is None or nbytes > len(buf):
+            nbytes = len(buf)
+        nbytes = min(nbytes, len(rx))
+        buf[:nbytes] = rx[:nbytes]
+        del rx[:nbytes]
+        return nbytes
+
+    def readline(self):
+        self._port.update()
+        rx = self._port.rx
+        if not rx:
+            return None
+        end = rx.find(b'\n')
+        end = len(rx) if end < 0 else end + 1
+        data = bytes(rx[:end])
+        del rx[:end]
+        return data
+
+    def write(self, buf):
+        self._port.sent += len(buf)
+        if self._port.device is not None:
+            self._port.device.receive(bytes(buf), self._port.baudrate)
+        return len(buf)
+
+    def flush(self):
+        pass
+
+    def txdone(self):
+        return True
+
+def freq(hz=None):
+    if hz is None:
+        return 125000000
+
+def unique_id():
+    return b'\xe6\x61\x38\x52\x13\x4b\x29\x2e'
+
+def reset():
+    raise SystemExit("machine.reset()")
+
+def soft_reset():
+    raise SystemExit("machine.soft_reset()")
+
+def idle():
+    _board.current().poll()
+
+def disable_irq():
+    return 0
+
+def enable_irq(state=0):
+    pass
+
+def lightsleep(time_ms=None):
+    if time_ms is not None:
+        time.sleep_ms(time_ms)
+
+deepsleep = lightsleep
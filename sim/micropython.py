@@ -0,0 +1,44 @@
+# micropython.py
+#
+# Stand-in for the `micropython` module. Code emitters are plain Python here.
+
+from sim import board as _board
+
+def const(value):
+    return value
+
+def native(f):
+    return f
+
+def viper(f):
+    return f
+
+def asm_thumb(f):
+    return f
+
+def schedule(func, arg):
+    _board.current().soft_irq(func, arg)
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+def opt_level(level=None):
+    return 0 if level is None else None
+
+def mem_info(verbose=False):
+    print("mem: not tracked on the host")
+
+def qstr_info(verbose=False):
+    pass
+
+def stack_use():
+    return 0
+
+def heap_lock():
+    return 0
+
+def heap_unlock():
+    return 0
+
+def kbd_intr(chr):
+    pass
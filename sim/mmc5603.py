@@ -0,0 +1,102 @@
+# mmc5603.py
+#
+# Register model of the MMC5603NJ magnetometer: product id, one-shot field and
+# temperature measurements that take the configured measurement time, and
+# continuous mode at the ODR register rate. Output is 20-bit, offset binary,
+# 0.00625 uT/LSB.
+#
+# `field(t)` gives (x, y, z) in uT in the sensor frame at t seconds.
+
+from sim.board import now_us
+from sim.device import I2CDevice
+
+DATA = 0x00
+TEMP = 0x09
+STATUS1 = 0x18
+ODR = 0x1A
+CTRL0 = 0x1B
+CTRL1 = 0x1C
+CTRL2 = 0x1D
+PRODUCT_ID = 0x39
+
+MEAS_M_DONE = 0x40
+MEAS_T_DONE = 0x80
+
+# Measurement time for CTRL1 BW bits, us
+MEASURE_US = (6600, 3500, 2000, 1200)
+TEMP_MEASURE_US = 1500
+
+class MMC5603Model(I2CDevice):
+    address = 0x30
+
+    def __init__(self, board):
+        super().__init__(board)
+        self.field = self.earth_field
+        self.temperature = 24.0
+        self.noise = 0.1
+        self.regs[PRODUCT_ID] = 0x10
+        self.measurements = 0
+        self._m_done_us = None
+        self._t_done_us = None
+        self._next_sample_us = None
+
+    def earth_field(self, t):
+        g = self.random.gauss
+        return (18.0 + g(0, self.noise), -4.5 + g(0, self.noise), -47.0 + g(0, self.noise))
+
+    def _latch_field(self, now):
+        x, y, z = self.field(now / 1e6)
+        for i, value in enumerate((x, y, z)):
+            raw = int(round(value / 0.00625)) + (1 << 19)
+            raw = 0 if raw < 0 else 0xFFFFF if raw > 0xFFFFF else raw
+            self.regs[DATA + 2 * i] = raw >> 12
+            self.regs[DATA + 2 * i + 1] = (raw >> 4) & 0xFF
+            self.regs[DATA + 6 + i] = (raw & 0x0F) << 4
+        self.regs[STATUS1] |= MEAS_M_DONE
+        self.measurements += 1
+
+    def _continuous(self):
+        return self.regs[CTRL2] & 0x10 and self.regs[ODR]
+
+    def update(self, now):
+        if self._m_done_us is not None and now >= self._m_done_us:
+            self._m_done_us = None
+            self._latch_field(now)
+        if self._t_done_us is not None and now >= self._t_done_us:
+            self._t_done_us = None
+            raw = int(round((self.temperature + 75) / 0.8))
+            self.regs[TEMP] = 0 if raw < 0 else 255 if raw > 255 else raw
+            self.regs[STATUS1] |= MEAS_T_DONE
+        if self._continuous():
+            rate = 1000 if self.regs[CTRL2] & 0x80 else self.regs[ODR]
+            period = 1e6 / rate
+            if self._next_sample_us is None:
+                self._next_sample_us = now + period
+            if now >= self._next_sample_us:
+                # Only the newest sample is visible in the data registers
+                missed = int((now - self._next_sample_us) // period)
+                self._next_sample_us += (missed + 1) * period
+                self._latch_field(now)
+        else:
+            self._next_sample_us = None
+
+    def read_reg(self, reg):
+        value = self.regs[reg]
+        if reg == DATA + 8:
+            self.regs[STATUS1] &= ~MEAS_M_DONE & 0xFF
+        return value
+
+    def write_reg(self, reg, value):
+        if reg == CTRL0:
+            now = now_us()
+            if value & 0x01:
+                self.regs[STATUS1] &= ~MEAS_M_DONE & 0xFF
+                self._m_done_us = now + MEASURE_US[self.regs[CTRL1] & 0x03]
+            if value & 0x02:
+                self.regs[STATUS1] &= ~MEAS_T_DONE & 0xFF
+                self._t_done_us = now + TEMP_MEASURE_US
+            return      # CTRL0 bits are self clearing
+        self.regs[reg] = value
+
+    def summary(self):
+        return f"{self.measurements} field measurements"
@@ -0,0 +1,211 @@
+# rfm9x.py
+#
+# Register model of the RFM95/96 (SX127x) in LoRa mode, at the level
+# lib/micropython_rfm9x.py drives it over SPI: register file with address
+# auto-increment, the 256 byte FIFO behind RegFifo/RegFifoAddrPtr, IRQ flags
+# (write 1 to clear), and the operating modes. TX takes the LoRa time on air
+# for the configured SF/BW/CR/preamble, then sets TxDone, drops back to
+# standby and pulses DIO0 if it is mapped to TxDone. Packets put on air are
+# kept in `sent`; inject() delivers a packet to the radio as if received.
+
+from sim.board import now_us
+
+FIFO = 0x00
+OP_MODE = 0x01
+FIFO_ADDR_PTR = 0x0D
+FIFO_TX_BASE_ADDR = 0x0E
+FIFO_RX_BASE_ADDR = 0x0F
+FIFO_RX_CURRENT_ADDR = 0x10
+IRQ_FLAGS = 0x12
+RX_NB_BYTES = 0x13
+PKT_SNR_VALUE = 0x19
+PKT_RSSI_VALUE = 0x1A
+RSSI_VALUE = 0x1B
+MODEM_CONFIG1 = 0x1D
+MODEM_CONFIG2 = 0x1E
+PREAMBLE_MSB = 0x20
+PREAMBLE_LSB = 0x21
+PAYLOAD_LENGTH = 0x22
+MODEM_CONFIG3 = 0x26
+DIO_MAPPING1 = 0x40
+VERSION = 0x42
+
+MODE_SLEEP = 0
+MODE_STANDBY = 1
+MODE_TX = 3
+MODE_RX_CONTINUOUS = 5
+MODE_RX_SINGLE = 6
+
+IRQ_RX_DONE = 0x40
+IRQ_TX_DONE = 0x08
+IRQ_PAYLOAD_CRC_ERROR = 0x20
+
+BANDWIDTHS = (7800, 10400, 15600, 20800, 31250, 41700, 62500, 125000, 250000, 500000)
+
+def time_on_air_us(payload, sf, bw, cr, preamble, crc=True, implicit=False, ldro=False):
+    # SX1276 datasheet, section 4.1.1.7
+    t_sym = (1 << sf) / bw
+    n = 8 * payload - 4 * sf + 28 + (16 if crc else 0) - (20 if implicit else 0)
+    d = 4 * (sf - (2 if ldro else 0))
+    symbols = 8 + max(-(-n // d) * (cr + 4), 0)
+    return int(((preamble + 4.25) + symbols) * t_sym * 1e6)
+
+class RFM9xModel:
+    def __init__(self, board, dio0=None):
+        self.board = board
+        self.dio0 = dio0
+        self.cs_line = None
+        self.regs = bytearray(128)
+        self.fifo = bytearray(256)
+        self.sent = []              # (time_us, bytes) for every packet put on air
+        self.received = 0
+        self.missed = 0             # injected while not listening, or over an unread packet
+        self.airtime_us = 0
+        self.rssi = -60
+        self.snr = 9.5
+
+        regs = self.regs
+        regs[OP_MODE] = 0x09
+        regs[0x06:0x09] = b'\x6c\x80\x00'
+        regs[0x09] = 0x4F
+        regs[FIFO_TX_BASE_ADDR] = 0x80
+        regs[MODEM_CONFIG1] = 0x72
+        regs[MODEM_CONFIG2] = 0x70
+        regs[PREAMBLE_LSB] = 0x08
+        regs[PAYLOAD_LENGTH] = 0x01
+        regs[VERSION] = 0x12
+
+        self._address = None
+        self._write = False
+        self._tx_end_us = None
+
+    def modem(self):
+        # (sf, bw Hz, cr denominator - 4, preamble, crc, implicit, ldro)
+        regs = self.regs
+        bw_id = regs[MODEM_CONFIG1] >> 4
+        return (regs[MODEM_CONFIG2] >> 4,
+                BANDWIDTHS[bw_id] if bw_id < len(BANDWIDTHS) else 125000,
+                (regs[MODEM_CONFIG1] >> 1) & 0x07,
+                regs[PREAMBLE_MSB] << 8 | regs[PREAMBLE_LSB],
+                bool(regs[MODEM_CONFIG2] & 0x04),
+                bool(regs[MODEM_CONFIG1] & 0x01),
+                bool(regs[MODEM_CONFIG3] & 0x08))
+
+    def time_on_air_us(self, payload):
+        sf, bw, cr, preamble, crc, implicit, ldro = self.modem()
+        return time_on_air_us(payload, sf, bw, cr, preamble, crc, implicit, ldro)
+
+    def mode(self):
+        return self.regs[OP_MODE] & 0x07
+
+    def _set_mode(self, mode):
+        self.regs[OP_MODE] = (self.regs[OP_MODE] & 0xF8) | mode
+
+    def _dio0_mapping(self):
+        return self.regs[DIO_MAPPING1] >> 6
+
+    def update(self, now):
+        if self._tx_end_us is not None and now >= self._tx_end_us:
+            self._tx_end_us = None
+            self.regs[IRQ_FLAGS] |= IRQ_TX_DONE
+            self._set_mode(MODE_STANDBY)
+            if self.dio0 is not None and self._dio0_mapping() == 0b01:
+                self.dio0.pulse()
+
+    def _start_tx(self):
+        now = now_us()
+        length = self.regs[PAYLOAD_LENGTH]
+        base = self.regs[FIFO_TX_BASE_ADDR]
+        packet = bytes(self.fifo[(base + i) & 0xFF] for i in range(length))
+        self.sent.append((now, packet))
+        airtime = self.time_on_air_us(length)
+        self.airtime_us += airtime
+        self._tx_end_us = now + airtime
+        self.board.schedule(self._tx_end_us, self.update)
+
+    def inject(self, packet, rssi=None, snr=None, crc_error=False):
+        # Deliver a packet (header included) as received over the air;
+        # crc_error flags it as corrupted
+        self.update(now_us())
+        if self.mode() not in (MODE_RX_CONTINUOUS, MODE_RX_SINGLE):
+            self.missed += 1
+            return False
+        if self.regs[IRQ_FLAGS] & IRQ_RX_DONE:
+            self.missed += 1
+        base = self.regs[FIFO_RX_BASE_ADDR]
+        for i, value in enumerate(packet):
+            self.fifo[(base + i) & 0xFF] = value
+        rssi = self.rssi if rssi is None else rssi
+        snr = self.snr if snr is None else snr
+        self.regs[FIFO_RX_CURRENT_ADDR] = base
+        self.regs[RX_NB_BYTES] = len(packet)
+        self.regs[PKT_RSSI_VALUE] = max(0, min(255, rssi + 137))
+        self.regs[PKT_SNR_VALUE] = int(snr * 4) & 0xFF
+        self.regs[IRQ_FLAGS] |= IRQ_RX_DONE | (IRQ_PAYLOAD_CRC_ERROR if crc_error else 0)
+        self.received += 1
+        if self.mode() == MODE_RX_SINGLE:
+            self._set_mode(MODE_STANDBY)
+        if self.dio0 is not None and self._dio0_mapping() == 0b00:
+            self.dio0.pulse()
+        return True
+
+    def chip_select(self, level):
+        if level == 0:
+            self.update(now_us())
+        self._address = None
+
+    def _next(self):
+        if self._address == FIFO:
+            return
+        self._address = (self._address + 1) & 0x7F
+
+    def spi_write(self, data):
+        for value in data:
+            if self._address is None:
+                self._address = value & 0x7F
+                self._write = bool(value & 0x80)
+                continue
+            if self._write:
+                self._write_reg(self._address, value)
+            self._next()
+
+    def spi_readinto(self, buf):
+        for i in range(len(buf)):
+            if self._address is None:
+                buf[i] = 0
+                continue
+            buf[i] = self._read_reg(self._address)
+            self._next()
+
+    def _read_reg(self, address):
+        if address == FIFO:
+            ptr = self.regs[FIFO_ADDR_PTR]
+            self.regs[FIFO_ADDR_PTR] = (ptr + 1) & 0xFF
+            return self.fifo[ptr]
+        if address == RSSI_VALUE:
+            return max(0, min(255, self.rssi - 20 + 137))
+        return self.regs[address]
+
+    def _write_reg(self, address, value):
+        if address == FIFO:
+            ptr = self.regs[FIFO_ADDR_PTR]
+            self.fifo[ptr] = value
+            self.regs[FIFO_ADDR_PTR] = (ptr + 1) & 0xFF
+        elif address == IRQ_FLAGS:
+            self.regs[IRQ_FLAGS] &= ~value & 0xFF
+        elif address == VERSION:
+            pass
+        elif address == OP_MODE:
+            previous = self.mode()
+            self.regs[OP_MODE] = value
+            mode = value & 0x07
+            if mode == MODE_TX and previous != MODE_TX:
+                self._start_tx()
+            elif mode != MODE_TX:
+                self._tx_end_us = None
+        else:
+            self.regs[address] = value
+
+    def summary(self):
+        return (f"{len(self.sent)} packets sent, {self.airtime_us / 1e6:.2f} s on air, "
+                f"{self.received} received, {self.missed} missed")
@@ -3,7 +3,7 @@ from machine import SPI, Pin, I2C
 import struct
 from lib.icm42670 import read_who_am_i, configure_sensor, read_accel_data, read_gyro_data, set_accel_scale, set_gyro_scale
 from lib.fusionmadgwick import Fusion
-from lib.l86gps import L86GPS
+from lib.l86gps import L86GPS, utc_text
 from lib.lps22 import LPS22
 from micropython_mmc5603 import mmc5603
 import time
@@ -112,41 +112,23 @@ def main():
 
                 fuse.update_nomag(accel, gyro)
 
-                # Initialize GPS values with defaults
+                # GPS state from every sentence received so far; the last
+                # known values are kept between fixes
+                gps.update()
+                fix = gps.fix
                 gps_values = {
-                    'time': '000000',
-                    'date': '010100',
-                    'latitude': 0.0,
-                    'longitude': 0.0,
-                    'altitude': 0.0,
-                    'satellites': 0,
-                    'quality': 'invalid',
-                    'speed': 0.0,
-                    'status': 'invalid',
-                    'antenna_status': 'unknown'
+                    'time': utc_text(fix.utc_ms) if fix.utc_ms is not None else '000000',
+                    'date': '{:06d}'.format(fix.date) if fix.date is not None else '010100',
+                    'latitude': fix.latitude if fix.latitude is not None else 0.0,
+                    'longitude': fix.longitude if fix.longitude is not None else 0.0,
+                    'altitude': fix.altitude if fix.altitude is not None else 0.0,
+                    'satellites': fix.satellites,
+                    'quality': fix.quality if fix.valid else 'invalid',
+                    'speed': fix.speed if fix.speed is not None else 0.0,
+                    'status': 'valid' if fix.valid else 'invalid',
+                    'antenna_status': fix.antenna_status or 'unknown'
                 }
 
-                # Read and process GPS data
-                gps_data = gps.read_gps()
-                if gps_data:
-                    if gps_data['type'] == 'GPGGA' and gps_data['status'] == 'valid':
-                        gps_values.update({
-                            'time': gps_data['time'],
-                            'latitude': gps_data['latitude'],
-                            'longitude': gps_data['longitude'],
-                            'altitude': gps_data['altitude'],
-                            'satellites': gps_data['satellites'],
-                            'quality': gps_data['quality'],
-                            'status': gps_data['status']
-                        })
-                    elif gps_data['type'] == 'GPRMC' and gps_data['status'] == 'valid':
-                        gps_values.update({
-                            'speed': gps_data['speed'],
-                            'date': gps_data['date']
-                        })
-                    elif gps_data['type'] == 'GPTXT':
-                        gps_values['antenna_status'] = gps_data['antenna_status']
-
                 # Log data
                 log_sensor_data(log_file, elapsed_time, temperature, pressure, 
                               accel, gyro, mag, gps_values)
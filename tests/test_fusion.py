@@ -0,0 +1,45 @@
+# Host tests for the lib/fusion filters: python -m pytest tests
+
+import math
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[0:0] = [os.path.join(ROOT, 'lib'), os.path.join(ROOT, 'UKF')]
+
+import pytest
+
+from fusion import Madgwick, MovingAverageFilter, Quaternion
+from ukf import UnscentedKalmanFilter
+
+ACCEL = (0.0, 0.0, 1.0)            # g, board level
+GYRO = (0.0, 0.0, 0.0)             # deg/s
+MAG = (20.0, 0.0, -45.0)           # uT, north and down
+
+FILTERS = {
+    'madgwick': lambda: Madgwick(beta=0.1),
+    'ukf': UnscentedKalmanFilter,
+}
+
+@pytest.mark.parametrize('make', FILTERS.values(), ids=list(FILTERS))
+def test_filter_output_goes_through_moving_average(make):
+    f = make()
+    maf = MovingAverageFilter(window_size=12)
+    for _ in range(400):
+        f.step(ACCEL, GYRO, MAG, 0.01)
+        smoothed = maf.apply(f.q)
+    assert isinstance(f.q, Quaternion)
+    assert isinstance(smoothed, Quaternion)
+    # At rest the window holds the same attitude twelve times over
+    for a, b in zip(smoothed, f.q):
+        assert a == pytest.approx(b, abs=1e-4)
+    assert math.sqrt(sum(c * c for c in smoothed)) == pytest.approx(1.0, abs=1e-4)
+
+@pytest.mark.parametrize('make', FILTERS.values(), ids=list(FILTERS))
+def test_level_board_reads_level(make):
+    f = make()
+    for _ in range(400):
+        f.step(ACCEL, GYRO, MAG, 0.01)
+    w, x, y, z = f.q
+    # World z (up) in body axes is the third row of R(q)
+    assert 1 - 2 * (x * x + y * y) == pytest.approx(1.0, abs=1e-3)
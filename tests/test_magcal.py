@@ -0,0 +1,65 @@
+# Host tests for lib/magcal.py: python -m pytest tests
+
+import math
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+
+import pytest
+
+from magcal import IDENTITY, MagCalibrator
+
+def _sphere_points(n, seed=1):
+    rng = random.Random(seed)
+    for _ in range(n):
+        v = [rng.gauss(0, 1) for _ in range(3)]
+        norm = math.sqrt(sum(c * c for c in v))
+        yield [c / norm for c in v]
+
+def _fit(offset, soft_iron=IDENTITY, field=50.0, center=(0.0, 0.0, 0.0)):
+    # Noise-free samples of a field sphere distorted by soft_iron, then offset
+    calibrator = MagCalibrator(field_ut=field, min_spacing=0.0, center=center)
+    for u in _sphere_points(600):
+        m = [sum(soft_iron[3 * i + j] * u[j] * field for j in range(3)) + offset[i]
+             for i in range(3)]
+        calibrator.add(*m)
+    return calibrator.fit(IDENTITY)
+
+@pytest.mark.parametrize('offset', [
+    (0.0, 0.0, 0.0),
+    (49.0, 0.0, 0.0),
+    (51.0, 0.0, 0.0),
+    (60.0, 0.0, 0.0),
+    (0.0, 0.0, 80.0),
+    (-150.0, 90.0, 200.0),
+])
+def test_offset_recovered_when_larger_than_field(offset):
+    calibration = _fit(offset)
+    for i in range(3):
+        assert calibration.offset[i] == pytest.approx(offset[i], abs=0.05)
+    assert calibration.radius == pytest.approx(50.0, rel=1e-3)
+
+def test_soft_iron_with_large_offset():
+    soft_iron = (1.2, 0.1, 0.0,
+                 0.1, 0.9, 0.05,
+                 0.0, 0.05, 1.05)
+    offset = (30.0, -20.0, 45.0)
+    calibration = _fit(offset, soft_iron)
+    for i in range(3):
+        assert calibration.offset[i] == pytest.approx(offset[i], abs=0.05)
+    # Corrected samples lie on a sphere
+    out = [0.0, 0.0, 0.0]
+    for u in _sphere_points(50, seed=2):
+        m = [sum(soft_iron[3 * i + j] * u[j] * 50.0 for j in range(3)) + offset[i]
+             for i in range(3)]
+        calibration.correct_into(m, out)
+        assert math.sqrt(sum(c * c for c in out)) == pytest.approx(calibration.radius, rel=2e-3)
+
+def test_center_from_previous_offset():
+    offset = (120.0, -60.0, 30.0)
+    calibration = _fit(offset, center=(110.0, -55.0, 25.0))
+    for i in range(3):
+        assert calibration.offset[i] == pytest.approx(offset[i], abs=0.05)